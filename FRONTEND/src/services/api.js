@@ -330,6 +330,25 @@ class ApiService {
     }
   }
 
+  /**
+   * Track several interactions in one request; each event may carry an `id`
+   * (idempotency key) so a retried batch is only counted once
+   */
+  async trackUserInteractions(events) {
+    try {
+      return await this.request('/dashboard/track', {
+        method: 'POST',
+        body: JSON.stringify({ events }),
+      });
+    } catch (error) {
+      console.error('Failed to track user interactions:', error);
+      return {
+        success: false,
+        error: error.message
+      };
+    }
+  }
+
   /**
    * PYQ Practice specific API calls
    */
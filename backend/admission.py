@@ -0,0 +1,173 @@
+"""
+Admission Control
+Per-stage concurrency limits for the expensive parts of a request: query
+embedding, Pinecone vector queries and the Groq completion.
+
+Each stage admits at most `limit` calls at once per worker process. A few more
+may wait in a short queue, for at most the stage's wait budget (or what is left
+of the request deadline). Anything beyond that is rejected at once with
+StageOverloaded, which the API turns into 503 + Retry-After, so a spike sheds
+load early instead of oversubscribing torch threads and worker slots.
+
+The embedding stage defaults to one call at a time: the model's fast tokenizer
+is not safe to call from several threads, so GatedEncoder serializes encode()
+anyway and a higher limit would only move the wait from the gate to its lock.
+"""
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+
+# stage -> (concurrent calls, waiting calls, max wait in seconds)
+STAGE_LIMITS = {
+    'embedding': (
+        int(os.getenv('EMBED_CONCURRENCY', 1)),
+        int(os.getenv('EMBED_MAX_QUEUE', 4)),
+        float(os.getenv('EMBED_MAX_WAIT_SECONDS', 0.5))
+    ),
+    'vector': (
+        int(os.getenv('VECTOR_CONCURRENCY', 8)),
+        int(os.getenv('VECTOR_MAX_QUEUE', 16)),
+        float(os.getenv('VECTOR_MAX_WAIT_SECONDS', 1.0))
+    ),
+    'llm': (
+        int(os.getenv('LLM_CONCURRENCY', 4)),
+        int(os.getenv('LLM_MAX_QUEUE', 8)),
+        float(os.getenv('LLM_MAX_WAIT_SECONDS', 2.0))
+    )
+}
+
+class StageOverloaded(Exception):
+    """Raised when a stage is saturated and its wait queue is full or too slow"""
+
+    def __init__(self, stage, reason, retry_after):
+        super().__init__(f"{stage} stage overloaded ({reason})")
+        self.stage = stage
+        self.reason = reason
+        self.retry_after = retry_after
+
+class StageGate:
+    """Concurrency limit with a bounded, time-limited wait queue"""
+
+    def __init__(self, name, limit, max_queue, max_wait):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self._condition = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0, 'rejected_wait': 0}
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.total_service_seconds = 0.0
+
+    def _retry_after(self):
+        """Seconds until the queue ahead has likely drained, from the average service time"""
+        admitted = self.counters['admitted']
+        average = self.total_service_seconds / admitted if admitted else self.max_wait
+        return max(1, math.ceil(average * (self.waiting + 1) / self.limit))
+
+    def _acquire(self, deadline):
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                self.counters['admitted'] += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.counters['rejected_queue_full'] += 1
+                raise StageOverloaded(self.name, 'queue_full', self._retry_after())
+            budget = self.max_wait if deadline is None else min(self.max_wait, deadline.remaining())
+            self.waiting += 1
+            self.counters['queued'] += 1
+            started_at = time.monotonic()
+            try:
+                admitted = self._condition.wait_for(lambda: self.active < self.limit, timeout=budget)
+            finally:
+                self.waiting -= 1
+            waited = time.monotonic() - started_at
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+            if not admitted:
+                self.counters['rejected_wait'] += 1
+                raise StageOverloaded(self.name, 'wait_exceeded', self._retry_after())
+            self.active += 1
+            self.counters['admitted'] += 1
+
+    def _release(self, service_seconds):
+        with self._condition:
+            self.active -= 1
+            self.total_service_seconds += service_seconds
+            self._condition.notify()
+
+    @contextmanager
+    def admit(self, deadline=None):
+        """Hold one of the stage's slots for the duration of the block"""
+        self._acquire(deadline)
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - started_at)
+
+    def snapshot(self):
+        with self._condition:
+            admitted = self.counters['admitted']
+            queued = self.counters['queued']
+            return {
+                'limit': self.limit,
+                'active': self.active,
+                'waiting': self.waiting,
+                'max_queue': self.max_queue,
+                'saturation': round(self.active / self.limit, 3),
+                **self.counters,
+                'avg_wait_ms': round(self.total_wait_seconds / queued * 1000, 1) if queued else 0.0,
+                'max_wait_ms': round(self.max_wait_seconds * 1000, 1),
+                'avg_service_ms': round(self.total_service_seconds / admitted * 1000, 1) if admitted else 0.0
+            }
+
+class OpenGate:
+    """Stand-in when admission control is disabled"""
+
+    @contextmanager
+    def admit(self, deadline=None):
+        yield
+
+    def snapshot(self):
+        return {'enabled': False}
+
+_gates = {}
+_gates_lock = threading.Lock()
+
+def get_gate(stage):
+    """Process-wide gate for a stage, created on first use"""
+    with _gates_lock:
+        if stage not in _gates:
+            _gates[stage] = StageGate(stage, *STAGE_LIMITS[stage]) if ADMISSION_ENABLED else OpenGate()
+        return _gates[stage]
+
+def gates_snapshot():
+    return {stage: get_gate(stage).snapshot() for stage in STAGE_LIMITS}
+
+class GatedEncoder:
+    """Embedding model wrapper whose encode() goes through the embedding gate
+
+    encode() also holds a per-model lock, so concurrent request threads are safe
+    even with ADMISSION_ENABLED=false or a raised EMBED_CONCURRENCY.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+
+    def encode(self, *args, **kwargs):
+        with get_gate('embedding').admit():
+            with self._lock:
+                return self.model.encode(*args, **kwargs)
+
+    def __getattr__(self, attr):
+        return getattr(self.model, attr)
@@ -0,0 +1,155 @@
+"""
+Answer Jobs
+Optional asynchronous answer generation: /api/search returns a job ID with the
+sources and MCQs, and the LLM call runs on a small pool of worker threads.
+
+Jobs wait in a bounded priority queue (lower number = sooner, FIFO within a
+priority). When it is full, submit() raises QueueFullError, and the API answers
+503 right away instead of piling requests onto Groq. Job records live in the
+shared response cache, so a client can poll any gunicorn worker. Long-polls are
+woken as soon as the job finishes when they hit the worker that ran it.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+
+LLM_WORKERS = int(os.getenv('LLM_WORKERS', 2))
+JOB_QUEUE_MAX_DEPTH = int(os.getenv('JOB_QUEUE_MAX_DEPTH', 32))
+JOB_MAX_QUEUE_SECONDS = float(os.getenv('JOB_MAX_QUEUE_SECONDS', 60))  # queued longer -> expired
+JOB_RESULT_TTL_SECONDS = int(os.getenv('JOB_RESULT_TTL_SECONDS', 600))
+JOB_LONG_POLL_MAX_SECONDS = float(os.getenv('JOB_LONG_POLL_MAX_SECONDS', 25))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at its maximum depth"""
+
+    def __init__(self, depth, retry_after):
+        super().__init__(f"Answer queue is full ({depth} jobs waiting)")
+        self.depth = depth
+        self.retry_after = retry_after
+
+class JobQueue:
+    """Bounded priority queue drained by a fixed pool of worker threads
+
+    handler(payload) returns the job result; job records are written to
+    `store` (a response cache) under "job:<id>".
+    """
+
+    def __init__(self, handler, store, workers=LLM_WORKERS, max_depth=JOB_QUEUE_MAX_DEPTH):
+        self.handler = handler
+        self.store = store
+        self.workers = workers
+        self.max_depth = max_depth
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._events = {}  # job id -> Event, for long-polls in this process
+        self._threads = []
+        self.running = 0
+        self.counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'expired': 0, 'rejected': 0}
+        self.total_run_seconds = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for number in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'llm-worker-{number}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _save(self, record):
+        self.store.set(f"job:{record['job_id']}", record, JOB_RESULT_TTL_SECONDS, tags=('jobs',))
+
+    def full(self):
+        return self._queue.qsize() >= self.max_depth
+
+    def queue_full_error(self):
+        """QueueFullError with a Retry-After estimated from the average run time"""
+        with self._lock:
+            self.counters['rejected'] += 1
+            finished = self.counters['completed'] + self.counters['failed']
+            average = self.total_run_seconds / finished if finished else 5.0
+        depth = self._queue.qsize()
+        return QueueFullError(depth, max(1, int(depth * average / max(1, self.workers))))
+
+    def submit(self, payload, priority=5, initial=None):
+        """Queue a job and return its record; raises QueueFullError when at max depth"""
+        self.start()
+        with self._lock:
+            accepted = self._queue.qsize() < self.max_depth
+            if accepted:
+                self.counters['submitted'] += 1
+                job_id = uuid.uuid4().hex
+                self._events[job_id] = threading.Event()
+                record = dict(initial or {}, job_id=job_id, status=QUEUED, created_at=time.time(), priority=priority)
+                # Saved before it is queued so a fast worker can't overwrite a later status
+                self._save(record)
+                self._queue.put((priority, next(self._sequence), job_id, payload, record))
+        if not accepted:
+            raise self.queue_full_error()
+        return record
+
+    def _work(self):
+        while True:
+            _, _, job_id, payload, record = self._queue.get()
+            if time.time() - record['created_at'] > JOB_MAX_QUEUE_SECONDS:
+                self._finish(dict(record, status=FAILED, error='expired'), 'expired')
+                continue
+            with self._lock:
+                self.running += 1
+            started_at = time.monotonic()
+            self._save(dict(record, status=RUNNING, started_at=time.time()))
+            try:
+                result = self.handler(payload)
+                self._finish(dict(record, status=DONE, result=result, finished_at=time.time()), 'completed')
+            except Exception as e:
+                print(f"⚠️ Answer job {job_id} failed: {e}")
+                self._finish(dict(record, status=FAILED, error=str(e)[:200], finished_at=time.time()), 'failed')
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.total_run_seconds += time.monotonic() - started_at
+
+    def _finish(self, record, outcome):
+        self._save(record)
+        with self._lock:
+            self.counters[outcome] += 1
+            event = self._events.pop(record['job_id'], None)
+        if event is not None:
+            event.set()
+
+    def get(self, job_id, wait=0):
+        """Job record (None when unknown or expired); waits up to `wait` seconds for it to finish"""
+        deadline = time.monotonic() + min(wait, JOB_LONG_POLL_MAX_SECONDS)
+        while True:
+            record = self.store.get(f"job:{job_id}", shared=True)
+            remaining = deadline - time.monotonic()
+            if record is None or record['status'] in (DONE, FAILED) or remaining <= 0:
+                return record
+            with self._lock:
+                event = self._events.get(job_id)
+            if event is not None:
+                # Ran here: wake up as soon as it is done
+                event.wait(remaining)
+            else:
+                # Running in another worker: poll the shared store
+                time.sleep(min(0.25, remaining))
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'running': self.running,
+                'queued': self._queue.qsize(),
+                'max_depth': self.max_depth,
+                **self.counters
+            }
@@ -4,19 +4,36 @@ Updated Flask Backend for React Frontend
 Flask API providing backend services for the React chat interface
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response, g
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import os
 import json
 import time
 import hashlib
-from groq import Groq
-from pinecone import Pinecone, ServerlessSpec
-from sentence_transformers import SentenceTransformer
+import gzip
 import threading
 import uuid
 from functools import wraps
 import traceback
+from clients import create_pinecone_indexes, create_groq_client, metrics_snapshot
+from circuit_breaker import CircuitOpenError, get_breaker, breakers_snapshot, any_open
+from health_checks import DependencyChecker
+from lexical_index import LexicalIndexes, reciprocal_rank_fusion
+from pyq_dedup import PyqClusters
+from pyq_schema import typed_fields
+from single_flight import SingleFlight, normalize_query
+from response_cache import get_cache, TieredCache, LRUTier, create_back_tier, content_versions
+from startup import InitTracker, INIT_RETRY_AFTER_SECONDS
+from traffic_capture import TrafficRecorder
+from request_profiler import RequestProfiler
+from answer_jobs import JobQueue, QueueFullError, JOB_RESULT_TTL_SECONDS
+from admission import StageOverloaded, GatedEncoder, get_gate, gates_snapshot
+from dashboard_stats import StatsStore, make_event, DASHBOARD_MAX_BATCH
+from namespace_router import NamespaceRouter, NAMESPACE_ROUTING
+from rate_limiter import SlidingWindowLimiter
+# groq, pinecone and sentence_transformers (torch) are imported where they are first
+# used, so the process serves requests while the models load in the background
 
 # Optional dotenv - for local development only
 try:
@@ -25,7 +42,82 @@ try:
 except ImportError:
     pass  # On production, env vars are set directly
 
+# Optional brotli - gzip is used when it is not installed
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Optional orjson - stdlib json is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, falling back to the stdlib provider"""
+    
+    def _orjson_options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    def dumps(self, obj, **kwargs):
+        # Custom stdlib arguments (cls, indent, ...) are only honoured by the stdlib path
+        if orjson is not None and not kwargs:
+            try:
+                return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+            except TypeError:
+                pass  # e.g. integers beyond 64 bits
+        return super().dumps(obj, **kwargs)
+    
+    def loads(self, s, **kwargs):
+        if orjson is not None and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+    
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+def json_loads(data):
+    """Decode a JSON string or bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def parse_full_json(metadata):
+    """Decode the full_json_str blob of a PYQ record, returns {} when missing or invalid"""
+    raw = metadata.get('full_json_str')
+    if not raw:
+        return {}
+    try:
+        data = json_loads(raw)
+    except ValueError as e:  # json.JSONDecodeError and orjson.JSONDecodeError
+        print(f"⚠️ Error parsing full_json_str: {e}")
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def pyq_fields(metadata):
+    """Fields of a PYQ record: typed top-level metadata when load_pyqs.py wrote it,
+    otherwise the decoded full_json_str blob (readers fall back to metadata either way)"""
+    fields = typed_fields(metadata)
+    return fields if fields is not None else parse_full_json(metadata)
+
 app = Flask(__name__)
+app.json_provider_class = FastJSONProvider
+app.json = FastJSONProvider(app)
 
 # Production-ready CORS configuration
 # Get allowed origins from environment variable or use defaults
@@ -40,7 +132,7 @@ if os.getenv('FLASK_ENV') == 'production':
 CORS(app, 
      origins=ALLOWED_ORIGINS,
      methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Origin"],
+     allow_headers=["Content-Type", "Authorization", "Access-Control-Allow-Origin", "X-Response-Format"],
      supports_credentials=True)
 
 # Configure production logging
@@ -58,50 +150,247 @@ else:
     )
     app.logger.setLevel(logging.DEBUG)
 
-# Global variables to store initialized components
+# Global variables to store initialized components. Request threads only read them: the init
+# thread builds search_components privately and publishes it with a single assignment, and every
+# object below does its own locking, so gthread workers can share them.
 search_components = {}
 system_initialized = False
-rate_limit_storage = {}
+models_warm = False  # Set once both embedding models have served a first encode
+init_tracker = InitTracker()  # Background initialization state, gates the model routes
+rate_limiter = SlidingWindowLimiter()  # Per-endpoint, per-client request windows
+dependency_checker = DependencyChecker()
+lexical_indexes = LexicalIndexes()  # BM25 indexes for lexical/hybrid search, loaded in background
+pyq_clusters = PyqClusters()  # Near-duplicate PYQ clusters from pyq_dedup.py
+namespace_router = None  # NCERT query -> namespace router from namespace_router.py, None until built
+search_flight = SingleFlight()  # Coalesces identical in-flight /api/search requests
+pyq_filters_flight = SingleFlight()  # Coalesces concurrent /api/pyq/filters sampling
+response_cache = get_cache()  # LRU front tier over the host-shared SQLite/Redis tier
+
+# Request deadlines - keep SEARCH_DEADLINE_SECONDS well below gunicorn's --timeout
+SEARCH_DEADLINE_SECONDS = float(os.getenv('SEARCH_DEADLINE_SECONDS', 30))
+PINECONE_TIMEOUT_SECONDS = float(os.getenv('PINECONE_TIMEOUT_SECONDS', 5))
+GROQ_TIMEOUT_SECONDS = float(os.getenv('GROQ_TIMEOUT_SECONDS', 20))
+JOB_DEADLINE_SECONDS = float(os.getenv('JOB_DEADLINE_SECONDS', SEARCH_DEADLINE_SECONDS))  # Generation budget of an answer job
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage starts after the request deadline has passed"""
+    
+    def __init__(self, stage):
+        super().__init__(f"Deadline exceeded before {stage}")
+        self.stage = stage
+
+class Deadline:
+    """Per-request time budget carried through every stage of a request"""
+    
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + seconds
+    
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def elapsed(self):
+        return time.monotonic() - self.started_at
+    
+    def expired(self):
+        return self.remaining() <= 0
+    
+    def budget(self, cap, stage="next stage"):
+        """Time available for one call: the remaining budget, capped at `cap` seconds"""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(stage)
+        return min(cap, remaining)
+
+def pinecone_timeout(deadline=None, stage="pinecone query"):
+    """Request timeout kwargs for a Pinecone call, bounded by the deadline when given
+    
+    The deadline itself is passed along so retries stop when it runs out.
+    """
+    if deadline is None:
+        return {'_request_timeout': PINECONE_TIMEOUT_SECONDS}
+    return {'_request_timeout': deadline.budget(PINECONE_TIMEOUT_SECONDS, stage), '_deadline': deadline}
 
 def rate_limit(max_requests=10, window_seconds=60):
-    """Simple rate limiting decorator"""
+    """Simple rate limiting decorator (limits are counted per endpoint and client IP)"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            client_ip = request.remote_addr
-            current_time = time.time()
-            
-            # Clean old entries
-            if client_ip in rate_limit_storage:
-                rate_limit_storage[client_ip] = [
-                    timestamp for timestamp in rate_limit_storage[client_ip]
-                    if current_time - timestamp < window_seconds
-                ]
-            else:
-                rate_limit_storage[client_ip] = []
-            
-            # Check rate limit
-            if len(rate_limit_storage[client_ip]) >= max_requests:
+            # Check and record under the limiter's lock
+            if not rate_limiter.hit((f.__name__, request.remote_addr), max_requests, window_seconds):
                 return jsonify({
                     'error': 'Rate limit exceeded',
                     'message': f'Maximum {max_requests} requests per {window_seconds} seconds'
                 }), 429
             
-            # Add current request
-            rate_limit_storage[client_ip].append(current_time)
-            
             return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+# HTTP caching for catalog endpoints - the version combines vector counts with the content
+# version the ingestion scripts record; bump CATALOG_VERSION when ingesting from another host
+CATALOG_MAX_AGE_SECONDS = int(os.getenv('CATALOG_MAX_AGE_SECONDS', 300))
+CATALOG_VERSION = os.getenv('CATALOG_VERSION', '1')
+PINECONE_INDEX_NAMES = {'rag_index': 'ncert', 'mcq_index': 'pyq-1'}
+
+def index_version(index_names):
+    """Content version of the given indexes from the cached index stats, None when unknown"""
+    parts = [CATALOG_VERSION]
+    versions = content_versions()
+    for name in index_names:
+        result = dependency_checker.result(name)
+        details = (result or {}).get('details') or (result or {}).get('last_healthy_details')
+        if not details:
+            return None
+        namespaces = details.get('namespaces', {})
+        parts.append(name + ":" + ",".join(f"{ns}={count}" for ns, count in sorted(namespaces.items())))
+        parts.append(str(versions.get(PINECONE_INDEX_NAMES[name], '')))
+    return "|".join(parts)
+
+# Response cache lifetimes - entries are also keyed by index version, so new data misses anyway
+ANSWER_CACHE_TTL_SECONDS = int(os.getenv('ANSWER_CACHE_TTL_SECONDS', 6 * 3600))
+MCQ_CACHE_TTL_SECONDS = int(os.getenv('MCQ_CACHE_TTL_SECONDS', 3600))
+CATALOG_CACHE_TTL_SECONDS = int(os.getenv('CATALOG_CACHE_TTL_SECONDS', 3600))
+
+def versioned_cache_key(kind, index_names, *parts):
+    """Response cache key tied to the index version, None (don't cache) while it is unknown"""
+    version = index_version(index_names)
+    if version is None:
+        return None
+    digest = hashlib.sha1("|".join([version] + [str(part) for part in parts]).encode('utf-8')).hexdigest()
+    return f"{kind}:{digest}"
+
+def mark_degraded():
+    """Called by an http_cached view answering with fallback data: the response gets no ETag and isn't cached"""
+    g.catalog_degraded = True
+
+def http_cached(index_names, max_age=CATALOG_MAX_AGE_SECONDS):
+    """ETag + Cache-Control for responses that only change when the indexes change
+    
+    The ETag is derived from the index content version and the request URL, so a
+    matching If-None-Match is answered with 304 before the view does any work.
+    200 bodies are kept in the response cache under the ETag, so other clients
+    (and other workers) are served without calling the view either - except
+    those of views that called mark_degraded().
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            version = index_version(index_names)
+            if version is None:
+                # Index stats not known yet - serve uncached rather than risk a stale validator
+                return f(*args, **kwargs)
+            
+            query_string = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+            etag = hashlib.sha1(f"{request.path}?{query_string}|{version}".encode()).hexdigest()[:20]
+            cache_control = f"public, max-age={max_age}, stale-while-revalidate={max_age * 2}"
+            
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+            else:
+                cache_key = f"catalog:{etag}"
+                body = response_cache.get(cache_key)
+                if body is not None:
+                    response = make_response(body, 200, {'Content-Type': 'application/json'})
+                else:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200 or g.pop('catalog_degraded', False):
+                        return response
+                    response_cache.set(cache_key, response.get_data(as_text=True), CATALOG_CACHE_TTL_SECONDS, tags=('catalog',))
+            
+            # Weak validator: gzip/brotli/identity bodies share it
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = cache_control
+            return response
+        return decorated_function
+    return decorator
+
+# Response compression settings (bodies smaller than the threshold are sent as-is)
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+COMPRESSIBLE_MIMETYPES = {'application/json', 'text/html', 'text/plain', 'text/css', 'application/javascript'}
+
+# Opt-in traffic capture for replay_traffic.py (set TRAFFIC_CAPTURE_PATH); registered before
+# the after_request hook below, so recorded durations include compression
+traffic_recorder = TrafficRecorder.from_env()
+if traffic_recorder is not None:
+    traffic_recorder.init_app(app)
+
+# Opt-in request profiling (PROFILE_TOKEN / PROFILE_SAMPLE_RATE) - no hooks at all when off
+request_profiler = RequestProfiler.from_env()
+if request_profiler is not None:
+    request_profiler.init_app(app)
+
 @app.after_request
 def after_request(response):
     """Add CORS headers to all responses"""
     response.headers.add('Access-Control-Allow-Origin', '*')
     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
+    return compress_response(response)
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported content encoding from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name] = quality
+    
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', 0) > 0:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """Compress response bodies above COMPRESS_MIN_SIZE with brotli or gzip"""
+    if (response.direct_passthrough
+            or response.status_code < 200
+            or response.status_code in (204, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if not encoding:
+        return response
+    
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_SIZE:
+        return response
+    
+    if encoding == 'br':
+        # Brotli quality runs 0-11, map the shared level onto it
+        compressed = brotli.compress(body, quality=min(COMPRESS_LEVEL + 1, 11))
+    else:
+        compressed = gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+    
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    response.headers['Content-Length'] = str(len(compressed))
     return response
 
+def wants_compact(data=None):
+    """Check whether the client opted into the compact response schema"""
+    flag = request.args.get('compact') or request.headers.get('X-Response-Format')
+    if flag is None and data:
+        flag = data.get('compact')
+    if isinstance(flag, str):
+        return flag.strip().lower() in ('1', 'true', 'yes', 'compact')
+    return bool(flag)
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -113,6 +402,19 @@ def internal_error(error):
         'message': 'An unexpected error occurred'
     }), 500
 
+@app.errorhandler(StageOverloaded)
+def stage_overloaded(e):
+    """Load shedding: a saturated stage rejects the request instead of queueing it"""
+    response = jsonify({
+        'error': 'Server is busy',
+        'message': f"Too many requests in the {e.stage} stage, retry in {e.retry_after}s",
+        'stage': e.stage,
+        'reason': e.reason
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     app.logger.error(f'Unhandled exception: {str(e)}')
@@ -152,10 +454,34 @@ def load_api_keys():
 
     return groq_api_key, pine_api_key
 
+def index_stats_check(index):
+    """Dependency check for a Pinecone index: vector counts per namespace"""
+    def check():
+        stats = index.describe_index_stats(**pinecone_timeout())
+        namespaces = stats.namespaces if stats.namespaces else {}
+        return {
+            'total_vectors': stats.total_vector_count,
+            'namespaces': {name: ns_stats.vector_count for name, ns_stats in namespaces.items()}
+        }
+    return check
+
+def warm_up_models(components):
+    """Run a first encode on each model so the first user request doesn't pay for it"""
+    for key in ('rag_model', 'mcq_model'):
+        if key in components:
+            components[key].encode(["warm up"])
+
 def initialize_search_system():
-    """Initialize all components needed for search"""
-    global search_components, system_initialized
+    """Initialize all components needed for search
+    
+    Runs on the search-init thread (see start_background_init). Returns True when
+    every component came up, False when some are missing (degraded). Components
+    are collected in a local dict and published in one assignment at the end, so
+    request threads never see a half-built search_components.
+    """
+    global search_components, system_initialized, models_warm, pyq_clusters, namespace_router
     
+    components = {}
     is_production = os.getenv('FLASK_ENV') == 'production'
     
     try:
@@ -170,22 +496,25 @@ def initialize_search_system():
         # Initialize components only if API keys are available
         if pine_api_key:
             try:
-                # Initialize Pinecone for RAG
-                pc_rag = Pinecone(api_key=pine_api_key)
+                # One pooled Pinecone client shared by the RAG and MCQ indexes
                 rag_index_name = "ncert"
-                rag_index = pc_rag.Index(rag_index_name)
-                rag_model = SentenceTransformer("all-MiniLM-L6-v2")
-                
-                # Initialize Pinecone for MCQ
-                pc_mcq = Pinecone(api_key=pine_api_key)
                 mcq_index_name = 'pyq-1'
-                mcq_index = pc_mcq.Index(mcq_index_name)
-                mcq_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
+                with init_tracker.track('pinecone'):
+                    indexes = create_pinecone_indexes(pine_api_key, [rag_index_name, mcq_index_name])
+                rag_index = indexes[rag_index_name]
+                mcq_index = indexes[mcq_index_name]
+                
+                # RAG and MCQ search use the same model - load it once and share it
+                with init_tracker.track('embedding_model'):
+                    from sentence_transformers import SentenceTransformer
+                    embedding_model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2', device='cpu')
+                # Every encode() takes a slot of the 'embedding' admission gate
+                rag_model = mcq_model = GatedEncoder(embedding_model)
                 
-                search_components['rag_index'] = rag_index
-                search_components['rag_model'] = rag_model
-                search_components['mcq_index'] = mcq_index
-                search_components['mcq_model'] = mcq_model
+                components['rag_index'] = rag_index
+                components['rag_model'] = rag_model
+                components['mcq_index'] = mcq_index
+                components['mcq_model'] = mcq_model
                 
                 if is_production:
                     app.logger.info("✅ Pinecone components initialized")
@@ -201,8 +530,9 @@ def initialize_search_system():
         # Initialize Groq client for response generation
         if groq_api_key:
             try:
-                client = Groq(api_key=groq_api_key)
-                search_components['client'] = client
+                with init_tracker.track('groq'):
+                    client = create_groq_client(groq_api_key, GROQ_TIMEOUT_SECONDS)
+                components['client'] = client
                 
                 if is_production:
                     app.logger.info("✅ Groq client initialized")
@@ -215,39 +545,112 @@ def initialize_search_system():
                 else:
                     print(error_msg)
         
+        if 'rag_model' in components:
+            with init_tracker.track('warm_up'):
+                warm_up_models(components)
+        
+        # Dependency status is refreshed in the background and read by the health probes
+        if 'rag_index' in components:
+            dependency_checker.register('rag_index', index_stats_check(components['rag_index']))
+        if 'mcq_index' in components:
+            dependency_checker.register('mcq_index', index_stats_check(components['mcq_index']))
+        dependency_checker.start()
+        
+        # Lexical indexes load from disk (or build from Pinecone) without blocking startup
+        lexical_sources = {}
+        if 'mcq_index' in components:
+            mcq_index = components['mcq_index']
+            lexical_sources['pyq'] = (mcq_index, lambda: list(mcq_index.describe_index_stats(**pinecone_timeout()).namespaces.keys()))
+        if 'rag_index' in components:
+            lexical_sources['ncert'] = (components['rag_index'], RAG_NAMESPACES)
+        lexical_indexes.load_in_background(lexical_sources)
+        
+        # Near-duplicate PYQ clusters (empty when pyq_dedup.py hasn't been run)
+        try:
+            pyq_clusters = PyqClusters.load()
+        except Exception as e:
+            print(f"⚠️  Failed to load PYQ clusters: {e}")
+        
+        # Namespace centroids (None when namespace_router.py build hasn't been run)
+        if NAMESPACE_ROUTING:
+            try:
+                namespace_router = NamespaceRouter.load()
+            except Exception as e:
+                print(f"⚠️  Failed to load namespace router: {e}")
+        
+        search_components = components
+        models_warm = 'rag_model' in components
         system_initialized = True
-        success_msg = "✅ Search system initialized successfully"
+        complete = all(key in components for key in ('rag_index', 'mcq_index', 'client'))
+        success_msg = "✅ Search system initialized successfully" if complete else "⚠️  Search system initialized with missing components"
         if is_production:
             app.logger.info(success_msg)
         else:
             print(success_msg)
-        return True
+        return complete
     except Exception as e:
         error_msg = f"❌ Failed to initialize search system: {str(e)}"
         if is_production:
             app.logger.error(error_msg)
         else:
             print(error_msg)
+        search_components = components
         system_initialized = True  # Still mark as initialized to allow API endpoints to work
-        return False
+        raise
+
+# Start initialization when the module is imported (gunicorn workers); set BACKGROUND_INIT=false
+# to import the app without loading anything (e.g. profile_startup.py)
+BACKGROUND_INIT = os.getenv('BACKGROUND_INIT', 'true').lower() in ('1', 'true', 'yes')
+
+def start_background_init():
+    """Initialize the search system on a background thread (once per process)"""
+    if init_tracker.start(initialize_search_system):
+        print(f"🔧 Search system loading in the background (pid {os.getpid()})")
+
+def requires_models(f):
+    """Fast 503 with Retry-After while the search system is still loading"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not init_tracker.finished:
+            response = jsonify({
+                "error": "Search system is starting",
+                "message": f"Models are loading, retry in {INIT_RETRY_AFTER_SECONDS}s",
+                "init": init_tracker.snapshot()
+            })
+            response.status_code = 503
+            response.headers['Retry-After'] = str(INIT_RETRY_AFTER_SECONDS)
+            return response
+        return f(*args, **kwargs)
+    return decorated_function
 
 # Search functions (adapted from search_query.py)
-def semantic_search(index, model, query: str, n_results: int = 2, namespace: str = ""):
+# Extra candidates fetched per namespace so low-relevance queries can widen
+# their context from the same pool instead of issuing another query
+BROADER_SEARCH_EXTRA = 3
+# Below these best raw scores the context is widened: vector cosine similarity, or the
+# unscaled BM25 score in lexical mode (lexical candidates are scaled so the top hit is 1)
+LOW_RELEVANCE_SIMILARITY = float(os.getenv('LOW_RELEVANCE_SIMILARITY', 0.3))
+LOW_RELEVANCE_BM25 = float(os.getenv('LOW_RELEVANCE_BM25', 3.0))
+
+def semantic_search(index, model, query: str, n_results: int = 2, namespace: str = "", query_embedding=None, deadline=None):
     """Perform semantic search on Pinecone index"""
-    query_embedding = model.encode([query]).tolist()[0]
+    if query_embedding is None:
+        query_embedding = model.encode([query]).tolist()[0]
     
     if namespace:
         results = index.query(
             vector=query_embedding,
             top_k=n_results,
             include_metadata=True,
-            namespace=namespace
+            namespace=namespace,
+            **pinecone_timeout(deadline, f"searching {namespace}")
         )
     else:
         results = index.query(
             vector=query_embedding,
             top_k=n_results,
-            include_metadata=True
+            include_metadata=True,
+            **pinecone_timeout(deadline)
         )
     return results
 
@@ -289,6 +692,51 @@ def get_context_with_sources(results):
     
     return context, sources
 
+def compact_source(source):
+    """Compact source schema: one copy of the text and no empty fields"""
+    compact = {
+        'source': source.get('source'),
+        'chunk': source.get('chunk'),
+        'score': source.get('score'),
+        'text': source.get('full_text', '')
+    }
+    for key in ('subject', 'class', 'unit', 'chapter', 'chapter_name', 'topic', 'hierarchy'):
+        if source.get(key):
+            compact[key] = source[key]
+    # Only keep content when it actually differs from the chunk text
+    if source.get('content') and source['content'] != compact['text']:
+        compact['content'] = source['content']
+    return compact
+
+def compact_mcq(mcq):
+    """Compact MCQ schema: canonical field names only, no metadata copy or aliases"""
+    compact = {
+        'id': mcq.get('id'),
+        'question': mcq.get('question', ''),
+        'options': mcq.get('options', []),
+        'correct_answer': mcq.get('correct_answer'),
+        'exam_name': mcq.get('exam_name', ''),
+        'exam_year': mcq.get('exam_year', mcq.get('year', '')),
+        'exam_term': mcq.get('exam_term', mcq.get('term', '')),
+        'subject': mcq.get('subject', '')
+    }
+    
+    # The answer text is derivable from options + correct_answer unless it differs
+    answer_text = mcq.get('correct_answer_text')
+    index = compact['correct_answer']
+    if answer_text and not (index is not None and index < len(compact['options']) and compact['options'][index] == answer_text):
+        compact['correct_answer_text'] = answer_text
+    
+    for key in ('explanation', 'topic', 'namespace', 'occurrences'):
+        if mcq.get(key):
+            compact[key] = mcq[key]
+    if 'similarity' in mcq:
+        compact['similarity'] = mcq['similarity']
+    elif 'score' in mcq:
+        compact['score'] = round(mcq['score'], 3)
+    
+    return {key: value for key, value in compact.items() if value not in ('', None) or key == 'correct_answer'}
+
 def get_prompt(context: str, query: str):
     """Generate enhanced prompt for LLM with better instruction clarity"""
     
@@ -334,12 +782,86 @@ def get_prompt(context: str, query: str):
     
     return prompt
 
+PARTIAL_RESPONSE_MESSAGE = (
+    "The AI answer could not be generated in time. "
+    "Here are the most relevant sources and practice questions for your query - please try again for a full answer."
+)
+
+def is_groq_failure(exc, cut_short=False):
+    """Groq errors that say the service is unhealthy (not a bad request on our side)
+    
+    A timeout doesn't count when cut_short: the request deadline clamped the call
+    below GROQ_TIMEOUT_SECONDS, so it says nothing about Groq's health.
+    """
+    from groq import APIConnectionError, APIStatusError, APITimeoutError
+    if isinstance(exc, APITimeoutError):
+        return not cut_short
+    if isinstance(exc, APIConnectionError):
+        return True
+    return isinstance(exc, APIStatusError) and (exc.status_code == 429 or exc.status_code >= 500)
+
+def generate_answer(context: str, query: str, deadline=None):
+    """Generate the RAG answer with Groq, bounded by the request deadline
+    
+    Raises CircuitOpenError without calling Groq while its breaker is open, and
+    StageOverloaded when no 'llm' admission slot frees up in time.
+    """
+    prompt = get_prompt(context, query)
+    with get_gate('llm').admit(deadline):
+        # Budget taken after admission, so time spent queued for a slot counts against it
+        timeout = deadline.budget(GROQ_TIMEOUT_SECONDS, "answer generation") if deadline else GROQ_TIMEOUT_SECONDS
+        cut_short = timeout < GROQ_TIMEOUT_SECONDS
+        return get_breaker('groq').call(_create_completion, prompt, timeout, is_failure=lambda e: is_groq_failure(e, cut_short))
+
+def _create_completion(prompt: str, timeout: float):
+    # No client-side retries: a retry would run past the deadline
+    chat_completion = search_components['client'].with_options(max_retries=0).chat.completions.create(
+        messages=[
+            {
+                "role": "system",
+                "content": "You are an expert educational assistant for NCERT content and competitive exam preparation. Provide detailed, accurate, and well-structured responses to help students learn effectively."
+            },
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model="llama-3.1-8b-instant",  # Reliable and fast Groq model
+        max_tokens=1500,  # Increased for more detailed responses
+        temperature=0.3,  # Lower temperature for more focused, accurate responses
+        top_p=0.9,       # Better coherence
+        timeout=timeout
+    )
+    return chat_completion.choices[0].message.content
+
+@app.route("/api/health/live", methods=["GET"])
+def liveness_check():
+    """Liveness probe - constant time, no dependency calls"""
+    return jsonify({"status": "alive", "pid": os.getpid(), "timestamp": time.time()}), 200
+
+@app.route("/api/health/ready", methods=["GET"])
+def readiness_check():
+    """Readiness probe - ready once models are loaded and warm, dependencies read from cache"""
+    ready = system_initialized and models_warm
+    dependencies = dependency_checker.results()
+    return jsonify({
+        "ready": ready,
+        "models_warm": models_warm,
+        "system_initialized": system_initialized,
+        "init": init_tracker.snapshot(),
+        "degraded": not dependency_checker.all_healthy() or any_open(),
+        "dependencies": dependencies,
+        "timestamp": time.time()
+    }), 200 if ready else 503
+
 @app.route("/api/health", methods=["GET"])
 def health_check():
-    """Enhanced health check endpoint"""
+    """Enhanced health check endpoint (dependency status comes from the background checker)"""
     health_status = {
         "status": "healthy",
         "system_initialized": system_initialized,
+        "models_warm": models_warm,
+        "init": init_tracker.snapshot(),
         "timestamp": time.time(),
         "version": "1.0.0"
     }
@@ -348,42 +870,83 @@ def health_check():
     components = {}
     
     if system_initialized:
-        try:
-            # Check Pinecone connection
-            if 'rag_index' in search_components:
-                rag_stats = search_components['rag_index'].describe_index_stats()
-                components['rag_index'] = {
-                    "status": "healthy",
-                    "total_vectors": rag_stats.total_vector_count
-                }
-            
-            if 'mcq_index' in search_components:
-                mcq_stats = search_components['mcq_index'].describe_index_stats()
-                components['mcq_index'] = {
-                    "status": "healthy", 
-                    "total_vectors": mcq_stats.total_vector_count
-                }
-            
-            # Check models
-            if 'rag_model' in search_components:
-                components['rag_model'] = {"status": "healthy"}
-            if 'mcq_model' in search_components:
-                components['mcq_model'] = {"status": "healthy"}
-            if 'client' in search_components:
-                components['groq_client'] = {"status": "healthy"}
-                
-        except Exception as e:
-            health_status["status"] = "degraded"
-            health_status["error"] = str(e)
+        for name in ('rag_index', 'mcq_index'):
+            result = dependency_checker.result(name)
+            if result is None:
+                continue
+            components[name] = {
+                "status": result['status'],
+                "checked_at": result['checked_at'],
+                "total_vectors": result.get('details', result.get('last_healthy_details', {})).get('total_vectors')
+            }
+            if result['status'] != 'healthy':
+                health_status["status"] = "degraded"
+                health_status["error"] = result.get('error')
+        
+        # Check models
+        if 'rag_model' in search_components:
+            components['rag_model'] = {"status": "healthy"}
+        if 'mcq_model' in search_components:
+            components['mcq_model'] = {"status": "healthy"}
+        if 'client' in search_components:
+            components['groq_client'] = {"status": "healthy"}
     else:
         health_status["status"] = "initializing"
     
     health_status["components"] = components
+    # Open breakers are reported but don't fail the probe: the app still serves fallbacks
+    health_status["dependencies"] = "degraded" if any_open() else "ok"
+    health_status["circuit_breakers"] = breakers_snapshot()
     
     status_code = 200 if health_status["status"] == "healthy" else 503
     return jsonify(health_status), status_code
 
+@app.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Connection pool and per-client request metrics for this worker"""
+    return jsonify({
+        **metrics_snapshot(),
+        "coalescing": {
+            "search": search_flight.snapshot(),
+            "pyq_filters": pyq_filters_flight.snapshot()
+        },
+        "cache": response_cache.stats(),
+        "answer_jobs": answer_job_queue.snapshot(),
+        "admission": gates_snapshot(),
+        "rate_limit": rate_limiter.snapshot(),
+        "dashboard": dashboard_stats.snapshot(),
+        "namespace_router": namespace_router.snapshot() if namespace_router is not None else None,
+        "traffic_capture": traffic_recorder.snapshot() if traffic_recorder is not None else None,
+        "profiling": request_profiler.snapshot() if request_profiler is not None else None,
+        "pid": os.getpid(),
+        "timestamp": time.time()
+    }), 200
+
+# /api/search parameters when the request leaves them out
+SEARCH_DEFAULTS = {
+    "n_results": 5,  # Increased from 3 to 5 for better context
+    "namespace": "",
+    "mcq_threshold": 0.25,  # Slightly increased for better MCQ matching
+    "mcq_limit": 8,  # Increased from 5 to 8 for more PYQs
+    "search_mode": "vector"  # vector | lexical | hybrid
+}
+
+def search_keys(query, n_results, namespace, mcq_threshold, mcq_limit, search_mode):
+    """(coalescing key, answer cache key) of a search - the answer key is None while the index version is unknown"""
+    coalesce_key = "|".join(str(part) for part in (
+        "search", normalize_query(query), n_results, namespace, mcq_threshold, mcq_limit, search_mode
+    ))
+    return coalesce_key, versioned_cache_key('answer', ('rag_index', 'mcq_index'), coalesce_key)
+
+def store_answer(answer_key, result, search_mode):
+    """Cache a complete answer; partial answers and lexical fallbacks are not worth keeping"""
+    if not answer_key or result['partial'] or result['search_mode'] != search_mode:
+        return False
+    response_cache.set(answer_key, result, ANSWER_CACHE_TTL_SECONDS, tags=('answers',))
+    return True
+
 @app.route("/api/search", methods=["POST"])
+@requires_models
 @rate_limit(max_requests=20, window_seconds=60)
 def search():
     """Handle search queries - return RAG response and related MCQs separately"""
@@ -413,10 +976,11 @@ def search():
         return jsonify({"error": "No JSON data provided"}), 400
     
     query = data.get("query", "")
-    n_results = data.get("n_results", 5)  # Increased from 3 to 5 for better context
-    namespace = data.get("namespace", "")
-    mcq_threshold = data.get("mcq_threshold", 0.25)  # Slightly increased for better MCQ matching
-    mcq_limit = data.get("mcq_limit", 8)  # Increased from 5 to 8 for more PYQs
+    n_results = data.get("n_results", SEARCH_DEFAULTS["n_results"])
+    namespace = data.get("namespace", SEARCH_DEFAULTS["namespace"])
+    mcq_threshold = data.get("mcq_threshold", SEARCH_DEFAULTS["mcq_threshold"])
+    mcq_limit = data.get("mcq_limit", SEARCH_DEFAULTS["mcq_limit"])
+    search_mode = data.get("search_mode", SEARCH_DEFAULTS["search_mode"])
     
     # Input validation
     if not query.strip():
@@ -429,102 +993,239 @@ def search():
         return jsonify({"error": "Query cannot be empty"}), 400
     
     try:
-        # Set a timeout for the entire operation
-        start_time = time.time()
-        timeout_seconds = 30  # 30 second timeout
-        
-        # RAG search for contextual answer
-        if namespace and namespace != "all":
-            rag_results = semantic_search(
-                search_components['rag_index'], 
-                search_components['rag_model'], 
-                query, 
-                n_results, 
-                namespace
-            )
-            context, sources = get_context_with_sources(rag_results)
+        # Identical concurrent searches share one retrieval + generation
+        coalesce_key, answer_key = search_keys(query, n_results, namespace, mcq_threshold, mcq_limit, search_mode)
+        result = response_cache.get(answer_key) if answer_key else None
+        shared = result is not None
+        if shared:
+            print(f"DEBUG: Answer cache hit for query: '{query[:50]}...'")
+            # The cached entry belongs to the request that produced it - answer with this request's query and time
+            result = dict(result, query=query, timestamp=time.time())
+        elif data.get("async"):
+            return submit_answer_job(data, query, n_results, namespace, mcq_threshold, mcq_limit, search_mode, answer_key)
         else:
-            # Search all namespaces
-            context, sources = search_all_namespaces(
-                search_components['rag_index'],
-                search_components['rag_model'],
-                query,
-                n_results
+            result, shared = search_flight.do(
+                coalesce_key, run_search, query, n_results, namespace, mcq_threshold, mcq_limit, search_mode
             )
+            if shared:
+                print(f"DEBUG: Coalesced search for query: '{query[:50]}...'")
+            else:
+                store_answer(answer_key, result, search_mode)
+            # The leader's result is shared - never mutate it in place
+            result = dict(result, query=query, timestamp=time.time())
         
-        # Check timeout
-        if time.time() - start_time > timeout_seconds:
-            return jsonify({"error": "Request timeout"}), 408
-        
-        # Debug logging for context quality
-        print(f"DEBUG: Retrieved {len(sources)} sources for query: '{query[:50]}...'")
-        print(f"DEBUG: Context length: {len(context)} characters")
-        if sources:
-            print(f"DEBUG: Best match score: {sources[0]['score']}")
-        
-        # Enhance context if it's too short or has low relevance scores
-        if len(context.strip()) < 100 or (sources and sources[0]['score'] < 0.3):
-            # Try searching with relaxed parameters
-            print("DEBUG: Context appears limited, trying broader search...")
-            try:
-                broader_results = semantic_search(
-                    search_components['rag_index'], 
-                    search_components['rag_model'], 
-                    query, 
-                    n_results + 3,  # Get more results
-                    ""  # Search all namespaces
-                )
-                broader_context, broader_sources = get_context_with_sources(broader_results)
-                if len(broader_context) > len(context):
-                    context = broader_context
-                    sources = broader_sources
-                    print(f"DEBUG: Using broader context with {len(broader_sources)} sources")
-            except Exception as e:
-                print(f"DEBUG: Broader search failed: {e}")
-        
-        # Generate RAG response using Groq with optimized parameters
-        prompt = get_prompt(context, query)
-        chat_completion = search_components['client'].chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert educational assistant for NCERT content and competitive exam preparation. Provide detailed, accurate, and well-structured responses to help students learn effectively."
-                },
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.1-8b-instant",  # Reliable and fast Groq model
-            max_tokens=1500,  # Increased for more detailed responses
-            temperature=0.3,  # Lower temperature for more focused, accurate responses
-            top_p=0.9,       # Better coherence
-        )
-        rag_response = chat_completion.choices[0].message.content
-        
-        # MCQ search for related questions
-        mcq_results = query_mcq(
-            search_components['mcq_index'],
-            search_components['mcq_model'],
-            query,
-            mcq_threshold,
-            mcq_limit
-        )
+        if wants_compact(data):
+            result = dict(result)
+            result['sources'] = [compact_source(source) for source in result['sources']]
+            result['mcq_results'] = [compact_mcq(mcq) for mcq in result['mcq_results']]
         
-        return jsonify({
-            "rag_response": rag_response,
-            "sources": sources,
-            "mcq_results": mcq_results,
-            "query": query,
-            "namespace_used": namespace if namespace else "all",
-            "timestamp": time.time()
-        }), 200
+        return jsonify(result), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error in search: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def queue_full_response(error):
+    response = jsonify({
+        "error": "Answer queue is full",
+        "message": f"Too many answers are being generated, retry in {error.retry_after}s",
+        "queue_depth": error.depth
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def submit_answer_job(data, query, n_results, namespace, mcq_threshold, mcq_limit, search_mode, answer_key):
+    """Job mode: retrieve now, queue the LLM answer and return 202 with the sources and MCQs"""
+    if answer_job_queue.full():
+        # Shed before retrieval - no point fetching sources for a job we can't queue
+        return queue_full_response(answer_job_queue.queue_full_error())
+    
+    retrieved = retrieve_for_search(
+        query, n_results, namespace, mcq_threshold, mcq_limit, search_mode, Deadline(SEARCH_DEADLINE_SECONDS)
+    )
+    try:
+        priority = min(9, max(0, int(data.get("priority", 5))))
+    except (TypeError, ValueError):
+        return jsonify({"error": "priority must be an integer between 0 and 9"}), 400
+    try:
+        job = answer_job_queue.submit(
+            {"retrieved": retrieved, "answer_key": answer_key, "search_mode": search_mode},
+            priority=priority,
+            initial={"query": query}
+        )
+    except QueueFullError as e:
+        return queue_full_response(e)
+    
+    sources, mcq_results = retrieved['sources'], retrieved['mcq_results']
+    if wants_compact(data):
+        sources = [compact_source(source) for source in sources]
+        mcq_results = [compact_mcq(mcq) for mcq in mcq_results]
+    response = jsonify({
+        "job_id": job['job_id'],
+        "status": job['status'],
+        "poll_url": f"/api/search/jobs/{job['job_id']}",
+        "sources": sources,
+        "mcq_results": mcq_results,
+        "query": query,
+        "namespace_used": retrieved['namespace_used'],
+        "search_mode": retrieved['search_mode'],
+        "timestamp": time.time()
+    })
+    response.status_code = 202
+    response.headers['Location'] = f"/api/search/jobs/{job['job_id']}"
+    return response
+
+def run_answer_job(payload):
+    """LLM worker: generate the answer on its own deadline and cache it like a synchronous search"""
+    result = answer_search(payload['retrieved'], Deadline(JOB_DEADLINE_SECONDS))
+    store_answer(payload['answer_key'], result, payload['search_mode'])
+    return result
+
+# Bounded LLM worker pool for job-mode searches. Job records need the shared tier even with CACHE_ENABLED=false
+answer_job_queue = JobQueue(
+    run_answer_job,
+    response_cache if isinstance(response_cache, TieredCache) else TieredCache(LRUTier(max_ttl=JOB_RESULT_TTL_SECONDS), create_back_tier())
+)
+
+@app.route("/api/search/jobs/<job_id>", methods=["GET"])
+@rate_limit(max_requests=120, window_seconds=60)
+def get_search_job(job_id):
+    """Poll an answer job; ?wait=N long-polls up to N seconds for it to finish"""
+    try:
+        wait = max(0.0, float(request.args.get('wait', 0)))
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+    
+    job = answer_job_queue.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    
+    if job.get('result') and wants_compact():
+        result = dict(job['result'])
+        result['sources'] = [compact_source(source) for source in result['sources']]
+        result['mcq_results'] = [compact_mcq(mcq) for mcq in result['mcq_results']]
+        job = dict(job, result=result)
+    
+    # 202 while queued/running so clients know to keep polling
+    status_code = 200 if job['status'] in ('done', 'failed') else 202
+    return jsonify(job), status_code
+
+def run_search(query, n_results, namespace, mcq_threshold, mcq_limit, search_mode):
+    """Retrieval, MCQ lookup and answer generation for one search (full schema)"""
+    # One deadline for the whole request, shared by every stage below
+    deadline = Deadline(SEARCH_DEADLINE_SECONDS)
+    retrieved = retrieve_for_search(query, n_results, namespace, mcq_threshold, mcq_limit, search_mode, deadline)
+    return answer_search(retrieved, deadline)
+
+def retrieve_for_search(query, n_results, namespace, mcq_threshold, mcq_limit, search_mode, deadline):
+    """Context, sources and related MCQs for a search - everything except the LLM answer"""
+    # Lexical/hybrid retrieval needs the BM25 index, otherwise fall back to vector search
+    ncert_lexical = lexical_indexes.get('ncert')
+    if search_mode not in ('lexical', 'hybrid') or ncert_lexical is None:
+        search_mode = 'vector'
+    
+    # RAG search for contextual answer - keep the over-fetched pool for the fallback
+    if search_mode == 'lexical':
+        candidates = lexical_candidates(ncert_lexical, query, n_results, namespace)
+        low_relevance = bool(candidates) and candidates[0]['bm25_score'] < LOW_RELEVANCE_BM25
+    else:
+        candidates = retrieve_candidates(
+            search_components['rag_index'],
+            search_components['rag_model'],
+            query,
+            n_results,
+            namespace,
+            deadline=deadline
+        )
+        # Judged on the vector pool alone, so hybrid mode never compares scores of different scales
+        low_relevance = bool(candidates) and candidates[0]['score'] < LOW_RELEVANCE_SIMILARITY
+        if search_mode == 'hybrid':
+            candidates = fuse_candidates(candidates, lexical_candidates(ncert_lexical, query, n_results, namespace))
+    context, sources = get_context_with_sources({'matches': candidates[:n_results]})
+    
+    # Debug logging for context quality
+    print(f"DEBUG: Retrieved {len(sources)} sources for query: '{query[:50]}...' in {deadline.elapsed():.2f}s")
+    print(f"DEBUG: Context length: {len(context)} characters")
+    if sources:
+        print(f"DEBUG: Best match score: {sources[0]['score']}")
+    
+    # Enhance context if it's too short or has low relevance scores
+    if len(context.strip()) < 100 or low_relevance:
+        # Widen the context from the already-fetched candidates (no new encode or query)
+        broader_matches = candidates[:n_results + BROADER_SEARCH_EXTRA]
+        if len(broader_matches) > len(sources):
+            print("DEBUG: Context appears limited, widening from candidate pool...")
+            broader_context, broader_sources = get_context_with_sources({'matches': broader_matches})
+            if len(broader_context) > len(context):
+                context = broader_context
+                sources = broader_sources
+                print(f"DEBUG: Using broader context with {len(broader_sources)} sources")
+    
+    # MCQ search for related questions - runs before generation so a slow LLM
+    # still leaves us with sources and MCQs to return
+    mcq_results = query_mcq(
+        search_components['mcq_index'],
+        search_components['mcq_model'],
+        query,
+        mcq_threshold,
+        mcq_limit,
+        deadline=deadline
+    )
+    
+    return {
+        "query": query,
+        "context": context,
+        "sources": sources,
+        "mcq_results": mcq_results,
+        "namespace_used": namespace if namespace else "all",
+        "search_mode": search_mode
+    }
+
+def answer_search(retrieved, deadline):
+    """Generate the answer for retrieve_for_search() output; LLM failures give a partial result"""
+    from groq import APITimeoutError, APIConnectionError, APIStatusError
+    
+    # Generate RAG response with whatever budget is left
+    partial_reason = None
+    try:
+        rag_response = generate_answer(retrieved['context'], retrieved['query'], deadline)
+    except DeadlineExceeded:
+        partial_reason = "deadline_exceeded"
+    except APITimeoutError:
+        partial_reason = "llm_timeout"
+    except CircuitOpenError:
+        # Groq is known to be down - answer from retrieval only, without waiting
+        partial_reason = "llm_unavailable"
+    except StageOverloaded:
+        # Too many answers in flight - sources and MCQs are still worth returning
+        partial_reason = "llm_overloaded"
+    except (APIConnectionError, APIStatusError) as e:
+        if not is_groq_failure(e):
+            raise
+        partial_reason = "llm_error"
+    
+    if partial_reason:
+        print(f"DEBUG: Returning partial result ({partial_reason}) after {deadline.elapsed():.2f}s")
+        rag_response = PARTIAL_RESPONSE_MESSAGE
+    
+    return {
+        "rag_response": rag_response,
+        "sources": retrieved['sources'],
+        "mcq_results": retrieved['mcq_results'],
+        "query": retrieved['query'],
+        "namespace_used": retrieved['namespace_used'],
+        "search_mode": retrieved['search_mode'],
+        "partial": partial_reason is not None,
+        "partial_reason": partial_reason,
+        "timestamp": time.time()
+    }
+
 @app.route("/api/total-questions", methods=["GET"])
+@requires_models
+@http_cached(('mcq_index',))
 def get_total_questions():
     """Get total number of questions in the MCQ database"""
     global search_components
@@ -539,7 +1240,7 @@ def get_total_questions():
             return jsonify({"error": "MCQ index not available"}), 500
         
         # Get index stats to find total vector count
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout())
         total_questions = stats.get('total_vector_count', 0)
         
         return jsonify({
@@ -556,6 +1257,8 @@ def get_total_questions():
         }), 500
 
 @app.route("/api/stats", methods=["GET"])
+@requires_models
+@http_cached(('mcq_index', 'rag_index'))
 def get_stats():
     """Get system statistics"""
     global search_components
@@ -572,11 +1275,11 @@ def get_stats():
         total_books = 0
         
         if mcq_index:
-            mcq_stats = mcq_index.describe_index_stats()
+            mcq_stats = mcq_index.describe_index_stats(**pinecone_timeout())
             total_questions = mcq_stats.get('total_vector_count', 0)
         
         if rag_index:
-            rag_stats = rag_index.describe_index_stats()
+            rag_stats = rag_index.describe_index_stats(**pinecone_timeout())
             # RAG index contains document chunks, approximate books by dividing by average chunks per book
             total_chunks = rag_stats.get('total_vector_count', 0)
             # Estimate books based on namespaces (5 main subjects)
@@ -604,6 +1307,7 @@ def get_stats():
         }), 500
 
 @app.route("/api/questions", methods=["GET"])
+@requires_models
 def get_questions():
     """Get questions from the MCQ database with filtering"""
     global search_components
@@ -622,9 +1326,10 @@ def get_questions():
             return jsonify({"error": "MCQ index not available"}), 500
         
         # Get all available namespaces dynamically from index stats
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout())
         pyq_namespaces = list(stats.namespaces.keys()) if stats.namespaces else ["CIVIL SERVICES EXAMS", "BANKING EXAMS", "SCHOOL EXAMS"]
         all_questions = []
+        seen_clusters = set()
         
         # Query for questions - using dummy query to get random questions
         dummy_query = search_components['mcq_model'].encode(["sample question"]).tolist()[0]
@@ -636,23 +1341,17 @@ def get_questions():
                     vector=dummy_query,
                     top_k=min(limit * 2, 200),  # Get extra for filtering
                     include_metadata=True,
-                    namespace=namespace
+                    namespace=namespace,
+                    **pinecone_timeout()
                 )
                 
-                for i, match in enumerate(results['matches']):
+                for match in results['matches']:
                     metadata = match.get('metadata', {})
                     
-                    # Extract data from full_json_str field (new structure)
-                    full_question_data = {}
-                    if 'full_json_str' in metadata:
-                        try:
-                            import json
-                            full_question_data = json.loads(metadata['full_json_str'])
-                        except (json.JSONDecodeError, Exception) as e:
-                            print(f"⚠️ Error parsing full_json_str: {e}")
-                            full_question_data = {}
+                    # Typed PYQ fields, or the decoded full_json_str for older records
+                    full_question_data = pyq_fields(metadata)
                     
-                    # Extract required fields - prioritize full_json_str, fallback to metadata
+                    # Extract required fields - prioritize the PYQ fields, fallback to metadata
                     question_text = full_question_data.get('question', metadata.get('question', ''))
                     exam_name = full_question_data.get('exam_name', metadata.get('exam_name', 'Unknown'))
                     exam_year = full_question_data.get('exam_year', metadata.get('exam_year', 'Unknown'))
@@ -694,13 +1393,15 @@ def get_questions():
                     if subject_filter != 'all' and subject.lower() != subject_filter.lower():
                         continue
                     
-                    # Generate a unique ID using timestamp and question hash
-                    question_hash = hashlib.md5(question_text.encode()).hexdigest()[:8]
-                    unique_id = f"{int(time.time() * 1000)}_{question_hash}_{i}_{namespace}"
+                    # One question per duplicate cluster
+                    cluster_key = pyq_clusters.canonical_key(namespace, match['id'], question_text)
+                    if cluster_key in seen_clusters:
+                        continue
+                    seen_clusters.add(cluster_key)
                     
                     # Extract question data with required fields only
                     question_data = {
-                        "id": unique_id,
+                        "id": question_id(namespace, match['id']),
                         "question": question_text,
                         "options": options_array,
                         "correct_option": correct_option,
@@ -723,17 +1424,21 @@ def get_questions():
                             "subject": subject
                         }
                     }
-                    all_questions.append(question_data)
+                    all_questions.append(attach_occurrences(question_data, cluster_key))
                     
                     if len(all_questions) >= limit:
                         break
                         
+            except StageOverloaded:
+                raise
             except Exception as e:
                 print(f"⚠️ Error querying namespace {namespace}: {str(e)}")
                 continue
         
         # Limit to requested number
         questions = all_questions[:limit]
+        if wants_compact():
+            questions = [compact_mcq(question) for question in questions]
         
         return jsonify({
             "questions": questions,
@@ -745,6 +1450,8 @@ def get_questions():
             "timestamp": time.time()
         }), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error getting questions: {str(e)}")
         return jsonify({
@@ -754,6 +1461,8 @@ def get_questions():
         }), 500
 
 @app.route("/api/filters", methods=["GET"])
+@requires_models
+@http_cached(('mcq_index',))
 def get_filter_options():
     """Get unique exam names and subjects from MCQ database for filter dropdowns"""
     global search_components
@@ -768,7 +1477,7 @@ def get_filter_options():
             return jsonify({"error": "MCQ index not available"}), 500
         
         # Get all available namespaces dynamically from index stats
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout())
         pyq_namespaces = list(stats.namespaces.keys()) if stats.namespaces else ["CIVIL SERVICES EXAMS", "BANKING EXAMS", "SCHOOL EXAMS"]
         unique_exams = set()
         unique_subjects = set()
@@ -783,20 +1492,15 @@ def get_filter_options():
                     vector=dummy_query,
                     top_k=1000,  # Get many results to extract all unique values
                     include_metadata=True,
-                    namespace=namespace
+                    namespace=namespace,
+                    **pinecone_timeout()
                 )
                 
                 for match in results['matches']:
                     metadata = match.get('metadata', {})
                     
-                    # Extract data from full_json_str field (new structure)
-                    full_question_data = {}
-                    if 'full_json_str' in metadata:
-                        try:
-                            import json
-                            full_question_data = json.loads(metadata['full_json_str'])
-                        except (json.JSONDecodeError, Exception):
-                            full_question_data = {}
+                    # Typed PYQ fields, or the decoded full_json_str for older records
+                    full_question_data = pyq_fields(metadata)
                     
                     # Extract exam name
                     exam_name = full_question_data.get('exam_name', metadata.get('exam_name', ''))
@@ -808,8 +1512,11 @@ def get_filter_options():
                     if subject and subject.strip():
                         unique_subjects.add(subject.strip())
                         
+            except StageOverloaded:
+                raise
             except Exception as e:
                 print(f"⚠️ Error querying namespace {namespace} for filters: {str(e)}")
+                mark_degraded()
                 continue
         
         # Convert to sorted lists for consistent ordering
@@ -824,6 +1531,8 @@ def get_filter_options():
             "timestamp": time.time()
         }), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error getting filter options: {str(e)}")
         return jsonify({
@@ -833,6 +1542,8 @@ def get_filter_options():
         }), 500
 
 @app.route("/api/books", methods=["GET"])
+@requires_models
+@http_cached(('rag_index',))
 def get_books():
     """Get inserted books/subjects from Pinecone index statistics"""
     global search_components
@@ -847,7 +1558,7 @@ def get_books():
             return jsonify({"error": "RAG index not available"}), 500
         
         # Get index statistics to see what namespaces exist
-        stats = rag_index.describe_index_stats()
+        stats = rag_index.describe_index_stats(**pinecone_timeout())
         namespaces = stats.namespaces if stats.namespaces else {}
         
         books_list = []
@@ -947,6 +1658,8 @@ def get_books():
         }), 500
 
 @app.route("/api/inserted-pyqs", methods=["GET"])
+@requires_models
+@http_cached(('mcq_index',))
 def get_inserted_pyqs():
     """Get inserted PYQs from MCQ index statistics with hierarchical exam structure"""
     global search_components
@@ -961,7 +1674,7 @@ def get_inserted_pyqs():
             return jsonify({"error": "MCQ index not available"}), 500
         
         # Get index statistics to see what namespaces exist
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout())
         namespaces = stats.namespaces if stats.namespaces else {}
         
         pyq_list = []
@@ -978,7 +1691,8 @@ def get_inserted_pyqs():
                         vector=dummy_query,
                         top_k=min(vector_count, 1000),  # Get all or up to 1000 questions
                         include_metadata=True,
-                        namespace=namespace
+                        namespace=namespace,
+                        **pinecone_timeout()
                     )
                     
                     # Create hierarchical structure: main_exam -> sub_exam -> year -> term
@@ -987,14 +1701,8 @@ def get_inserted_pyqs():
                     for match in results['matches']:
                         metadata = match.get('metadata', {})
                         
-                        # Extract data from full_json_str field
-                        full_question_data = {}
-                        if 'full_json_str' in metadata:
-                            try:
-                                import json
-                                full_question_data = json.loads(metadata['full_json_str'])
-                            except (json.JSONDecodeError, Exception):
-                                full_question_data = {}
+                        # Typed PYQ fields, or the decoded full_json_str for older records
+                        full_question_data = pyq_fields(metadata)
                         
                         # Extract exam information
                         main_exam = namespace  # Use namespace as main exam (e.g., "SCHOOL EXAMS")
@@ -1034,7 +1742,7 @@ def get_inserted_pyqs():
                                     sub_exam_questions += question_count
                             
                             # Remove duplicates and sort
-                            available_years = sorted(list(set(available_years)))
+                            available_years = sorted(list(set(available_years)), key=str)  # typed (int) and legacy (str) years can mix
                             available_terms = sorted(list(set([t for t in available_terms if t.strip()])))
                             
                             pyq_data = {
@@ -1051,8 +1759,11 @@ def get_inserted_pyqs():
                             pyq_list.append(pyq_data)
                             total_questions += sub_exam_questions
                         
+                except StageOverloaded:
+                    raise
                 except Exception as e:
                     print(f"⚠️ Error extracting details from namespace {namespace}: {str(e)}")
+                    mark_degraded()
                     # Fallback to basic info
                     pyq_data = {
                         "title": f"{namespace}",
@@ -1077,6 +1788,8 @@ def get_inserted_pyqs():
             "timestamp": time.time()
         }), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error getting inserted PYQs: {str(e)}")
         return jsonify({
@@ -1085,36 +1798,99 @@ def get_inserted_pyqs():
             "total": 0
         }), 500
 
-def search_all_namespaces(pinecone_index, model, query: str, n_chunks: int = 2):
-    """Search across all namespaces and return best results"""
-    namespaces = ["geography", "polity", "history", "economics", "science"]
+RAG_NAMESPACES = ["geography", "polity", "history", "economics", "science"]
+
+def retrieve_candidates(pinecone_index, model, query: str, n_chunks: int = 2, namespace: str = "", deadline=None):
+    """Retrieve an over-fetched, score-sorted candidate pool for a query
+    
+    Each namespace returns n_chunks + BROADER_SEARCH_EXTRA matches; callers take
+    the top n_chunks for the answer and can widen from the rest for free.
+    Namespaces that would start after the deadline are skipped. Without an
+    explicit namespace, the router narrows the fan-out to the likely subjects.
+    """
+    pool_size = n_chunks + BROADER_SEARCH_EXTRA
+    # Encode once and reuse the embedding for every namespace
+    query_embedding = model.encode([query]).tolist()[0]
+    if namespace and namespace != "all":
+        namespaces = [namespace]
+    else:
+        # Low-confidence routes come back as None and keep the full fan-out
+        routed = namespace_router.route(query_embedding) if namespace_router is not None else None
+        namespaces = routed or RAG_NAMESPACES
     all_results = []
     
-    for namespace in namespaces:
+    for ns in namespaces:
         try:
-            results = semantic_search(pinecone_index, model, query, n_chunks, namespace)
+            results = semantic_search(pinecone_index, model, query, pool_size, ns, query_embedding=query_embedding, deadline=deadline)
             if results['matches']:
                 for match in results['matches']:
-                    match['namespace'] = namespace
+                    match['namespace'] = ns
                 all_results.extend(results['matches'])
+        except DeadlineExceeded:
+            print(f"⚠️ Deadline reached, skipping remaining namespaces from {ns}")
+            break
+        except StageOverloaded:
+            raise
         except Exception as e:
-            print(f"⚠️ Error searching namespace {namespace}: {str(e)}")
+            print(f"⚠️ Error searching namespace {ns}: {str(e)}")
     
-    # Sort by relevance score and take top results
+    # Sort by relevance score
     all_results.sort(key=lambda x: x['score'], reverse=True)
-    top_results = all_results[:n_chunks]
-    formatted_results = {'matches': top_results}
+    return all_results
+
+def lexical_candidates(lexical_index, query: str, n_chunks: int = 2, namespace: str = ""):
+    """BM25 candidate pool shaped like Pinecone matches, scores scaled to 0-1 (best hit = 1)
+    
+    The unscaled score is kept as bm25_score for the low-relevance test.
+    """
+    namespaces = [namespace] if namespace and namespace != "all" else RAG_NAMESPACES
+    hits = lexical_index.search(query, top_k=n_chunks + BROADER_SEARCH_EXTRA, namespaces=namespaces)
+    if not hits:
+        return []
+    best = hits[0]['score']
+    return [{**hit, 'score': hit['score'] / best, 'bm25_score': hit['score']} for hit in hits]
+
+def fuse_candidates(vector_candidates, keyword_candidates):
+    """Reciprocal rank fusion of vector and lexical pools
+    
+    Matches keep their own relevance score for display; only the order comes from RRF.
+    """
+    fused = reciprocal_rank_fusion(
+        [vector_candidates, keyword_candidates],
+        key_fn=lambda match: (match['namespace'], match['id'])
+    )
+    return [match for _, _, match in fused]
+
+def search_all_namespaces(pinecone_index, model, query: str, n_chunks: int = 2):
+    """Search across all namespaces and return best results"""
+    candidates = retrieve_candidates(pinecone_index, model, query, n_chunks)
+    formatted_results = {'matches': candidates[:n_chunks]}
     context, sources = get_context_with_sources(formatted_results)
     
     return context, sources
 
-def query_mcq(mcq_index, mcq_model, query_text, similarity_threshold=0.2, top_k=5):
-    """Query MCQ index for relevant questions across all namespaces"""
+def query_mcq(mcq_index, mcq_model, query_text, similarity_threshold=0.2, top_k=5, deadline=None):
+    """Query MCQ index for relevant questions across all namespaces (cached per index version)"""
+    cache_key = versioned_cache_key('mcq', ('mcq_index',), normalize_query(query_text), similarity_threshold, top_k)
+    if cache_key:
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    mcqs, complete = search_mcqs(mcq_index, mcq_model, query_text, similarity_threshold, top_k, deadline)
+    # Lists cut short by the deadline or a failing namespace are not cached
+    if cache_key and complete and mcqs:
+        response_cache.set(cache_key, mcqs, MCQ_CACHE_TTL_SECONDS, tags=('mcq',))
+    return mcqs
+
+def search_mcqs(mcq_index, mcq_model, query_text, similarity_threshold=0.2, top_k=5, deadline=None):
+    """Search every MCQ namespace; returns (formatted MCQs, whether every namespace answered)"""
+    complete = True
     try:
         query_embedding = mcq_model.encode(query_text).tolist()
         
         # Get all available namespaces dynamically from index stats
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout(deadline, "MCQ index stats"))
         pyq_namespaces = list(stats.namespaces.keys()) if stats.namespaces else ["CIVIL SERVICES EXAMS", "BANKING EXAMS", "SCHOOL EXAMS"]
         all_results = []
         
@@ -1124,15 +1900,23 @@ def query_mcq(mcq_index, mcq_model, query_text, similarity_threshold=0.2, top_k=
                     vector=query_embedding, 
                     top_k=20,  # Get more results per namespace to ensure variety
                     include_metadata=True,
-                    namespace=namespace
+                    namespace=namespace,
+                    **pinecone_timeout(deadline, f"searching MCQs in {namespace}")
                 )
                 
                 # Add namespace info to results
                 for match in response['matches']:
                     match['namespace'] = namespace
                     all_results.append(match)
+            except DeadlineExceeded:
+                print(f"⚠️ Deadline reached, skipping remaining MCQ namespaces from {namespace}")
+                complete = False
+                break
+            except StageOverloaded:
+                raise
             except Exception as e:
                 print(f"⚠️ Error searching namespace {namespace}: {str(e)}")
+                complete = False
                 continue
         
         # Sort all results by score
@@ -1143,142 +1927,143 @@ def query_mcq(mcq_index, mcq_model, query_text, similarity_threshold=0.2, top_k=
             result for result in all_results if result['score'] >= similarity_threshold
         ]
         
-        # Format MCQ results for frontend
+        # Format MCQ results for frontend, one entry per duplicate cluster
         formatted_mcqs = []
-        for result in filtered_results[:top_k]:
-            metadata = result['metadata']
-            
-            # Extract data from full_json_str field (new structure)
-            full_question_data = {}
-            if 'full_json_str' in metadata:
-                try:
-                    import json
-                    full_question_data = json.loads(metadata['full_json_str'])
-                except (json.JSONDecodeError, Exception) as e:
-                    print(f"⚠️ Error parsing full_json_str: {e}")
-                    # Fallback to individual metadata fields
-                    full_question_data = {}
-            
-            # Extract required fields - prioritize full_json_str, fallback to metadata
-            question_text = full_question_data.get('question', metadata.get('question', ''))
-            if not question_text and 'text' in metadata:
-                question_text = metadata['text'].split('Options:')[0].replace('Q:', '').strip() if 'Options:' in metadata['text'] else metadata['text']
+        seen_clusters = set()
+        for result in filtered_results:
+            if len(formatted_mcqs) >= top_k:
+                break
+            mcq = format_mcq_match(result, result['namespace'])
             
-            # Get options - prioritize full_json_str structure
-            options_dict = full_question_data.get('options', {})
-            if not options_dict:
-                # Fallback: reconstruct from individual metadata fields
-                if metadata.get('option_a'):
-                    options_dict['a'] = metadata.get('option_a')
-                if metadata.get('option_b'):
-                    options_dict['b'] = metadata.get('option_b')
-                if metadata.get('option_c'):
-                    options_dict['c'] = metadata.get('option_c')
-                if metadata.get('option_d'):
-                    options_dict['d'] = metadata.get('option_d')
-            
-            # Convert options dict to array for frontend compatibility
-            option_keys = ['a', 'b', 'c', 'd']
-            options_array = []
-            for key in option_keys:
-                if key in options_dict:
-                    options_array.append(options_dict[key])
-            
-            # Get correct option key and convert to index
-            correct_option = full_question_data.get('correct_option', metadata.get('correct_option', ''))
-            correct_answer_index = None
-            if correct_option and correct_option in option_keys:
-                correct_answer_index = option_keys.index(correct_option)
-            
-            # Get correct answer text
-            correct_answer_text = full_question_data.get('correct_answer', metadata.get('correct_answer', ''))
-            if not correct_answer_text and correct_option and options_dict and correct_option in options_dict:
-                correct_answer_text = options_dict[correct_option]
-            
-            # Extract other required fields
-            exam_name = full_question_data.get('exam_name', metadata.get('exam_name', 'Unknown'))
-            exam_year = full_question_data.get('exam_year', metadata.get('exam_year', 'Unknown'))
-            exam_term = full_question_data.get('exam_term', metadata.get('exam_term', ''))
-            subject = full_question_data.get('subject', metadata.get('subject', 'Unknown'))
-            explanation = full_question_data.get('explanation', metadata.get('explanation', ''))
-            
-            # Generate a unique ID using timestamp and question hash
-            question_hash = hashlib.md5(question_text.encode()).hexdigest()[:8]
-            unique_id = f"{int(time.time() * 1000)}_{question_hash}"
+            cluster_key = pyq_clusters.canonical_key(result['namespace'], result['id'], mcq['question'])
+            if cluster_key in seen_clusters:
+                continue
+            seen_clusters.add(cluster_key)
             
-            formatted_mcqs.append({
-                'id': unique_id,
-                'question': question_text,
-                'options': options_array,  # Array format: ["option1", "option2", ...]
-                'correct_option': correct_option,  # Key like "a", "b", "c", "d"
-                'correct_answer': correct_answer_index,  # Index (0, 1, 2, 3) for frontend
-                'correct_answer_text': correct_answer_text,  # Actual answer text
-                'exam_name': exam_name,
-                'year': exam_year,
-                'exam_year': exam_year,
-                'term': exam_term,
-                'exam_term': exam_term,
-                'subject': subject,
-                'metadata': {
-                    'exam_name': exam_name,
-                    'exam_term': exam_term,
-                    'exam_year': exam_year,
-                    'subject': subject,
-                    'exam': exam_name,
-                    'term': exam_term,
-                    'year': exam_year
-                },
-                'explanation': explanation,
-                'topic': full_question_data.get('topic', metadata.get('topic', '')),
-                'similarity': round(result['score'], 3)
-            })
+            mcq['similarity'] = round(result['score'], 3)
+            formatted_mcqs.append(attach_occurrences(mcq, cluster_key))
         
-        return formatted_mcqs
+        return formatted_mcqs, complete
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error querying MCQs: {str(e)}")
-        return []
+        return [], False
+
+def namespace_slug(namespace):
+    """URL-safe form of a PYQ namespace, e.g. 'BANKING EXAMS' -> 'banking-exams'"""
+    return "-".join(namespace.lower().split())
+
+def question_id(namespace, vector_id):
+    """Stable question ID: the same Pinecone record always gets the same ID"""
+    return f"{namespace_slug(namespace)}:{vector_id}"
+
+def parse_question_id(qid, namespaces):
+    """Split a question ID into (namespace, vector id), None when it doesn't resolve"""
+    slug, sep, vector_id = str(qid).partition(':')
+    if not sep or not vector_id:
+        return None
+    for namespace in namespaces:
+        if namespace_slug(namespace) == slug:
+            return namespace, vector_id
+    return None
+
+def format_mcq_match(match, namespace):
+    """Build the MCQ object returned with search results from a Pinecone match"""
+    metadata = match.get('metadata', {})
+    
+    # Typed PYQ fields, or the decoded full_json_str for older records
+    full_question_data = pyq_fields(metadata)
+    
+    # Extract required fields - prioritize the PYQ fields, fallback to metadata
+    question_text = full_question_data.get('question', metadata.get('question', ''))
+    if not question_text and 'text' in metadata:
+        question_text = metadata['text'].split('Options:')[0].replace('Q:', '').strip() if 'Options:' in metadata['text'] else metadata['text']
+    
+    # Get options - prioritize the PYQ fields structure
+    options_dict = full_question_data.get('options', {})
+    if not options_dict:
+        # Fallback: reconstruct from individual metadata fields
+        if metadata.get('option_a'):
+            options_dict['a'] = metadata.get('option_a')
+        if metadata.get('option_b'):
+            options_dict['b'] = metadata.get('option_b')
+        if metadata.get('option_c'):
+            options_dict['c'] = metadata.get('option_c')
+        if metadata.get('option_d'):
+            options_dict['d'] = metadata.get('option_d')
+    
+    # Convert options dict to array for frontend compatibility
+    option_keys = ['a', 'b', 'c', 'd']
+    options_array = []
+    for key in option_keys:
+        if key in options_dict:
+            options_array.append(options_dict[key])
+    
+    # Get correct option key and convert to index
+    correct_option = full_question_data.get('correct_option', metadata.get('correct_option', ''))
+    correct_answer_index = None
+    if correct_option and correct_option in option_keys:
+        correct_answer_index = option_keys.index(correct_option)
+    
+    # Get correct answer text
+    correct_answer_text = full_question_data.get('correct_answer', metadata.get('correct_answer', ''))
+    if not correct_answer_text and correct_option and options_dict and correct_option in options_dict:
+        correct_answer_text = options_dict[correct_option]
+    
+    # Extract other required fields
+    exam_name = full_question_data.get('exam_name', metadata.get('exam_name', 'Unknown'))
+    exam_year = full_question_data.get('exam_year', metadata.get('exam_year', 'Unknown'))
+    exam_term = full_question_data.get('exam_term', metadata.get('exam_term', ''))
+    subject = full_question_data.get('subject', metadata.get('subject', 'Unknown'))
+    explanation = full_question_data.get('explanation', metadata.get('explanation', ''))
+    
+    return {
+        'id': question_id(namespace, match['id']),
+        'question': question_text,
+        'options': options_array,  # Array format: ["option1", "option2", ...]
+        'correct_option': correct_option,  # Key like "a", "b", "c", "d"
+        'correct_answer': correct_answer_index,  # Index (0, 1, 2, 3) for frontend
+        'correct_answer_text': correct_answer_text,  # Actual answer text
+        'exam_name': exam_name,
+        'year': exam_year,
+        'exam_year': exam_year,
+        'term': exam_term,
+        'exam_term': exam_term,
+        'subject': subject,
+        'metadata': {
+            'exam_name': exam_name,
+            'exam_term': exam_term,
+            'exam_year': exam_year,
+            'subject': subject,
+            'exam': exam_name,
+            'term': exam_term,
+            'year': exam_year
+        },
+        'explanation': explanation,
+        'topic': full_question_data.get('topic', metadata.get('topic', ''))
+    }
 
 # Dashboard tracking storage (in production, use a proper database)
-user_stats = {
-    'total_chats': 0,
-    'total_questions': 0,
-    'total_mcq_attempted': 0,
-    'mcq_correct': 0,
-    'mcq_wrong': 0,
-    'subjects': {
-        'Geography': 0,
-        'Polity': 0,
-        'History': 0,
-        'Economics': 0,
-        'Science': 0,
-        'Others': 0
-    },
-    'achievements': [],
-    'goals': [
-        {'id': 1, 'title': 'Daily Questions', 'current': 0, 'target': 10, 'type': 'daily'},
-        {'id': 2, 'title': 'Weekly Sessions', 'current': 0, 'target': 7, 'type': 'weekly'},
-        {'id': 3, 'title': 'Subject Coverage', 'current': 0, 'target': 5, 'type': 'subjects'}
-    ],
-    'activities': []
-}
+dashboard_stats = StatsStore()  # Per-user aggregates, persisted through the shared event log
+
+def dashboard_user_id(data=None):
+    """User named by ?user_id=, X-User-Id or the body's user_id ('anonymous' when absent)"""
+    user_id = request.args.get('user_id') or request.headers.get('X-User-Id')
+    if not user_id and isinstance(data, dict):
+        user_id = data.get('user_id')
+    return str(user_id)[:128] if user_id else 'anonymous'
+
+def dashboard_user(data=None):
+    """Stats for the read-only dashboard routes (unknown users get defaults and aren't stored)"""
+    return dashboard_stats.peek(dashboard_user_id(data))
 
 @app.route("/api/dashboard/stats", methods=["GET"])
 def get_dashboard_stats():
     """Get dashboard statistics"""
     try:
-        # Calculate accuracy
-        total_attempted = user_stats['total_mcq_attempted']
-        accuracy = 0
-        if total_attempted > 0:
-            accuracy = round((user_stats['mcq_correct'] / total_attempted) * 100, 1)
-        
         return jsonify({
-            'totalChats': user_stats['total_chats'],
-            'totalQuestions': user_stats['total_questions'],
-            'totalMcqAttempted': user_stats['total_mcq_attempted'],
-            'mcqCorrect': user_stats['mcq_correct'],
-            'mcqWrong': user_stats['mcq_wrong'],
-            'mcqAccuracy': accuracy,
+            **dashboard_user().stats(),
             'timestamp': time.time()
         }), 200
     except Exception as e:
@@ -1300,7 +2085,7 @@ def get_subject_stats():
         subjects = []
         colors = ['#06B6D4', '#8B5CF6', '#10B981', '#F59E0B', '#EF4444', '#6B7280']
         
-        for i, (subject, count) in enumerate(user_stats['subjects'].items()):
+        for i, (subject, count) in enumerate(dashboard_user().subject_counts()):
             subjects.append({
                 'name': subject,
                 'questions': count,
@@ -1323,7 +2108,7 @@ def get_achievements():
     """Get user achievements"""
     try:
         return jsonify({
-            'achievements': user_stats['achievements'],
+            'achievements': dashboard_user().achievement_list(),
             'timestamp': time.time()
         }), 200
     except Exception as e:
@@ -1335,24 +2120,10 @@ def get_achievements():
 
 @app.route("/api/dashboard/goals", methods=["GET"])
 def get_learning_goals():
-    """Get learning goals and progress"""
+    """Get learning goals and progress (today's questions, chats in the last 7 days, subjects, streak)"""
     try:
-        # Update goals with current stats
-        goals = user_stats['goals'].copy()
-        for goal in goals:
-            if goal['type'] == 'daily':
-                # For demo, use total questions
-                goal['current'] = min(user_stats['total_questions'], goal['target'])
-            elif goal['type'] == 'weekly':
-                # For demo, use total chats
-                goal['current'] = min(user_stats['total_chats'], goal['target'])
-            elif goal['type'] == 'subjects':
-                # Count how many subjects have been used
-                subjects_used = sum(1 for count in user_stats['subjects'].values() if count > 0)
-                goal['current'] = min(subjects_used, goal['target'])
-        
         return jsonify({
-            'goals': goals,
+            'goals': dashboard_user().goals(),
             'timestamp': time.time()
         }), 200
     except Exception as e:
@@ -1367,9 +2138,8 @@ def get_recent_activity():
     """Get recent user activity"""
     try:
         # Return last 10 activities
-        recent_activities = user_stats['activities'][-10:] if user_stats['activities'] else []
         return jsonify({
-            'activities': recent_activities,
+            'activities': dashboard_user().recent_activities(10),
             'timestamp': time.time()
         }), 200
     except Exception as e:
@@ -1381,65 +2151,44 @@ def get_recent_activity():
 
 @app.route("/api/dashboard/track", methods=["POST"])
 def track_user_interaction():
-    """Track user interaction and update stats"""
+    """Track user interactions and update stats
+    
+    Accepts one event ({"type", "data", "timestamp", "id"}), a list of events, or
+    {"events": [...]}. Events carrying an "id" are applied at most once.
+    """
     try:
         data = request.json
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        interaction_type = data.get('type', '')
-        interaction_data = data.get('data', {})
-        timestamp = data.get('timestamp', time.time())
-        
-        # Update stats based on interaction type
-        if interaction_type == 'chat':
-            user_stats['total_chats'] += 1
-            user_stats['activities'].append({
-                'type': 'chat',
-                'description': 'Started a new conversation',
-                'timestamp': timestamp
-            })
-        elif interaction_type == 'search':
-            user_stats['total_questions'] += 1
-            subject = interaction_data.get('subject', 'Others')
-            if subject in user_stats['subjects']:
-                user_stats['subjects'][subject] += 1
-            else:
-                user_stats['subjects']['Others'] += 1
-            
-            user_stats['activities'].append({
-                'type': 'search',
-                'description': f'Asked a question about {subject}',
-                'timestamp': timestamp
-            })
-            
-            # Check for achievements
-            check_achievements()
-            
-        elif interaction_type == 'mcq_attempt':
-            user_stats['total_mcq_attempted'] += 1
-            is_correct = interaction_data.get('correct', False)
-            if is_correct:
-                user_stats['mcq_correct'] += 1
-            else:
-                user_stats['mcq_wrong'] += 1
-            
-            user_stats['activities'].append({
-                'type': 'mcq',
-                'description': f'Answered MCQ {"correctly" if is_correct else "incorrectly"}',
-                'timestamp': timestamp
-            })
-            
-            # Check for achievements
-            check_achievements()
+        raw_events = data.get('events') if isinstance(data, dict) and 'events' in data else data
+        if isinstance(raw_events, dict):
+            raw_events = [raw_events]
+        if not isinstance(raw_events, list) or not raw_events:
+            return jsonify({'error': 'events must be a non-empty list'}), 400
+        if len(raw_events) > DASHBOARD_MAX_BATCH:
+            return jsonify({'error': f'Too many events (max {DASHBOARD_MAX_BATCH} per batch)'}), 400
+        
+        now = time.time()
+        events = []
+        rejected = []
+        for index, raw_event in enumerate(raw_events):
+            try:
+                events.append(make_event(raw_event, now))
+            except ValueError as e:
+                rejected.append({'index': index, 'error': str(e)})
         
-        # Keep only last 50 activities
-        if len(user_stats['activities']) > 50:
-            user_stats['activities'] = user_stats['activities'][-50:]
+        # One pass under the user's lock; achievements are checked after each event, for the counter it changed
+        user_id = dashboard_user_id(data if isinstance(data, dict) else None)
+        applied, duplicates, unlocked = dashboard_stats.track(user_id, events)
         
         return jsonify({
             'success': True,
-            'message': 'Interaction tracked successfully'
+            'message': 'Interaction tracked successfully',
+            'accepted': applied,
+            'duplicates': duplicates,
+            'rejected': rejected,
+            'achievements_unlocked': unlocked
         }), 200
         
     except Exception as e:
@@ -1458,9 +2207,7 @@ def update_user_stats():
             return jsonify({'error': 'No data provided'}), 400
         
         # Update stats with provided data
-        for key, value in data.items():
-            if key in user_stats and isinstance(value, (int, float)):
-                user_stats[key] = value
+        dashboard_stats.set_totals(dashboard_user_id(data), data)
         
         return jsonify({
             'success': True,
@@ -1474,68 +2221,115 @@ def update_user_stats():
             'error': str(e)
         }), 500
 
-def check_achievements():
-    """Check and add new achievements based on current stats"""
-    try:
-        achievements_to_add = []
-        
-        # First question achievement
-        if user_stats['total_questions'] == 1 and not any(a['id'] == 'first_question' for a in user_stats['achievements']):
-            achievements_to_add.append({
-                'id': 'first_question',
-                'title': 'First Question!',
-                'description': 'Asked your first question',
-                'icon': '🎯',
-                'date': 'Just now'
-            })
-        
-        # 10 questions milestone
-        if user_stats['total_questions'] >= 10 and not any(a['id'] == 'ten_questions' for a in user_stats['achievements']):
-            achievements_to_add.append({
-                'id': 'ten_questions',
-                'title': 'Curious Mind!',
-                'description': 'Asked 10 questions',
-                'icon': '🧠',
-                'date': 'Just now'
-            })
-        
-        # First MCQ attempt
-        if user_stats['total_mcq_attempted'] == 1 and not any(a['id'] == 'first_mcq' for a in user_stats['achievements']):
-            achievements_to_add.append({
-                'id': 'first_mcq',
-                'title': 'Quiz Starter!',
-                'description': 'Attempted your first MCQ',
-                'icon': '📝',
-                'date': 'Just now'
-            })
-        
-        # 50% accuracy with at least 10 MCQs
-        if user_stats['total_mcq_attempted'] >= 10:
-            accuracy = (user_stats['mcq_correct'] / user_stats['total_mcq_attempted']) * 100
-            if accuracy >= 50 and not any(a['id'] == 'half_accurate' for a in user_stats['achievements']):
-                achievements_to_add.append({
-                    'id': 'half_accurate',
-                    'title': 'Getting Better!',
-                    'description': 'Achieved 50% MCQ accuracy',
-                    'icon': '📈',
-                    'date': 'Just now'
-                })
-        
-        # Add new achievements
-        user_stats['achievements'].extend(achievements_to_add)
-        
-        # Keep only last 20 achievements
-        if len(user_stats['achievements']) > 20:
-            user_stats['achievements'] = user_stats['achievements'][-20:]
-            
-    except Exception as e:
-        print(f"Error checking achievements: {str(e)}")
-
 # ============================================
 # PYQ Practice API Endpoints
 # ============================================
 
+def attach_occurrences(question_obj, cluster_key):
+    """Add the exam/year list of a duplicate cluster to its representative question"""
+    occurrences = pyq_clusters.occurrences(cluster_key)
+    if occurrences:
+        question_obj['occurrences'] = [
+            {'exam_name': o['exam_name'], 'exam_year': o['exam_year'], 'exam_term': o['exam_term']}
+            for o in occurrences
+        ]
+    return question_obj
+
+def collapse_pyq_duplicates(questions, limit=None):
+    """One question per duplicate cluster, keeping the best ranked one"""
+    collapsed = pyq_clusters.collapse(
+        questions,
+        key_fn=lambda q: (q['namespace'], q['id'].partition(':')[2], q['question']),
+        limit=limit
+    )
+    return [attach_occurrences(question_obj, key) for key, question_obj in collapsed]
+
+def format_pyq_match(match, namespace):
+    """Build a PYQ practice question object from a Pinecone match or lexical hit"""
+    metadata = match.get('metadata', {})
+    
+    # Typed PYQ fields, or the decoded full_json_str for older records
+    full_data = pyq_fields(metadata)
+    
+    # Extract fields
+    exam_name = full_data.get('exam_name', metadata.get('exam_name', ''))
+    exam_year = str(full_data.get('exam_year', metadata.get('exam_year', '')))
+    exam_term = full_data.get('exam_term', metadata.get('exam_term', ''))
+    subject = full_data.get('subject', metadata.get('subject', ''))
+    question_text = full_data.get('question', metadata.get('question', ''))
+    explanation = full_data.get('explanation', metadata.get('explanation', ''))
+    correct_option = full_data.get('correct_option', metadata.get('correct_option', ''))
+    
+    # Get options
+    options_dict = full_data.get('options', {})
+    if not options_dict:
+        options_dict = {}
+        for opt_key in ['option_a', 'option_b', 'option_c', 'option_d']:
+            if metadata.get(opt_key):
+                options_dict[opt_key.replace('option_', '').upper()] = metadata.get(opt_key)
+    
+    # Extract options list - handle both uppercase and lowercase keys
+    options_list = []
+    for k in ['A', 'B', 'C', 'D']:
+        # Try uppercase first, then lowercase
+        opt_value = options_dict.get(k) or options_dict.get(k.lower())
+        if opt_value:
+            options_list.append(opt_value)
+    
+    # Map correct_option letter to index
+    correct_answer_index = None
+    if correct_option:
+        option_map = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'a': 0, 'b': 1, 'c': 2, 'd': 3}
+        correct_answer_index = option_map.get(correct_option)
+    
+    return {
+        'id': question_id(namespace, match['id']),
+        'question': question_text,
+        'options': options_list,
+        'correct_answer': correct_answer_index,
+        'correct_option': correct_option,
+        'explanation': explanation,
+        'exam_name': exam_name,
+        'year': exam_year,
+        'term': exam_term,
+        'subject': subject,
+        'namespace': namespace,
+        'score': match.get('score', 0)
+    }
+
+# Push the year filter down to Pinecone - only once every PYQ record was (re)loaded with
+# typed metadata by load_pyqs.py, older records have no numeric exam_year and would be dropped
+PYQ_SERVER_FILTERS = os.getenv('PYQ_SERVER_FILTERS', 'false').lower() in ('1', 'true', 'yes')
+
+def pyq_server_filter(year_filter=None):
+    """Pinecone metadata filter for the PYQ practice filters, None when disabled or not applicable"""
+    if not PYQ_SERVER_FILTERS or not year_filter or year_filter == 'all':
+        return None
+    try:
+        return {'exam_year': {'$eq': int(year_filter)}}
+    except (TypeError, ValueError):
+        return None
+
+def pyq_matches_filters(question_obj, exam_filter=None, subject_filter=None, year_filter=None):
+    """Apply the PYQ practice exam/subject/year filters to a question object"""
+    if exam_filter and exam_filter != 'all':
+        exam_lower = question_obj['exam_name'].lower().replace(' ', '_').replace('/', '_')
+        if exam_filter.lower() not in exam_lower:
+            return False
+    
+    if subject_filter and subject_filter != 'all':
+        subject_lower = question_obj['subject'].lower().replace(' ', '_')
+        if subject_filter.lower() not in subject_lower:
+            return False
+    
+    if year_filter and year_filter != 'all':
+        if str(year_filter) != str(question_obj['year']):
+            return False
+    
+    return True
+
 @app.route("/api/pyq/search", methods=["POST"])
+@requires_models
 @rate_limit(max_requests=30, window_seconds=60)
 def search_pyq_questions():
     """Search and filter PYQ questions"""
@@ -1551,6 +2345,7 @@ def search_pyq_questions():
         subject_filter = data.get('subject', None)
         year_filter = data.get('year', None)
         limit = data.get('limit', 50)
+        mode = data.get('mode', 'vector')  # vector | lexical | hybrid
         
         mcq_index = search_components.get('mcq_index')
         mcq_model = search_components.get('mcq_model')
@@ -1559,11 +2354,9 @@ def search_pyq_questions():
             return jsonify({"error": "MCQ system not available"}), 500
         
         # Get all available namespaces
-        stats = mcq_index.describe_index_stats()
+        stats = mcq_index.describe_index_stats(**pinecone_timeout())
         namespaces = list(stats.namespaces.keys()) if stats.namespaces else []
         
-        all_questions = []
-        
         # Limit namespaces to query based on filters to speed up
         target_namespaces = namespaces
         if exam_filter and exam_filter != 'all':
@@ -1572,111 +2365,78 @@ def search_pyq_questions():
             if not target_namespaces:
                 target_namespaces = namespaces  # fallback to all if no match
         
-        # Query each namespace (limited for performance)
-        for namespace in target_namespaces[:5]:  # Limit to first 5 namespaces for speed
-            try:
-                # Use query text if provided, otherwise use dummy query
-                if query:
-                    query_embedding = mcq_model.encode(query).tolist()
-                else:
-                    query_embedding = mcq_model.encode("general knowledge question").tolist()
-                
-                results = mcq_index.query(
-                    vector=query_embedding,
-                    top_k=min(limit + 10, 100),  # Reduced from 500 to 100 for faster queries
-                    include_metadata=True,
-                    namespace=namespace
-                )
-                
-                for match in results['matches']:
-                    metadata = match.get('metadata', {})
-                    
-                    # Parse full_json_str if available
-                    full_data = {}
-                    if 'full_json_str' in metadata:
-                        try:
-                            full_data = json.loads(metadata['full_json_str'])
-                        except:
-                            pass
-                    
-                    # Extract fields
-                    exam_name = full_data.get('exam_name', metadata.get('exam_name', ''))
-                    exam_year = str(full_data.get('exam_year', metadata.get('exam_year', '')))
-                    exam_term = full_data.get('exam_term', metadata.get('exam_term', ''))
-                    subject = full_data.get('subject', metadata.get('subject', ''))
-                    question_text = full_data.get('question', metadata.get('question', ''))
-                    explanation = full_data.get('explanation', metadata.get('explanation', ''))
-                    correct_option = full_data.get('correct_option', metadata.get('correct_option', ''))
-                    
-                    # Get options
-                    options_dict = full_data.get('options', {})
-                    if not options_dict:
-                        options_dict = {}
-                        for opt_key in ['option_a', 'option_b', 'option_c', 'option_d']:
-                            if metadata.get(opt_key):
-                                options_dict[opt_key.replace('option_', '').upper()] = metadata.get(opt_key)
-                    
-                    # Extract options list - handle both uppercase and lowercase keys
-                    options_list = []
-                    for k in ['A', 'B', 'C', 'D']:
-                        # Try uppercase first, then lowercase
-                        opt_value = options_dict.get(k) or options_dict.get(k.lower())
-                        if opt_value:
-                            options_list.append(opt_value)
-                    
-                    # Map correct_option letter to index
-                    correct_answer_index = None
-                    if correct_option:
-                        option_map = {'A': 0, 'B': 1, 'C': 2, 'D': 3, 'a': 0, 'b': 1, 'c': 2, 'd': 3}
-                        correct_answer_index = option_map.get(correct_option)
-                    
-                    # Apply filters
-                    if exam_filter and exam_filter != 'all':
-                        exam_lower = exam_name.lower().replace(' ', '_').replace('/', '_')
-                        if exam_filter.lower() not in exam_lower:
-                            continue
-                    
-                    if subject_filter and subject_filter != 'all':
-                        subject_lower = subject.lower().replace(' ', '_')
-                        if subject_filter.lower() not in subject_lower:
-                            continue
-                    
-                    if year_filter and year_filter != 'all':
-                        if str(year_filter) != str(exam_year):
-                            continue
-                    
-                    # Build question object
-                    question_obj = {
-                        'id': match['id'],
-                        'question': question_text,
-                        'options': options_list,
-                        'correct_answer': correct_answer_index,
-                        'correct_option': correct_option,
-                        'explanation': explanation,
-                        'exam_name': exam_name,
-                        'year': exam_year,
-                        'term': exam_term,
-                        'subject': subject,
-                        'namespace': namespace,
-                        'score': match.get('score', 0)
-                    }
-                    
-                    all_questions.append(question_obj)
+        # Limit to first 5 namespaces for speed
+        target_namespaces = target_namespaces[:5]
+        vector_questions = []
+        lexical_questions = []
+        
+        # Lexical/hybrid need query text and a loaded index, otherwise fall back to vector search
+        lexical_index = lexical_indexes.get('pyq')
+        if mode not in ('lexical', 'hybrid') or not query or lexical_index is None:
+            mode = 'vector'
+        
+        if mode in ('vector', 'hybrid'):
+            # Use query text if provided, otherwise use dummy query
+            query_embedding = mcq_model.encode(query if query else "general knowledge question").tolist()
+            server_filter = pyq_server_filter(year_filter)
+            filter_kwargs = {'filter': server_filter} if server_filter else {}
+            
+            # Query each namespace (limited for performance)
+            for namespace in target_namespaces:
+                try:
+                    results = mcq_index.query(
+                        vector=query_embedding,
+                        top_k=min(limit + 10, 100),  # Reduced from 500 to 100 for faster queries
+                        include_metadata=True,
+                        namespace=namespace,
+                        **filter_kwargs,
+                        **pinecone_timeout()
+                    )
                     
-            except Exception as e:
-                print(f"Error querying namespace {namespace}: {str(e)}")
-                continue
+                    for match in results['matches']:
+                        question_obj = format_pyq_match(match, namespace)
+                        if pyq_matches_filters(question_obj, exam_filter, subject_filter, year_filter):
+                            vector_questions.append(question_obj)
+                        
+                except StageOverloaded:
+                    raise
+                except Exception as e:
+                    print(f"Error querying namespace {namespace}: {str(e)}")
+                    continue
+            vector_questions.sort(key=lambda x: x['score'], reverse=True)
+        
+        if mode in ('lexical', 'hybrid'):
+            hits = lexical_index.search(query, top_k=min(limit + 10, 100) * len(target_namespaces), namespaces=target_namespaces)
+            for hit in hits:
+                question_obj = format_pyq_match(hit, hit['namespace'])
+                if pyq_matches_filters(question_obj, exam_filter, subject_filter, year_filter):
+                    lexical_questions.append(question_obj)
+        
+        if mode == 'hybrid':
+            # Reciprocal rank fusion of the two rankings, score becomes the fused score
+            all_questions = []
+            for _, fused_score, question_obj in reciprocal_rank_fusion(
+                    [vector_questions, lexical_questions],
+                    key_fn=lambda q: (q['namespace'], q['id'])):
+                all_questions.append({**question_obj, 'score': round(fused_score, 5)})
+        else:
+            all_questions = vector_questions if mode == 'vector' else lexical_questions
         
-        # Sort by score and limit
+        # Sort by score, collapse duplicates across years/namespaces and limit
         all_questions.sort(key=lambda x: x['score'], reverse=True)
-        filtered_questions = all_questions[:limit]
+        filtered_questions = collapse_pyq_duplicates(all_questions, limit)
+        if wants_compact(data):
+            filtered_questions = [compact_mcq(question) for question in filtered_questions]
         
         return jsonify({
             'questions': filtered_questions,
             'total': len(filtered_questions),
+            'mode': mode,
             'status': 'success'
         }), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error searching PYQ questions: {str(e)}")
         return jsonify({
@@ -1686,7 +2446,94 @@ def search_pyq_questions():
         }), 500
 
 
+MAX_LOOKUP_IDS = 100
+MAX_QUESTION_ID_LENGTH = 600  # namespace slug + ':' + Pinecone vector id (max 512)
+
+def get_pyq_namespaces():
+    """PYQ namespaces, from the cached dependency check when available"""
+    cached = dependency_checker.result('mcq_index')
+    if cached:
+        details = cached.get('details') or cached.get('last_healthy_details') or {}
+        if details.get('namespaces'):
+            return list(details['namespaces'].keys())
+    stats = search_components['mcq_index'].describe_index_stats(**pinecone_timeout())
+    return list(stats.namespaces.keys()) if stats.namespaces else []
+
+@app.route("/api/pyq/questions", methods=["POST"])
+@requires_models
+@rate_limit(max_requests=60, window_seconds=60)
+def lookup_questions():
+    """Bulk lookup of questions by their stable IDs, so clients only fetch what they don't have cached"""
+    if not system_initialized:
+        return jsonify({"error": "Search system not initialized"}), 500
+    
+    mcq_index = search_components.get('mcq_index')
+    if not mcq_index:
+        return jsonify({"error": "MCQ index not available"}), 500
+    
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids', [])
+    if not isinstance(ids, list) or not ids:
+        return jsonify({"error": "Provide a non-empty 'ids' list"}), 400
+    if len(ids) > MAX_LOOKUP_IDS:
+        return jsonify({"error": f"Too many ids (max {MAX_LOOKUP_IDS})"}), 400
+    if not all(isinstance(qid, str) and 0 < len(qid) <= MAX_QUESTION_ID_LENGTH for qid in ids):
+        return jsonify({"error": f"Every id must be a non-empty string of at most {MAX_QUESTION_ID_LENGTH} characters"}), 400
+    
+    try:
+        namespaces = get_pyq_namespaces()
+        
+        # Group the requested IDs by namespace so each namespace costs one fetch
+        by_namespace = {}
+        missing = []
+        for qid in dict.fromkeys(ids):  # de-duplicate, keep order
+            parsed = parse_question_id(qid, namespaces)
+            if parsed is None:
+                missing.append(qid)
+                continue
+            namespace, vector_id = parsed
+            by_namespace.setdefault(namespace, []).append(vector_id)
+        
+        found = {}
+        for namespace, vector_ids in by_namespace.items():
+            try:
+                response = mcq_index.fetch(ids=vector_ids, namespace=namespace, **pinecone_timeout())
+            except Exception as e:
+                print(f"⚠️ Error fetching questions from {namespace}: {str(e)}")
+                missing.extend(question_id(namespace, vector_id) for vector_id in vector_ids)
+                continue
+            for vector_id in vector_ids:
+                vector = response.vectors.get(vector_id)
+                if vector is None:
+                    missing.append(question_id(namespace, vector_id))
+                    continue
+                match = {'id': vector_id, 'metadata': dict(getattr(vector, 'metadata', None) or {})}
+                found[question_id(namespace, vector_id)] = format_mcq_match(match, namespace)
+        
+        # Preserve request order
+        questions = [found[qid] for qid in ids if qid in found]
+        if wants_compact(data):
+            questions = [compact_mcq(question) for question in questions]
+        
+        return jsonify({
+            "questions": questions,
+            "missing": missing,
+            "total": len(questions),
+            "timestamp": time.time()
+        }), 200
+    
+    except Exception as e:
+        print(f"Error looking up questions: {str(e)}")
+        return jsonify({
+            "error": f"Failed to look up questions: {str(e)}",
+            "questions": [],
+            "missing": ids
+        }), 500
+
+
 @app.route("/api/pyq/filters", methods=["GET"])
+@requires_models
+@http_cached(('mcq_index',))
 @rate_limit(max_requests=20, window_seconds=60)
 def get_pyq_filters():
     """Get available filter options for PYQ practice"""
@@ -1702,59 +2549,14 @@ def get_pyq_filters():
         if not mcq_index or not mcq_model:
             return jsonify({"error": "MCQ system not available"}), 500
         
-        # Get all namespaces
-        stats = mcq_index.describe_index_stats()
-        namespaces = list(stats.namespaces.keys()) if stats.namespaces else []
-        
-        exams_set = set()
-        subjects_set = set()
-        years_set = set()
-        
-        # Sample questions from each namespace to get filters
-        dummy_query = mcq_model.encode("sample").tolist()
-        
-        for namespace in namespaces:
-            try:
-                results = mcq_index.query(
-                    vector=dummy_query,
-                    top_k=100,
-                    include_metadata=True,
-                    namespace=namespace
-                )
-                
-                for match in results['matches']:
-                    metadata = match.get('metadata', {})
-                    
-                    # Parse full_json_str
-                    full_data = {}
-                    if 'full_json_str' in metadata:
-                        try:
-                            full_data = json.loads(metadata['full_json_str'])
-                        except:
-                            pass
-                    
-                    exam_name = full_data.get('exam_name', metadata.get('exam_name', ''))
-                    exam_year = str(full_data.get('exam_year', metadata.get('exam_year', '')))
-                    subject = full_data.get('subject', metadata.get('subject', ''))
-                    
-                    if exam_name:
-                        exams_set.add(exam_name)
-                    if exam_year and exam_year != 'Unknown':
-                        years_set.add(exam_year)
-                    if subject:
-                        subjects_set.add(subject)
-                        
-            except Exception as e:
-                print(f"Error sampling namespace {namespace}: {str(e)}")
-                continue
-        
-        return jsonify({
-            'exams': sorted(list(exams_set)),
-            'subjects': sorted(list(subjects_set)),
-            'years': sorted(list(years_set), reverse=True),
-            'status': 'success'
-        }), 200
+        # Concurrent requests (e.g. a shared link) share one sampling pass
+        filters, _ = pyq_filters_flight.do("pyq-filters", collect_pyq_filters, mcq_index, mcq_model)
+        if filters.get('failed_namespaces'):
+            mark_degraded()  # Flagged in the result, since coalesced requests didn't run the sampling themselves
+        return jsonify(dict(filters, status='success')), 200
         
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error getting PYQ filters: {str(e)}")
         return jsonify({
@@ -1764,8 +2566,63 @@ def get_pyq_filters():
             'years': []
         }), 500
 
+def collect_pyq_filters(mcq_index, mcq_model):
+    """Sample every PYQ namespace and collect the exam, subject and year filter values"""
+    # Get all namespaces
+    stats = mcq_index.describe_index_stats(**pinecone_timeout())
+    namespaces = list(stats.namespaces.keys()) if stats.namespaces else []
+    
+    exams_set = set()
+    subjects_set = set()
+    years_set = set()
+    failed_namespaces = []
+    
+    # Sample questions from each namespace to get filters
+    dummy_query = mcq_model.encode("sample").tolist()
+    
+    for namespace in namespaces:
+        try:
+            results = mcq_index.query(
+                vector=dummy_query,
+                top_k=100,
+                include_metadata=True,
+                namespace=namespace,
+                **pinecone_timeout()
+            )
+            
+            for match in results['matches']:
+                metadata = match.get('metadata', {})
+                
+                # Typed PYQ fields, or the decoded full_json_str for older records
+                full_data = pyq_fields(metadata)
+                
+                exam_name = full_data.get('exam_name', metadata.get('exam_name', ''))
+                exam_year = str(full_data.get('exam_year', metadata.get('exam_year', '')))
+                subject = full_data.get('subject', metadata.get('subject', ''))
+                
+                if exam_name:
+                    exams_set.add(exam_name)
+                if exam_year and exam_year != 'Unknown':
+                    years_set.add(exam_year)
+                if subject:
+                    subjects_set.add(subject)
+                    
+        except StageOverloaded:
+            raise
+        except Exception as e:
+            print(f"Error sampling namespace {namespace}: {str(e)}")
+            failed_namespaces.append(namespace)
+            continue
+    
+    return {
+        'exams': sorted(list(exams_set)),
+        'subjects': sorted(list(subjects_set)),
+        'years': sorted(list(years_set), reverse=True),
+        'failed_namespaces': failed_namespaces
+    }
 
 @app.route("/api/pyq/random", methods=["POST"])
+@requires_models
 @rate_limit(max_requests=30, window_seconds=60)
 def get_random_pyq_questions():
     """Get random PYQ questions with optional filters"""
@@ -1787,7 +2644,8 @@ def get_random_pyq_questions():
             'exam': exam_filter,
             'subject': subject_filter,
             'year': year_filter,
-            'limit': count * 2  # Get more than needed for randomization
+            'limit': count * 2,  # Get more than needed for randomization
+            'compact': data.get('compact', False)
         }
         
         # Call the search function internally
@@ -1810,6 +2668,8 @@ def get_random_pyq_questions():
         else:
             return response, status
             
+    except StageOverloaded:
+        raise
     except Exception as e:
         print(f"Error getting random PYQ questions: {str(e)}")
         return jsonify({
@@ -1817,11 +2677,15 @@ def get_random_pyq_questions():
             'questions': []
         }), 500
 
+if BACKGROUND_INIT and __name__ != "__main__":
+    start_background_init()
+
 if __name__ == "__main__":
-    # Initialize the search system before starting the app
-    initialize_search_system()
-    
     is_production = os.getenv('FLASK_ENV') == 'production'
+    
+    # Initialize in the background; with the debug reloader only the serving child loads models
+    if is_production or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background_init()
     port = int(os.getenv('PORT', 5000))
     
     if is_production:
@@ -1836,11 +2700,14 @@ if __name__ == "__main__":
         print("   - GET /api/total-questions - Total questions count")
         print("   - GET /api/stats - System statistics")
         print("   - GET /api/health - Health check")
+        print("   - GET /api/health/live - Liveness probe")
+        print("   - GET /api/health/ready - Readiness probe")
         print("   - GET /api/questions - Get questions with filtering")
         print("   - GET /api/filters - Get unique exam names and subjects for dropdowns")
         print("   - GET /api/books - Get inserted books")
         print("   - GET /api/inserted-pyqs - Get inserted PYQs")
         print("   - POST /api/pyq/search - Search PYQ questions with filters")
+        print("   - POST /api/pyq/questions - Look up questions by ID")
         print("   - GET /api/pyq/filters - Get available PYQ filter options")
         print("   - POST /api/pyq/random - Get random PYQ questions")
         print("   - GET /api/dashboard/stats - Dashboard statistics")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+JSON Benchmark
+Compares stdlib json and orjson on the workloads the API actually runs:
+decoding PYQ full_json_str metadata and encoding large PYQ listings.
+
+Usage: python bench_json.py [--records 3000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import time
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+EXAMS = ["UPSC Prelims", "SSC CGL", "IBPS PO", "SBI Clerk", "CBSE Class 10", "State PSC"]
+SUBJECTS = ["Geography", "Polity", "History", "Economics", "Science", "Current Affairs"]
+TERMS = ["", "Tier 1", "Tier 2", "Shift 1", "Shift 2"]
+
+def make_record(i):
+    """Build one synthetic PYQ record shaped like the pyq-1 index metadata"""
+    exam_name = random.choice(EXAMS)
+    exam_year = random.randint(2005, 2024)
+    question = {
+        "question": f"Question {i}: Which of the following statements about topic {i % 97} is correct? " * 2,
+        "options": {key: f"Option {key.upper()} for question {i} with some descriptive text" for key in "abcd"},
+        "correct_option": random.choice("abcd"),
+        "correct_answer": f"Option for question {i}",
+        "explanation": "Detailed explanation of the answer referencing the relevant NCERT chapter. " * 4,
+        "exam_name": exam_name,
+        "exam_year": exam_year,
+        "exam_term": random.choice(TERMS),
+        "subject": random.choice(SUBJECTS),
+        "topic": f"Topic {i % 97}"
+    }
+    return {
+        "full_json_str": json.dumps(question),
+        "exam_name": exam_name,
+        "exam_year": exam_year,
+        "subject": question["subject"]
+    }
+
+def make_listing(decoded):
+    """Build a /api/questions style response body from decoded records"""
+    questions = []
+    for i, data in enumerate(decoded):
+        questions.append({
+            "id": f"q_{i:06d}",
+            "question": data["question"],
+            "options": list(data["options"].values()),
+            "correct_option": data["correct_option"],
+            "correct_answer": "abcd".index(data["correct_option"]),
+            "correct_answer_text": data["correct_answer"],
+            "exam_name": data["exam_name"],
+            "exam_year": data["exam_year"],
+            "year": data["exam_year"],
+            "exam_term": data["exam_term"],
+            "term": data["exam_term"],
+            "subject": data["subject"],
+            "explanation": data["explanation"],
+            "metadata": {
+                "exam_name": data["exam_name"],
+                "exam_year": data["exam_year"],
+                "exam_term": data["exam_term"],
+                "subject": data["subject"]
+            },
+            "similarity": round(random.random(), 3)
+        })
+    return {"questions": questions, "total": len(questions), "timestamp": time.time()}
+
+def best_of(repeat, fn):
+    """Return the best wall time of `repeat` runs in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark stdlib json against orjson on PYQ payloads")
+    parser.add_argument("--records", type=int, default=3000, help="Number of PYQ records (3 namespaces x 1000 by default)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args()
+
+    random.seed(42)
+    metadata = [make_record(i) for i in range(args.records)]
+    blobs = [m["full_json_str"] for m in metadata]
+    listing = make_listing([json.loads(b) for b in blobs])
+
+    rows = []
+    stdlib_decode = best_of(args.repeat, lambda: [json.loads(b) for b in blobs])
+    # Flask's default provider sorts keys, keep that behaviour on both sides
+    stdlib_encode = best_of(args.repeat, lambda: json.dumps(listing, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    payload_size = len(json.dumps(listing, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    rows.append(("full_json_str decode", stdlib_decode))
+    rows.append(("listing encode", stdlib_encode))
+
+    print(f"📊 {args.records} PYQ records, listing payload {payload_size / 1024:.0f} KB, best of {args.repeat}")
+    if orjson is None:
+        print("⚠️  orjson is not installed - only stdlib timings are shown (pip install orjson)")
+        for name, stdlib_ms in rows:
+            print(f"   {name:<22} stdlib {stdlib_ms:8.2f} ms")
+        return
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+    fast_decode = best_of(args.repeat, lambda: [orjson.loads(b) for b in blobs])
+    fast_encode = best_of(args.repeat, lambda: orjson.dumps(listing, option=options))
+
+    print(f"   {'workload':<22} {'stdlib':>10} {'orjson':>10} {'speedup':>8}")
+    for (name, stdlib_ms), fast_ms in zip(rows, (fast_decode, fast_encode)):
+        print(f"   {name:<22} {stdlib_ms:8.2f}ms {fast_ms:8.2f}ms {stdlib_ms / fast_ms:7.1f}x")
+
+if __name__ == "__main__":
+    main()
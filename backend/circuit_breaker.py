@@ -0,0 +1,163 @@
+"""
+Circuit Breakers
+Fail fast when a dependency (Pinecone namespace, Groq API) keeps failing.
+
+A breaker is CLOSED while the failure rate over its rolling window stays below
+the threshold. Once it trips it is OPEN and rejects calls immediately with
+CircuitOpenError. After the cool-down it goes HALF_OPEN and lets a single probe
+through: success closes it again, failure re-opens it.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+BREAKER_FAILURE_RATE = float(os.getenv('BREAKER_FAILURE_RATE', 0.5))
+BREAKER_MIN_CALLS = int(os.getenv('BREAKER_MIN_CALLS', 5))
+BREAKER_WINDOW_SECONDS = float(os.getenv('BREAKER_WINDOW_SECONDS', 60))
+BREAKER_OPEN_SECONDS = float(os.getenv('BREAKER_OPEN_SECONDS', 30))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name, retry_after):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker over a rolling time window"""
+
+    def __init__(self, name, failure_rate=BREAKER_FAILURE_RATE, min_calls=BREAKER_MIN_CALLS,
+                 window_seconds=BREAKER_WINDOW_SECONDS, open_seconds=BREAKER_OPEN_SECONDS):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self._lock = threading.Lock()
+        self._outcomes = deque()  # (monotonic timestamp, succeeded)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _prune(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def _current_state(self, now):
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+        return self._state
+
+    def _trip(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.times_opened += 1
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def allow(self):
+        """Reserve a call slot or raise CircuitOpenError"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            self.rejected += 1
+            retry_after = max(0.0, self.open_seconds - (now - self._opened_at)) if state == OPEN else 1.0
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == HALF_OPEN:
+                # Probe succeeded - start over with a clean window
+                self._state = CLOSED
+                self._outcomes.clear()
+                self._probe_in_flight = False
+            self._outcomes.append((now, True))
+            self._prune(now)
+
+    def record_failure(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._current_state(now) == HALF_OPEN:
+                self._trip(now)
+                return
+            self._outcomes.append((now, False))
+            self._prune(now)
+            calls = len(self._outcomes)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            if self._state == CLOSED and calls >= self.min_calls and failures / calls >= self.failure_rate:
+                self._trip(now)
+
+    def release(self):
+        """Give back a reserved slot without recording an outcome (e.g. a client-side error)"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def call(self, fn, *args, is_failure=None, **kwargs):
+        """Run fn through the breaker; is_failure(exc) decides which errors count"""
+        self.allow()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_failure is None or is_failure(e):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self):
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            state = self._current_state(now)
+            calls = len(self._outcomes)
+            failures = sum(1 for _, succeeded in self._outcomes if not succeeded)
+            return {
+                'state': state,
+                'calls_in_window': calls,
+                'failure_rate': round(failures / calls, 3) if calls else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected,
+                'retry_after': round(max(0.0, self.open_seconds - (now - self._opened_at)), 1) if state == OPEN else 0
+            }
+
+# Breakers by dependency name, e.g. "groq" or "pinecone:pyq-1:BANKING EXAMS"
+breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in breakers:
+            breakers[name] = CircuitBreaker(name)
+        return breakers[name]
+
+def breakers_snapshot():
+    with _breakers_lock:
+        items = list(breakers.items())
+    return {name: breaker.snapshot() for name, breaker in sorted(items)}
+
+def any_open():
+    with _breakers_lock:
+        items = list(breakers.values())
+    return any(breaker.state != CLOSED for breaker in items)
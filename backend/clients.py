@@ -0,0 +1,286 @@
+"""
+Client Management
+Shared, pooled Pinecone and Groq clients with retry policy and per-client metrics.
+
+One Pinecone client serves both indexes, and connection pools are sized to the
+number of requests a worker process can run at once. Idempotent Pinecone reads
+are retried with jittered exponential backoff; writes are never retried here.
+"""
+
+import os
+import random
+import threading
+import time
+
+from admission import get_gate
+from circuit_breaker import get_breaker
+
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+# Requests a single worker process serves concurrently (gthread threads; set 1 for sync workers)
+WORKER_THREADS = int(os.getenv('GUNICORN_THREADS', os.getenv('WORKER_THREADS', 4)))
+HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', max(4, WORKER_THREADS * 2)))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv('HTTP_KEEPALIVE_SECONDS', 60))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv('HTTP_CONNECT_TIMEOUT_SECONDS', 3))
+
+PINECONE_MAX_ATTEMPTS = int(os.getenv('PINECONE_MAX_ATTEMPTS', 3))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv('RETRY_BASE_DELAY_SECONDS', 0.1))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv('RETRY_MAX_DELAY_SECONDS', 1.0))
+GROQ_MAX_RETRIES = int(os.getenv('GROQ_MAX_RETRIES', 2))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def is_retryable(exc):
+    """Transient failures worth retrying: throttling, 5xx, timeouts and dropped connections"""
+    status = getattr(exc, 'status', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    return urllib3 is not None and isinstance(exc, urllib3.exceptions.HTTPError)
+
+def is_timeout(exc):
+    if isinstance(exc, TimeoutError):
+        return True
+    if urllib3 is None:
+        return False
+    # urllib3 read/connect timeouts, also when wrapped in a MaxRetryError
+    return isinstance(exc, urllib3.exceptions.TimeoutError) or isinstance(getattr(exc, 'reason', None), urllib3.exceptions.TimeoutError)
+
+def is_breaker_failure(exc):
+    """Retryable errors, except timeouts of an attempt the caller's own deadline cut short (see _retry_loop)"""
+    return is_retryable(exc) and not getattr(exc, 'deadline_cut_short', False)
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+
+    def __init__(self, max_attempts=PINECONE_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY_SECONDS, max_delay=RETRY_MAX_DELAY_SECONDS):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Sleep before retry number `attempt` (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+class ClientMetrics:
+    """Thread-safe request counters for one client"""
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.total_latency = 0.0
+        self.last_error = None
+        self.last_error_at = None
+        # Optional callable returning connection pool stats for this client
+        self.connection_gauge = None
+
+    def start(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+        return time.monotonic()
+
+    def finish(self, started_at, error=None):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_latency += time.monotonic() - started_at
+            if error is not None:
+                self.errors += 1
+                self.last_error = f"{type(error).__name__}: {error}"[:200]
+                self.last_error_at = time.time()
+
+    def retried(self):
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self):
+        with self._lock:
+            completed = self.requests - self.in_flight
+            snapshot = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'in_flight': self.in_flight,
+                'avg_latency_ms': round(self.total_latency / completed * 1000, 1) if completed else 0,
+                'last_error': self.last_error,
+                'last_error_at': self.last_error_at
+            }
+        if self.connection_gauge is not None:
+            try:
+                snapshot['connections'] = self.connection_gauge()
+            except Exception:
+                snapshot['connections'] = None
+        return snapshot
+
+# All metrics by client name, read by /api/metrics
+client_metrics = {}
+_metrics_lock = threading.Lock()
+
+def get_metrics(name):
+    with _metrics_lock:
+        if name not in client_metrics:
+            client_metrics[name] = ClientMetrics(name)
+        return client_metrics[name]
+
+class InstrumentedIndex:
+    """Pinecone Index wrapper adding retries for reads and metrics for every call
+
+    Read calls accept a `_deadline` keyword (any object with `remaining()`):
+    retries stop once the backoff would run past it and each attempt's
+    `_request_timeout` is clamped to the time left. Reads go through a circuit
+    breaker per namespace ("pinecone:<index>:<namespace>") or per index for
+    calls without a namespace, so a failing namespace fails fast. Vector
+    queries also hold a slot of the 'vector' admission gate.
+    """
+
+    READ_METHODS = ('query', 'fetch', 'describe_index_stats', 'list', 'list_paginated')
+
+    def __init__(self, index, name, retry_policy=None):
+        self._index = index
+        self.name = name
+        self.metrics = get_metrics(f"pinecone:{name}")
+        self.metrics.connection_gauge = self._connection_stats
+        self.retry_policy = retry_policy or RetryPolicy()
+
+    def _connection_stats(self):
+        """urllib3 pool stats - relies on client internals, so None when unavailable"""
+        try:
+            pools = self._index._vector_api.api_client.rest_client.pool_manager.pools
+            opened = idle = 0
+            for key in list(pools.keys()):
+                pool = pools[key]
+                opened += pool.num_connections
+                idle += pool.pool.qsize() if pool.pool is not None else 0
+            return {'opened': opened, 'idle': idle}
+        except Exception:
+            return None
+
+    def __getattr__(self, attr):
+        target = getattr(self._index, attr)
+        if not callable(target):
+            return target
+        if attr == 'query':
+            return lambda *args, **kwargs: self._gated_query(target, *args, **kwargs)
+        if attr in self.READ_METHODS:
+            return lambda *args, **kwargs: self._call_with_retry(target, *args, **kwargs)
+        return lambda *args, **kwargs: self._call_once(target, *args, **kwargs)
+
+    def _call_once(self, fn, *args, **kwargs):
+        kwargs.pop('_deadline', None)
+        started_at = self.metrics.start()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.metrics.finish(started_at, e)
+            raise
+        self.metrics.finish(started_at)
+        return result
+
+    def breaker_for(self, namespace=None):
+        return get_breaker(f"pinecone:{self.name}:{namespace}" if namespace else f"pinecone:{self.name}")
+
+    def _call_with_retry(self, fn, *args, **kwargs):
+        breaker = self.breaker_for(kwargs.get('namespace'))
+        return breaker.call(self._retry_loop, fn, *args, is_failure=is_breaker_failure, **kwargs)
+
+    def _gated_query(self, fn, *args, **kwargs):
+        # Rejected queries raise StageOverloaded before reaching the breaker
+        with get_gate('vector').admit(kwargs.get('_deadline')):
+            return self._call_with_retry(fn, *args, **kwargs)
+
+    def _retry_loop(self, fn, *args, **kwargs):
+        deadline = kwargs.pop('_deadline', None)
+        timeout_cap = kwargs.get('_request_timeout')
+        attempt = 0
+        while True:
+            attempt += 1
+            cut_short = False
+            if deadline is not None and timeout_cap is not None:
+                remaining = deadline.remaining()
+                cut_short = remaining < timeout_cap
+                kwargs['_request_timeout'] = max(0.1, min(timeout_cap, remaining))
+            started_at = self.metrics.start()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.metrics.finish(started_at, e)
+                if cut_short and is_timeout(e):
+                    # Our request ran out of time, not Pinecone: don't count it against the breaker
+                    e.deadline_cut_short = True
+                if attempt >= self.retry_policy.max_attempts or not is_retryable(e):
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                if deadline is not None and deadline.remaining() <= delay:
+                    raise
+                self.metrics.retried()
+                time.sleep(delay)
+                continue
+            self.metrics.finish(started_at)
+            return result
+
+def create_pinecone_indexes(api_key, index_names):
+    """Open every index through one shared, pooled Pinecone client
+
+    Returns {name: InstrumentedIndex}. TCP keep-alive is enabled by the
+    Pinecone client's default socket options; the pool size decides how many
+    idle connections survive between requests.
+    """
+    from pinecone import Pinecone
+
+    pc = Pinecone(api_key=api_key, pool_threads=HTTP_POOL_MAXSIZE)
+    indexes = {}
+    for name in index_names:
+        index = pc.Index(name, pool_threads=HTTP_POOL_MAXSIZE, connection_pool_maxsize=HTTP_POOL_MAXSIZE)
+        indexes[name] = InstrumentedIndex(index, name)
+    return indexes
+
+def create_groq_client(api_key, timeout):
+    """Groq client on a pooled keep-alive httpx transport that records metrics"""
+    import httpx
+    from groq import Groq
+
+    metrics = get_metrics('groq')
+
+    class InstrumentedTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            started_at = metrics.start()
+            try:
+                response = super().handle_request(request)
+            except Exception as e:
+                metrics.finish(started_at, e)
+                raise
+            metrics.finish(started_at, RuntimeError(f"HTTP {response.status_code}") if response.status_code >= 400 else None)
+            return response
+
+    transport = InstrumentedTransport(
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_MAXSIZE,
+            max_keepalive_connections=HTTP_POOL_MAXSIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_SECONDS
+        )
+    )
+    metrics.connection_gauge = lambda: {'open': len(transport._pool.connections)}
+    http_client = httpx.Client(
+        transport=transport,
+        timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS)
+    )
+    return Groq(api_key=api_key, http_client=http_client, max_retries=GROQ_MAX_RETRIES, timeout=timeout)
+
+def metrics_snapshot():
+    """Metrics for every client plus the pool configuration"""
+    return {
+        'pool': {
+            'worker_threads': WORKER_THREADS,
+            'pool_maxsize': HTTP_POOL_MAXSIZE,
+            'keepalive_seconds': HTTP_KEEPALIVE_SECONDS
+        },
+        'clients': {name: metrics.snapshot() for name, metrics in list(client_metrics.items())}
+    }
@@ -0,0 +1,675 @@
+"""
+Dashboard Stats
+Per-user activity aggregates behind the /api/dashboard endpoints.
+
+Questions, chats and MCQ attempts are counted in per-day ring buffers
+(DASHBOARD_HISTORY_DAYS slots, one per calendar day at DASHBOARD_UTC_OFFSET_MINUTES),
+so daily and weekly goals read a fixed number of slots, and the study streak is
+counted back from today over the days with any activity. Late or out-of-order
+events (offline batches) land in their own day's slot, so the streak doesn't
+depend on the order events arrived in. Achievement rules are indexed by the counter they
+watch and unlocked ids are kept in a set, so an event only evaluates the rules
+of the counters it changed. Every user has a lock; readers get fresh copies,
+never shared state.
+
+Events are persisted in an append-only JSONL log (DASHBOARD_EVENT_LOG), shared
+by all gunicorn workers: a worker applies events by tailing the log, in log
+order, so every worker (and a restarted one replaying the log) ends up with the
+same stats. Past DASHBOARD_LOG_COMPACT_BYTES the log is folded into a snapshot
+file and started afresh under the next generation number. Client idempotency
+keys are remembered per user, so a retried batch is applied once.
+
+Workers keep at most DASHBOARD_MAX_USERS users in memory. Users that fall out
+are reloaded from the snapshot and log when needed, and reads for users with
+no events return defaults without being stored.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # No cross-process log locking (Windows dev)
+
+DASHBOARD_HISTORY_DAYS = int(os.getenv('DASHBOARD_HISTORY_DAYS', 35))
+DASHBOARD_UTC_OFFSET_MINUTES = int(os.getenv('DASHBOARD_UTC_OFFSET_MINUTES', 330))  # IST
+DASHBOARD_MAX_USERS = int(os.getenv('DASHBOARD_MAX_USERS', 10000))
+DASHBOARD_EVENT_LOG = os.getenv('DASHBOARD_EVENT_LOG', os.path.join(tempfile.gettempdir(), 'pratiyogita-dashboard-events.jsonl'))
+DASHBOARD_LOG_COMPACT_BYTES = int(os.getenv('DASHBOARD_LOG_COMPACT_BYTES', 4 * 1024 * 1024))
+DASHBOARD_MAX_BATCH = int(os.getenv('DASHBOARD_MAX_BATCH', 200))
+DASHBOARD_MAX_CLOCK_SKEW_SECONDS = 300  # Client timestamps further in the future are clamped to now
+MAX_ACTIVITIES = 50
+MAX_ACHIEVEMENTS = 20
+MAX_IDEMPOTENCY_KEYS = 1000  # Remembered per user
+
+SUBJECTS = ('Geography', 'Polity', 'History', 'Economics', 'Science', 'Others')
+EVENT_TYPES = ('chat', 'search', 'mcq_attempt', 'set_totals')
+TOTAL_FIELDS = ('total_chats', 'total_questions', 'total_mcq_attempted', 'mcq_correct', 'mcq_wrong')
+
+# (id, title, target, type)
+GOALS = (
+    (1, 'Daily Questions', 10, 'daily'),
+    (2, 'Weekly Sessions', 7, 'weekly'),
+    (3, 'Subject Coverage', 5, 'subjects'),
+    (4, 'Study Streak', 7, 'streak')
+)
+
+# Achievement rules, grouped by the counter whose change can unlock them
+ACHIEVEMENT_RULES = {
+    'questions': (
+        ('first_question', 'First Question!', 'Asked your first question', '🎯',
+         lambda s: s.total_questions >= 1),
+        ('ten_questions', 'Curious Mind!', 'Asked 10 questions', '🧠',
+         lambda s: s.total_questions >= 10),
+    ),
+    'mcq': (
+        ('first_mcq', 'Quiz Starter!', 'Attempted your first MCQ', '📝',
+         lambda s: s.total_mcq_attempted >= 1),
+        ('half_accurate', 'Getting Better!', 'Achieved 50% MCQ accuracy', '📈',
+         lambda s: s.total_mcq_attempted >= 10 and s.mcq_correct * 2 >= s.total_mcq_attempted),
+    )
+}
+EVENT_COUNTERS = {'search': ('questions',), 'mcq_attempt': ('mcq',), 'set_totals': ('questions', 'mcq')}
+
+def normalize_timestamp(timestamp, now=None):
+    """Client timestamp in unix seconds (JS milliseconds accepted); missing or future ones become now"""
+    now = now if now is not None else time.time()
+    if not isinstance(timestamp, (int, float)) or isinstance(timestamp, bool):
+        return now
+    if timestamp > 1e11:
+        timestamp /= 1000.0
+    return now if timestamp > now + DASHBOARD_MAX_CLOCK_SKEW_SECONDS else timestamp
+
+def day_number(timestamp):
+    """Calendar day index of a unix timestamp in seconds"""
+    return int((timestamp + DASHBOARD_UTC_OFFSET_MINUTES * 60) // 86400)
+
+def make_event(raw, now=None):
+    """Validated event from a client payload; raises ValueError when it can't be tracked"""
+    if not isinstance(raw, dict):
+        raise ValueError("event must be an object")
+    event_type = raw.get('type', '')
+    if event_type not in EVENT_TYPES or event_type == 'set_totals':
+        raise ValueError(f"unknown event type '{event_type}'")
+    data = raw.get('data') or {}
+    if not isinstance(data, dict):
+        raise ValueError("event data must be an object")
+    key = raw.get('id', raw.get('idempotency_key'))
+    return {
+        'type': event_type,
+        # Only the fields the aggregates use are kept (and logged)
+        'data': {field: data[field] for field in ('subject', 'correct') if field in data},
+        'timestamp': normalize_timestamp(raw.get('timestamp'), now),
+        'key': str(key)[:128] if key is not None else None
+    }
+
+class DayRing:
+    """Fixed window of per-day counts; a slot is reset when a newer day reuses it"""
+
+    __slots__ = ('days', 'counts')
+
+    def __init__(self, size=DASHBOARD_HISTORY_DAYS):
+        self.days = [-1] * size
+        self.counts = [0] * size
+
+    def add(self, day, amount=1):
+        slot = day % len(self.days)
+        if self.days[slot] != day:
+            if self.days[slot] > day:
+                return False  # Older than the window
+            self.days[slot] = day
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+        return True
+
+    def get(self, day):
+        slot = day % len(self.days)
+        return self.counts[slot] if self.days[slot] == day else 0
+
+    def total(self, last_day, span):
+        """Sum of the `span` days ending at last_day"""
+        return sum(self.get(day) for day in range(last_day - span + 1, last_day + 1))
+
+    def to_dict(self):
+        return {str(day): count for day, count in zip(self.days, self.counts) if day >= 0}
+
+    @classmethod
+    def from_dict(cls, data):
+        ring = cls()
+        for day, count in sorted((int(day), count) for day, count in data.items()):
+            ring.add(day, count)
+        return ring
+
+class UserStats:
+    """One user's totals, day rings, streak, activities and achievements"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total_chats = 0
+        self.total_questions = 0
+        self.total_mcq_attempted = 0
+        self.mcq_correct = 0
+        self.mcq_wrong = 0
+        self.subjects = dict.fromkeys(SUBJECTS, 0)
+        self.subjects_used = 0
+        self.questions = DayRing()
+        self.chats = DayRing()
+        self.mcq_attempts = DayRing()
+        self.activities = deque(maxlen=MAX_ACTIVITIES)
+        self.achievements = deque(maxlen=MAX_ACHIEVEMENTS)
+        self.unlocked = set()
+        self.seen_keys = OrderedDict()
+
+    def _active(self, day):
+        return self.questions.get(day) > 0 or self.chats.get(day) > 0 or self.mcq_attempts.get(day) > 0
+
+    def _streak(self, today):
+        """Consecutive active days ending today, or yesterday when today has no activity yet (caller holds the lock)"""
+        day = today if self._active(today) else today - 1
+        streak = 0
+        while streak < DASHBOARD_HISTORY_DAYS and self._active(day - streak):
+            streak += 1
+        return streak
+
+    def _unlock(self, counter, timestamp):
+        unlocked = []
+        for achievement_id, title, description, icon, rule in ACHIEVEMENT_RULES[counter]:
+            if achievement_id in self.unlocked or not rule(self):
+                continue
+            self.unlocked.add(achievement_id)
+            achievement = {
+                'id': achievement_id,
+                'title': title,
+                'description': description,
+                'icon': icon,
+                'date': 'Just now',
+                'timestamp': timestamp
+            }
+            self.achievements.append(achievement)
+            unlocked.append(achievement)
+        return unlocked
+
+    def is_duplicate(self, key):
+        with self.lock:
+            return key is not None and key in self.seen_keys
+
+    def _remember(self, key):
+        self.seen_keys[key] = None
+        while len(self.seen_keys) > MAX_IDEMPOTENCY_KEYS:
+            self.seen_keys.popitem(last=False)
+
+    def _apply(self, event):
+        """Apply one event to the counters (caller holds the lock)"""
+        event_type, data, timestamp = event['type'], event['data'], event['timestamp']
+        day = day_number(timestamp)
+        if event_type == 'set_totals':
+            for key in TOTAL_FIELDS:
+                value = data.get(key)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    setattr(self, key, int(value))
+            return
+        if event_type == 'chat':
+            self.total_chats += 1
+            self.chats.add(day)
+            activity = {'type': 'chat', 'description': 'Started a new conversation'}
+        elif event_type == 'search':
+            self.total_questions += 1
+            self.questions.add(day)
+            subject = data.get('subject', 'Others')
+            if subject not in self.subjects:
+                subject = 'Others'
+            if self.subjects[subject] == 0:
+                self.subjects_used += 1
+            self.subjects[subject] += 1
+            activity = {'type': 'search', 'description': f'Asked a question about {subject}'}
+        else:
+            is_correct = bool(data.get('correct', False))
+            self.total_mcq_attempted += 1
+            self.mcq_attempts.add(day)
+            if is_correct:
+                self.mcq_correct += 1
+            else:
+                self.mcq_wrong += 1
+            activity = {'type': 'mcq', 'description': f'Answered MCQ {"correctly" if is_correct else "incorrectly"}'}
+        self.activities.append(dict(activity, timestamp=timestamp))
+
+    def record_batch(self, events):
+        """Apply events in the given (log) order, skipping seen idempotency keys
+
+        Achievements are checked after each event, for the counters it changed,
+        so the result depends only on the event sequence, not on how a worker's
+        reads of the log split it. Returns (applied events, duplicate count,
+        unlocked achievements).
+        """
+        applied = []
+        duplicates = 0
+        unlocked = []
+        with self.lock:
+            for event in events:
+                key = event.get('key')
+                if key is not None:
+                    if key in self.seen_keys:
+                        duplicates += 1
+                        continue
+                    self._remember(key)
+                self._apply(event)
+                applied.append(event)
+                for counter in EVENT_COUNTERS.get(event['type'], ()):
+                    unlocked.extend(self._unlock(counter, event['timestamp']))
+        return applied, duplicates, unlocked
+
+    def stats(self):
+        with self.lock:
+            accuracy = round(self.mcq_correct / self.total_mcq_attempted * 100, 1) if self.total_mcq_attempted else 0
+            return {
+                'totalChats': self.total_chats,
+                'totalQuestions': self.total_questions,
+                'totalMcqAttempted': self.total_mcq_attempted,
+                'mcqCorrect': self.mcq_correct,
+                'mcqWrong': self.mcq_wrong,
+                'mcqAccuracy': accuracy
+            }
+
+    def subject_counts(self):
+        with self.lock:
+            return list(self.subjects.items())
+
+    def goals(self, now=None):
+        """Goal progress computed from the rings - a new list every call"""
+        today = day_number(now if now is not None else time.time())
+        with self.lock:
+            progress = {
+                'daily': self.questions.get(today),
+                'weekly': self.chats.total(today, 7),
+                'subjects': self.subjects_used,
+                'streak': self._streak(today)
+            }
+        return [
+            {'id': goal_id, 'title': title, 'current': min(progress[goal_type], target), 'target': target, 'type': goal_type}
+            for goal_id, title, target, goal_type in GOALS
+        ]
+
+    def achievement_list(self):
+        with self.lock:
+            return list(self.achievements)
+
+    def recent_activities(self, limit=10):
+        with self.lock:
+            return list(self.activities)[-limit:]
+
+    def to_dict(self):
+        """Snapshot form, for log compaction"""
+        with self.lock:
+            return {
+                **{field: getattr(self, field) for field in TOTAL_FIELDS},
+                'subjects': dict(self.subjects),
+                'questions': self.questions.to_dict(),
+                'chats': self.chats.to_dict(),
+                'mcq_attempts': self.mcq_attempts.to_dict(),
+                'activities': list(self.activities),
+                'achievements': list(self.achievements),
+                'unlocked': sorted(self.unlocked),
+                'seen_keys': list(self.seen_keys)
+            }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        for field in TOTAL_FIELDS:
+            setattr(stats, field, data.get(field, 0))
+        stats.subjects.update(data.get('subjects', {}))
+        stats.subjects_used = sum(1 for count in stats.subjects.values() if count > 0)
+        stats.questions = DayRing.from_dict(data.get('questions', {}))
+        stats.chats = DayRing.from_dict(data.get('chats', {}))
+        stats.mcq_attempts = DayRing.from_dict(data.get('mcq_attempts', {}))
+        stats.activities.extend(data.get('activities', []))
+        stats.achievements.extend(data.get('achievements', []))
+        stats.unlocked = set(data.get('unlocked', []))
+        for key in data.get('seen_keys', []):
+            stats._remember(key)
+        return stats
+
+class EventLog:
+    """Append-only JSONL event log with a snapshot file, shared by worker processes
+
+    Appends and reads hold a shared lock on <path>.lock, compaction an exclusive
+    one. Compaction replaces the log file with one whose first line is a
+    {"generation": n} header (n also goes into the snapshot). Readers track the
+    (inode, generation) version, so a replaced log is noticed even when the
+    filesystem reuses the old inode, and reload from the new snapshot.
+    """
+
+    def __init__(self, path, compact_bytes=DASHBOARD_LOG_COMPACT_BYTES):
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot"
+        self.lock_path = f"{path}.lock"
+        self.compact_bytes = compact_bytes
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        if not os.path.exists(path):
+            open(path, 'a').close()
+
+    @contextmanager
+    def _locked(self, exclusive=False):
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def append(self, records):
+        payload = "".join(json.dumps(record, separators=(',', ':'), ensure_ascii=False) + "\n" for record in records)
+        with self._locked():
+            # One O_APPEND write per batch, so concurrent batches never interleave
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, payload.encode('utf-8'))
+            finally:
+                os.close(fd)
+
+    def _read_snapshot(self):
+        """(users, generation) of the snapshot file"""
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data.get('users', {}), data.get('generation', 0)
+        except FileNotFoundError:
+            return {}, 0
+
+    def _version(self, f):
+        """(inode, generation) of an open log; a log that was never compacted has no header and is generation 0"""
+        f.seek(0)
+        first = f.readline()
+        generation = 0
+        if first.endswith(b"\n"):
+            try:
+                generation = json.loads(first).get('generation', 0)
+            except ValueError:
+                pass
+        return os.fstat(f.fileno()).st_ino, generation
+
+    def _read_records(self, f, limit=-1):
+        """Complete event lines from the current position; returns (records, bytes consumed)"""
+        data = f.read(limit)
+        end = data.rfind(b"\n") + 1  # A line still being written is left for the next read
+        records = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return [record for record in records if 'u' in record], end
+
+    def _reload(self, f, version):
+        """Snapshot users and the offset to tail from after the log was replaced"""
+        users, snapshot_generation = self._read_snapshot()
+        if snapshot_generation > version[1]:
+            # Compaction stopped between writing the snapshot and replacing the log: the log is already folded in
+            return users, os.fstat(f.fileno()).st_size
+        return users, 0
+
+    def read(self, version, offset):
+        """New records since (version, offset)
+
+        Returns (snapshot users or None, records, version, offset); the snapshot is
+        only returned when the log was replaced and the caller must reload.
+        """
+        with self._locked():
+            with open(self.path, 'rb') as f:
+                current = self._version(f)
+                snapshot = None
+                if current != version:
+                    snapshot, offset = self._reload(f, current)
+                f.seek(offset)
+                records, consumed = self._read_records(f)
+        return snapshot, records, current, offset + consumed
+
+    def read_user(self, user_id, version, offset):
+        """One user's snapshot entry (or None) and events up to offset; None when the log changed since `version`"""
+        with self._locked():
+            with open(self.path, 'rb') as f:
+                if self._version(f) != version:
+                    return None
+                users, start = self._reload(f, version)
+                f.seek(start)
+                records, _ = self._read_records(f, max(0, offset - start))
+        return users.get(user_id), [record for record in records if record['u'] == user_id]
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def compact(self, fold):
+        """Fold snapshot + log into a new snapshot (fold(users, records) -> users) and start an empty log"""
+        with self._locked(exclusive=True):
+            with open(self.path, 'rb') as f:
+                version = self._version(f)
+                users, start = self._reload(f, version)
+                f.seek(start)
+                records, _ = self._read_records(f)
+            generation = version[1] + 1
+            users = fold(users, records)
+            snapshot = json.dumps({'users': users, 'generation': generation, 'compacted_at': time.time()})
+            for target, content in ((self.snapshot_path, snapshot), (self.path, json.dumps({'generation': generation}) + "\n")):
+                temp_path = f"{target}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, target)
+        return len(records)
+
+def fold_records(users, records):
+    """Apply log records to serialized users (used by compaction)"""
+    stats = {user_id: UserStats.from_dict(data) for user_id, data in users.items()}
+    for user_id, events in group_records(records).items():
+        stats.setdefault(user_id, UserStats()).record_batch(events)
+    return {user_id: user.to_dict() for user_id, user in stats.items()}
+
+def group_records(records):
+    """Log records -> {user_id: [event, ...]}, keeping log order"""
+    grouped = OrderedDict()
+    for record in records:
+        grouped.setdefault(record['u'], []).append({
+            'type': record['t'], 'data': record.get('d', {}), 'timestamp': record['ts'], 'key': record.get('k')
+        })
+    return grouped
+
+class StatsStore:
+    """UserStats per user id, kept in sync with the shared event log
+
+    At most max_users users are kept in memory, least recently used first out.
+    With the log, an evicted user is rebuilt from the snapshot and log on its
+    next use. Without one (DASHBOARD_EVENT_LOG='') stats are in-memory only and
+    evicted users start over.
+
+    Two locks: _log_lock serializes log reads and appends, so records are
+    applied in log order, and _lock guards the in-memory tables. Disk reads and
+    JSON parsing happen under _log_lock only; _lock is taken just to apply the
+    parsed records, so it is never held across I/O.
+    """
+
+    def __init__(self, max_users=DASHBOARD_MAX_USERS, log_path=DASHBOARD_EVENT_LOG):
+        self.max_users = max_users
+        self._users = OrderedDict()
+        self._known = set()  # Users with logged events, so reads of unknown ids allocate nothing
+        self._lock = threading.RLock()
+        self._log_lock = threading.RLock()  # Always taken before _lock
+        self._compacting = threading.Event()
+        self.log = None
+        self.log_version = None
+        self.log_offset = 0
+        self.counters = {'batches': 0, 'events': 0, 'duplicates': 0, 'compactions': 0, 'reloads': 0}
+        if log_path:
+            try:
+                self.log = EventLog(log_path)
+                self.sync()
+                print(f"📒 Dashboard events logged to {log_path} ({len(self._known)} users)")
+            except Exception as e:
+                self.log = None
+                print(f"⚠️ Dashboard event log unavailable ({e}), stats are in-memory only")
+
+    def _cache(self, user_id, stats):
+        """Store a user (caller holds _lock)"""
+        self._users[user_id] = stats
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+        return stats
+
+    def _load(self, user_id):
+        """Rebuild an evicted user from the snapshot and the log up to where this worker has read it (caller holds _log_lock)"""
+        while True:
+            found = self.log.read_user(user_id, self.log_version, self.log_offset)
+            if found is not None:
+                break
+            self.sync()  # The log was compacted meanwhile
+            with self._lock:
+                if user_id in self._users:
+                    return self._users[user_id]
+        data, records = found
+        stats = UserStats.from_dict(data) if data else UserStats()
+        stats.record_batch(group_records(records).get(user_id, []))
+        with self._lock:
+            self.counters['reloads'] += 1
+        return stats
+
+    def _get(self, user_id):
+        """Cached user, else loaded or fresh stats (caller holds _log_lock, so the log offset can't move meanwhile)"""
+        with self._lock:
+            stats = self._users.get(user_id)
+            if stats is not None:
+                self._users.move_to_end(user_id)
+                return stats
+            known = self.log is not None and user_id in self._known
+        stats = self._load(user_id) if known else UserStats()
+        with self._lock:
+            return self._cache(user_id, stats)
+
+    def get(self, user_id):
+        """Stats of a user to update, after catching up with events other workers logged"""
+        with self._log_lock:
+            self.sync()
+            return self._get(user_id)
+
+    def peek(self, user_id):
+        """Stats of a user to read; a user with no events gets fresh defaults that aren't stored"""
+        with self._log_lock:
+            self.sync()
+            with self._lock:
+                stored = user_id in self._users or user_id in self._known
+            return self._get(user_id) if stored else UserStats()
+
+    def sync(self):
+        """Apply new log records to the users in memory; returns {user_id: (applied, duplicates, unlocked)}"""
+        if self.log is None:
+            return {}
+        with self._log_lock:
+            snapshot, records, version, offset = self.log.read(self.log_version, self.log_offset)
+            grouped = group_records(records)
+            if snapshot is not None:
+                # Users in memory are refreshed, the rest are loaded from the snapshot when needed.
+                # Only _log_lock holders add users, so the cached set can't change while this is built.
+                with self._lock:
+                    cached = list(self._users)
+                refreshed = OrderedDict(
+                    (user_id, UserStats.from_dict(snapshot[user_id])) for user_id in cached if user_id in snapshot
+                )
+            with self._lock:
+                if snapshot is not None:
+                    self._known = set(snapshot)
+                    self._users = refreshed
+                self.log_version, self.log_offset = version, offset
+                results = {}
+                for user_id, events in grouped.items():
+                    self._known.add(user_id)
+                    if user_id in self._users:
+                        results[user_id] = self._users[user_id].record_batch(events)
+            return results
+
+    def track(self, user_id, events):
+        """Apply a batch of make_event() events; returns (applied count, duplicates, unlocked achievements)"""
+        with self._log_lock:
+            user = self.get(user_id)
+            fresh = []
+            duplicates = 0
+            batch_keys = set()
+            for event in events:
+                key = event['key']
+                if key is not None and (key in batch_keys or user.is_duplicate(key)):
+                    duplicates += 1
+                    continue
+                if key is not None:
+                    batch_keys.add(key)
+                fresh.append(event)
+            # An offline batch is logged (and so applied) in the order its events happened
+            fresh.sort(key=lambda event: event['timestamp'])
+            if self.log is None:
+                applied, _, unlocked = user.record_batch(fresh)
+                applied = len(applied)
+            else:
+                # Written first, then applied by tailing - the same path other workers take
+                if fresh:
+                    self.log.append([
+                        {'u': user_id, 't': event['type'], 'd': event['data'], 'ts': event['timestamp'], 'k': event['key']}
+                        for event in fresh
+                    ])
+                applied, log_duplicates, unlocked = self.sync().get(user_id, ([], 0, []))
+                applied = sum(1 for event in applied if event in fresh)
+                duplicates += len(fresh) - applied
+            with self._lock:
+                self.counters['batches'] += 1
+                self.counters['events'] += applied
+                self.counters['duplicates'] += duplicates
+        self.maybe_compact()
+        return applied, duplicates, unlocked
+
+    def set_totals(self, user_id, values):
+        """Overwrite lifetime totals (the update-stats endpoint)"""
+        event = {
+            'type': 'set_totals',
+            'data': {key: values[key] for key in TOTAL_FIELDS if key in values},
+            'timestamp': time.time(),
+            'key': None
+        }
+        self.track(user_id, [event])
+
+    def maybe_compact(self):
+        """Compact in the background once the log outgrows DASHBOARD_LOG_COMPACT_BYTES"""
+        if self.log is None or self._compacting.is_set() or self.log.size() < self.log.compact_bytes:
+            return
+        self._compacting.set()
+
+        def compact():
+            try:
+                folded = self.log.compact(fold_records)
+                with self._lock:
+                    self.counters['compactions'] += 1
+                print(f"🗜️ Compacted {folded} dashboard events into the snapshot")
+            except Exception as e:
+                print(f"⚠️ Dashboard log compaction failed: {e}")
+            finally:
+                self._compacting.clear()
+
+        threading.Thread(target=compact, name='dashboard-compaction', daemon=True).start()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'users': len(self._users),
+                'known_users': len(self._known),
+                'log': self.log.path if self.log else None,
+                'log_bytes': self.log.size() if self.log else 0,
+                **self.counters
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._users)
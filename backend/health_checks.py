@@ -0,0 +1,84 @@
+"""
+Dependency Health Checks
+Runs dependency checks on a background thread and caches the results, so health
+probes answer from memory instead of calling Pinecone on every request.
+"""
+
+import os
+import threading
+import time
+
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv('HEALTH_CHECK_INTERVAL_SECONDS', 30))
+
+class DependencyChecker:
+    """Periodically runs registered checks and keeps the latest result of each
+
+    A check is a callable returning a dict of details; raising marks the
+    dependency unhealthy. Results carry the time they were taken so readers
+    can tell how fresh they are.
+    """
+
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL_SECONDS):
+        self.interval = interval
+        self._checks = {}
+        self._results = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, name, check):
+        with self._lock:
+            self._checks[name] = check
+
+    def run_once(self):
+        """Run every check now and store the results"""
+        with self._lock:
+            checks = list(self._checks.items())
+        for name, check in checks:
+            started_at = time.monotonic()
+            result = {'checked_at': time.time()}
+            try:
+                result['details'] = check() or {}
+                result['status'] = 'healthy'
+            except Exception as e:
+                result['status'] = 'unhealthy'
+                result['error'] = f"{type(e).__name__}: {e}"[:200]
+            result['latency_ms'] = round((time.monotonic() - started_at) * 1000, 1)
+            with self._lock:
+                previous = self._results.get(name)
+                # Keep the last good details around so readers still have data during an outage
+                if result['status'] != 'healthy' and previous and 'details' in previous:
+                    result['last_healthy_details'] = previous.get('details', previous.get('last_healthy_details'))
+                self._results[name] = result
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Dependency check loop failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        """Start the background thread (no-op when already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='dependency-checker', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def result(self, name):
+        with self._lock:
+            result = self._results.get(name)
+            return dict(result) if result else None
+
+    def results(self):
+        with self._lock:
+            return {name: dict(result) for name, result in self._results.items()}
+
+    def all_healthy(self):
+        with self._lock:
+            return all(result['status'] == 'healthy' for result in self._results.values())
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+NCERT Ingestion
+Builds and refreshes the `ncert` Pinecone index from source documents.
+
+Sources are streamed file by file, split into overlapping word chunks and
+hashed. Only chunks whose content hash differs from the last run's manifest are
+embedded (in large batches, on every core) and upserted; chunks that disappeared
+from a re-ingested source, and all chunks of a source that is gone, are deleted. A re-run after editing one chapter only
+touches that chapter.
+
+Source layout (namespace = first directory, one of the NCERT subjects):
+    <root>/<namespace>/**/*.txt|*.md   "# " heading = chapter name, "## " heading = topic;
+                                       "class-10" style directories set the class
+    <root>/<namespace>/**/*.jsonl      one section per line: {"text", "source", "class",
+                                       "unit", "chapter", "chapter_name", "topic"}
+
+Usage: python ingest_ncert.py <root> [--namespace polity] [--processes 4] [--dry-run] [--force]
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+NCERT_NAMESPACES = ["geography", "polity", "history", "economics", "science"]
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+INGEST_MANIFEST_DIR = os.getenv('INGEST_MANIFEST_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ingest_manifests'))
+
+CHUNK_WORDS = int(os.getenv('CHUNK_WORDS', 180))
+CHUNK_OVERLAP_WORDS = int(os.getenv('CHUNK_OVERLAP_WORDS', 30))
+EMBED_BATCH_SIZE = int(os.getenv('EMBED_BATCH_SIZE', 512))  # chunks per encode call
+UPSERT_BATCH_SIZE = int(os.getenv('UPSERT_BATCH_SIZE', 100))  # vectors per Pinecone request
+UPSERT_THREADS = int(os.getenv('UPSERT_THREADS', 4))
+
+SOURCE_EXTENSIONS = ('.txt', '.md', '.jsonl')
+CLASS_PATTERN = re.compile(r"class[\s_-]*(\d+)", re.IGNORECASE)
+SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+
+def slugify(text):
+    return SLUG_PATTERN.sub('-', str(text).lower()).strip('-')
+
+def content_hash(text, metadata):
+    """Hash of the chunk text and metadata - any change means re-embed and re-upsert"""
+    payload = json.dumps({'text': text, 'metadata': metadata}, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def build_hierarchy(section):
+    parts = []
+    if section.get('class'):
+        parts.append(f"Class {section['class']}")
+    for key in ('unit', 'chapter_name', 'topic'):
+        if section.get(key):
+            parts.append(str(section[key]))
+    return " > ".join(parts)
+
+# --- Streaming sources ---
+
+def iter_source_files(root, namespaces):
+    """Yield (namespace, path) for every source file, in a stable order"""
+    for namespace in namespaces:
+        namespace_dir = os.path.join(root, namespace)
+        if not os.path.isdir(namespace_dir):
+            continue
+        for dirpath, dirnames, filenames in os.walk(namespace_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith(SOURCE_EXTENSIONS):
+                    yield namespace, os.path.join(dirpath, filename)
+
+def iter_text_sections(path, base_metadata):
+    """Stream a .txt/.md file into sections split on chapter/topic headings"""
+    section = dict(base_metadata)
+    lines = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith('# ') or stripped.startswith('## '):
+                if lines:
+                    yield dict(section, text=" ".join(lines))
+                    lines = []
+                if stripped.startswith('# '):
+                    section['chapter_name'] = stripped[2:].strip()
+                    section['topic'] = ''
+                else:
+                    section['topic'] = stripped[3:].strip()
+                continue
+            if stripped:
+                lines.append(stripped)
+    if lines:
+        yield dict(section, text=" ".join(lines))
+
+def iter_jsonl_sections(path, base_metadata):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"⚠️ Skipping invalid JSON at {path}:{line_number}")
+                continue
+            if record.get('text'):
+                yield dict(base_metadata, **{k: v for k, v in record.items() if v is not None})
+
+def iter_sections(root, namespace, path):
+    relative = os.path.relpath(path, root)
+    class_match = CLASS_PATTERN.search(os.path.dirname(relative))
+    base_metadata = {
+        'source': relative.replace(os.sep, '/'),
+        'subject': namespace,
+        'class': class_match.group(1) if class_match else '',
+        'unit': '',
+        'chapter': '',
+        'chapter_name': os.path.splitext(os.path.basename(path))[0].replace('_', ' ').replace('-', ' ').title(),
+        'topic': ''
+    }
+    if path.endswith('.jsonl'):
+        return iter_jsonl_sections(path, base_metadata)
+    return iter_text_sections(path, base_metadata)
+
+def chunk_words(text, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP_WORDS):
+    words = text.split()
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    step = max(1, size - overlap)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + size]))
+        if start + size >= len(words):
+            break
+    return chunks
+
+def iter_chunks(root, namespace, path):
+    """Yield (vector id, text, metadata) for every chunk of one source file
+
+    Ids are "<source>-<section>-<n>" with the section keyed by its heading path,
+    so editing one topic does not renumber the chunks of the others.
+    """
+    for section in iter_sections(root, namespace, path):
+        section['hierarchy'] = section.get('hierarchy') or build_hierarchy(section)
+        section_key = hashlib.sha1(section['hierarchy'].encode('utf-8')).hexdigest()[:8]
+        for number, text in enumerate(chunk_words(section.pop('text')), 1):
+            metadata = {key: str(value) for key, value in section.items()}
+            metadata.update({'text': text, 'chunk': number})
+            vector_id = f"{slugify(metadata['source'])}-{section_key}-{number}"
+            yield vector_id, text, metadata
+
+# --- Manifest ---
+
+class Manifest:
+    """Per-namespace record of what is in Pinecone: vector id -> content hash and source"""
+
+    def __init__(self, namespace, model_name):
+        self.namespace = namespace
+        self.model_name = model_name
+        self.path = os.path.join(INGEST_MANIFEST_DIR, f"ncert-{namespace}.json")
+        self.chunks = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # A different embedding model invalidates every stored vector
+            if data.get('model') == model_name:
+                self.chunks = data.get('chunks', {})
+
+    def unchanged(self, vector_id, digest):
+        entry = self.chunks.get(vector_id)
+        return entry is not None and entry['hash'] == digest
+
+    def ids_for_source(self, source):
+        return {vector_id for vector_id, entry in self.chunks.items() if entry['source'] == source}
+
+    def sources(self):
+        return {entry['source'] for entry in self.chunks.values()}
+
+    def save(self):
+        os.makedirs(INGEST_MANIFEST_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'model': self.model_name, 'updated_at': time.time(), 'chunks': self.chunks}, f)
+        os.replace(tmp_path, self.path)
+
+# --- Embedding and upserts ---
+
+class Embedder:
+    """SentenceTransformer encoder; spreads large batches over a process pool when processes > 1"""
+
+    def __init__(self, model_name=EMBEDDING_MODEL, processes=1):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name, device='cpu')
+        self.pool = None
+        if processes > 1:
+            self.pool = self.model.start_multi_process_pool(['cpu'] * processes)
+
+    def encode(self, texts):
+        if self.pool is not None:
+            embeddings = self.model.encode_multi_process(texts, self.pool, batch_size=64)
+        else:
+            embeddings = self.model.encode(texts, batch_size=64, show_progress_bar=False)
+        return [embedding.tolist() for embedding in embeddings]
+
+    def close(self):
+        if self.pool is not None:
+            self.model.stop_multi_process_pool(self.pool)
+            self.pool = None
+
+def upsert_with_retry(pinecone_index, vectors, namespace, retry_policy):
+    """Upserts use deterministic ids, so retrying a batch is safe"""
+    from clients import is_retryable
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return pinecone_index.upsert(vectors=vectors, namespace=namespace)
+        except Exception as e:
+            if attempt >= retry_policy.max_attempts or not is_retryable(e):
+                raise
+            time.sleep(retry_policy.delay(attempt))
+
+class NamespaceIngestor:
+    """Buffers changed chunks of one namespace, embeds and upserts them in batches"""
+
+    def __init__(self, pinecone_index, embedder, manifest, dry_run=False, force=False):
+        from clients import RetryPolicy
+
+        self.index = pinecone_index
+        self.embedder = embedder
+        self.manifest = manifest
+        self.dry_run = dry_run
+        self.force = force
+        self.retry_policy = RetryPolicy()
+        self.pending = []
+        self.stats = {'chunks': 0, 'unchanged': 0, 'upserted': 0, 'deleted': 0}
+
+    def add(self, vector_id, text, metadata):
+        self.stats['chunks'] += 1
+        digest = content_hash(text, metadata)
+        if not self.force and self.manifest.unchanged(vector_id, digest):
+            self.stats['unchanged'] += 1
+            return
+        self.pending.append((vector_id, text, metadata, digest))
+        if len(self.pending) >= EMBED_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        if self.dry_run:
+            self.stats['upserted'] += len(batch)
+            return
+
+        embeddings = self.embedder.encode([text for _, text, _, _ in batch])
+        vectors = [
+            {'id': vector_id, 'values': embedding, 'metadata': metadata}
+            for (vector_id, _, metadata, _), embedding in zip(batch, embeddings)
+        ]
+        upsert_batches = [vectors[i:i + UPSERT_BATCH_SIZE] for i in range(0, len(vectors), UPSERT_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=UPSERT_THREADS) as executor:
+            list(executor.map(
+                lambda chunk: upsert_with_retry(self.index, chunk, self.manifest.namespace, self.retry_policy),
+                upsert_batches
+            ))
+
+        # Record progress only after Pinecone has the vectors, so an interrupted run resumes here
+        for vector_id, _, metadata, digest in batch:
+            self.manifest.chunks[vector_id] = {'hash': digest, 'source': metadata['source']}
+        self.manifest.save()
+        self.stats['upserted'] += len(batch)
+
+    def remove_stale(self, source, current_ids):
+        """Delete chunks a re-ingested source no longer produces"""
+        stale = sorted(self.manifest.ids_for_source(source) - current_ids)
+        if not stale:
+            return
+        self.stats['deleted'] += len(stale)
+        if self.dry_run:
+            return
+        for start in range(0, len(stale), 1000):
+            self.index.delete(ids=stale[start:start + 1000], namespace=self.manifest.namespace)
+        for vector_id in stale:
+            self.manifest.chunks.pop(vector_id, None)
+        self.manifest.save()
+
+def manifests_digest(namespaces):
+    """Hash of every namespace manifest (vector ids and content hashes): the index's content version"""
+    digest = hashlib.sha1()
+    for namespace in sorted(namespaces):
+        manifest = Manifest(namespace, EMBEDDING_MODEL)
+        for vector_id, entry in sorted(manifest.chunks.items()):
+            digest.update(f"{namespace}/{vector_id}={entry['hash']}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+def ingest_namespace(root, namespace, pinecone_index, embedder, dry_run=False, force=False):
+    manifest = Manifest(namespace, EMBEDDING_MODEL)
+    ingestor = NamespaceIngestor(pinecone_index, embedder, manifest, dry_run=dry_run, force=force)
+    seen_sources = set()
+    for _, path in iter_source_files(root, [namespace]):
+        ids_by_source = {}  # a .jsonl file may carry several sources
+        for vector_id, text, metadata in iter_chunks(root, namespace, path):
+            ids_by_source.setdefault(metadata['source'], set()).add(vector_id)
+            ingestor.add(vector_id, text, metadata)
+        # Pending chunks must land before stale ones are deleted
+        ingestor.flush()
+        for source, source_ids in ids_by_source.items():
+            ingestor.remove_stale(source, source_ids)
+        seen_sources.update(ids_by_source)
+    ingestor.flush()
+    # Sources in the manifest that no file produced this run were deleted: drop their chunks too
+    removed_sources = sorted(manifest.sources() - seen_sources)
+    if removed_sources and not seen_sources:
+        print(f"⚠️ {namespace}: no sources found under {root}, not removing the {len(removed_sources)} sources in the manifest")
+        removed_sources = []
+    for source in removed_sources:
+        print(f"🗑️  {namespace}: source '{source}' is gone, removing its chunks")
+        ingestor.remove_stale(source, set())
+    ingestor.stats['removed_sources'] = len(removed_sources)
+    return ingestor.stats
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Incrementally ingest NCERT sources into the ncert Pinecone index")
+    parser.add_argument("root", help="Directory with one sub-directory per subject namespace")
+    parser.add_argument("--namespace", choices=NCERT_NAMESPACES, action="append", help="Only ingest these namespaces (repeatable)")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Embedding processes (default: all cores)")
+    parser.add_argument("--index", default="ncert")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without embedding or writing")
+    parser.add_argument("--force", action="store_true", help="Re-embed every chunk, ignoring the manifest")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    pinecone_index = None
+    embedder = None
+    if not args.dry_run:
+        from clients import create_pinecone_indexes
+
+        api_key = os.getenv('PINECONE_API_KEY')
+        if not api_key:
+            raise SystemExit("❌ PINECONE_API_KEY is not set")
+        pinecone_index = create_pinecone_indexes(api_key, [args.index])[args.index]
+        print(f"🔄 Loading {EMBEDDING_MODEL} on {args.processes} process(es)...")
+        embedder = Embedder(EMBEDDING_MODEL, processes=args.processes)
+
+    try:
+        for namespace in args.namespace or NCERT_NAMESPACES:
+            started_at = time.time()
+            stats = ingest_namespace(args.root, namespace, pinecone_index, embedder, dry_run=args.dry_run, force=args.force)
+            print(
+                f"✅ {namespace}: {stats['chunks']} chunks, {stats['unchanged']} unchanged, "
+                f"{stats['upserted']} upserted, {stats['deleted']} deleted "
+                f"({stats['removed_sources']} removed sources) in {time.time() - started_at:.1f}s"
+            )
+    finally:
+        if embedder is not None:
+            embedder.close()
+
+    if not args.dry_run:
+        from response_cache import invalidate_after_ingestion, record_content_version
+        record_content_version(args.index, manifests_digest(NCERT_NAMESPACES))
+        invalidate_after_ingestion('answers', 'catalog')
+        print("ℹ️  Rebuild the lexical index to pick up the changes: python lexical_index.py --index ncert")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Lexical Index
+In-memory BM25 inverted index over PYQ questions and NCERT chunks.
+
+Exact phrases, article numbers and names ("Article 370", "Dandi March") are
+matched on their tokens instead of going through an embedding. The index is
+built from the Pinecone records themselves and saved to disk so workers can
+load it at startup.
+
+Usage: python lexical_index.py [--index pyq|ncert|all]   (rebuild from Pinecone)
+"""
+
+import gzip
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from pyq_schema import typed_fields
+
+LEXICAL_INDEX_DIR = os.getenv('LEXICAL_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexical_index'))
+# Build missing indexes from Pinecone at startup (otherwise run this script once after ingestion)
+LEXICAL_INDEX_AUTOBUILD = os.getenv('LEXICAL_INDEX_AUTOBUILD', 'false').lower() in ('1', 'true', 'yes')
+FETCH_BATCH_SIZE = 100
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were which with
+what who whom when where why how does do did not no can will shall should would could about into than
+then there these those their they them his her he she we you your our us i me my
+""".split())
+
+def tokenize(text):
+    """Lowercase alphanumeric tokens without stop words; numbers are kept"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+def normalize_phrase(text):
+    return " ".join(TOKEN_PATTERN.findall(text.lower()))
+
+class BM25Index:
+    """BM25 (Okapi) scoring over an inverted index
+
+    Documents are (doc_id, namespace, text, payload) tuples; payload is returned
+    untouched with each hit (for PYQs it is the Pinecone metadata, so hits can be
+    formatted without another fetch).
+    """
+
+    def __init__(self, k1=1.5, b=0.75, phrase_boost=0.5):
+        self.k1 = k1
+        self.b = b
+        self.phrase_boost = phrase_boost
+        self.doc_ids = []
+        self.namespaces = []
+        self.payloads = []
+        self.phrases = []
+        self.doc_lengths = []
+        self.postings = {}  # term -> list of (doc index, term frequency)
+        self.avg_doc_length = 0.0
+        self.idf = {}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, doc_id, namespace, text, payload=None):
+        doc_index = len(self.doc_ids)
+        tokens = tokenize(text)
+        self.doc_ids.append(doc_id)
+        self.namespaces.append(namespace)
+        self.payloads.append(payload if payload is not None else {})
+        self.phrases.append(normalize_phrase(text))
+        self.doc_lengths.append(len(tokens))
+        for term, frequency in Counter(tokens).items():
+            self.postings.setdefault(term, []).append((doc_index, frequency))
+
+    def finalize(self):
+        """Compute IDF and average length - call after the last add()"""
+        count = len(self.doc_ids)
+        self.avg_doc_length = (sum(self.doc_lengths) / count) if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+        return self
+
+    def search(self, query, top_k=10, namespaces=None):
+        """Return the top_k hits as dicts with id, namespace, score and metadata"""
+        terms = set(tokenize(query))
+        if not terms or not self.doc_ids:
+            return []
+
+        allowed = set(namespaces) if namespaces else None
+        scores = {}
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = self.idf[term]
+            for doc_index, frequency in postings:
+                if allowed is not None and self.namespaces[doc_index] not in allowed:
+                    continue
+                length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / self.avg_doc_length)
+                scores[doc_index] = scores.get(doc_index, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + length_norm)
+
+        if not scores:
+            return []
+
+        # Exact phrase matches rank above documents that merely share the words
+        phrase = normalize_phrase(query)
+        if len(terms) > 1 and phrase:
+            for doc_index in scores:
+                if phrase in self.phrases[doc_index]:
+                    scores[doc_index] *= 1 + self.phrase_boost
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                'id': self.doc_ids[doc_index],
+                'namespace': self.namespaces[doc_index],
+                'score': score,
+                'metadata': self.payloads[doc_index]
+            }
+            for doc_index, score in best
+        ]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({
+                'version': 1,
+                'docs': [
+                    [doc_id, namespace, payload]
+                    for doc_id, namespace, payload in zip(self.doc_ids, self.namespaces, self.payloads)
+                ]
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, text_fn):
+        """Load saved documents and rebuild postings with the same text function used to build"""
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls()
+        for doc_id, namespace, payload in data['docs']:
+            index.add(doc_id, namespace, text_fn(payload), payload)
+        return index.finalize()
+
+def pyq_text(metadata):
+    """Searchable text of a PYQ record: question and option texts"""
+    data = typed_fields(metadata)
+    if data is None:
+        data = {}
+        raw = metadata.get('full_json_str')
+        if raw:
+            try:
+                data = json.loads(raw)
+            except ValueError:
+                data = {}
+    question = data.get('question') or metadata.get('question') or metadata.get('text', '')
+    options = data.get('options') or {}
+    if isinstance(options, dict):
+        option_texts = [str(value) for value in options.values()]
+    else:
+        option_texts = [str(value) for value in options]
+    option_texts += [str(metadata[key]) for key in ('option_a', 'option_b', 'option_c', 'option_d') if metadata.get(key)]
+    return " ".join([str(question)] + option_texts)
+
+def ncert_text(metadata):
+    """Searchable text of an NCERT chunk: chunk text plus chapter and topic names"""
+    parts = [metadata.get('text', ''), metadata.get('chapter_name', ''), metadata.get('topic', '')]
+    return " ".join(str(part) for part in parts if part)
+
+TEXT_FUNCTIONS = {'pyq': pyq_text, 'ncert': ncert_text}
+
+def index_path(name):
+    return os.path.join(LEXICAL_INDEX_DIR, f"{name}.json.gz")
+
+def iter_index_records(pinecone_index, namespace):
+    """Yield (id, metadata) for every vector in a namespace via list + fetch"""
+    for ids in pinecone_index.list(namespace=namespace):
+        ids = list(ids)
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            response = pinecone_index.fetch(ids=ids[start:start + FETCH_BATCH_SIZE], namespace=namespace)
+            for vector_id, vector in response.vectors.items():
+                metadata = getattr(vector, 'metadata', None) or {}
+                yield vector_id, dict(metadata)
+
+def build_from_pinecone(pinecone_index, namespaces, text_fn):
+    index = BM25Index()
+    for namespace in namespaces:
+        for vector_id, metadata in iter_index_records(pinecone_index, namespace):
+            index.add(vector_id, namespace, text_fn(metadata), metadata)
+    return index.finalize()
+
+def load_or_build(name, pinecone_index, namespaces, build_missing=LEXICAL_INDEX_AUTOBUILD):
+    """Load a saved index, or build it from Pinecone and save it (None when missing and not building)"""
+    path = index_path(name)
+    text_fn = TEXT_FUNCTIONS[name]
+    if os.path.exists(path):
+        return BM25Index.load(path, text_fn)
+    if not build_missing:
+        return None
+    if callable(namespaces):
+        namespaces = namespaces()
+    index = build_from_pinecone(pinecone_index, namespaces, text_fn)
+    index.save(path)
+    return index
+
+class LexicalIndexes:
+    """Holder for the lexical indexes, loaded on a background thread"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.Lock()
+        self.errors = {}
+
+    def get(self, name):
+        with self._lock:
+            return self._indexes.get(name)
+
+    def set(self, name, index):
+        with self._lock:
+            self._indexes[name] = index
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {'documents': len(index), 'terms': len(index.postings)}
+                for name, index in self._indexes.items()
+            }
+
+    def load_in_background(self, sources):
+        """sources: {name: (pinecone_index, namespaces or callable returning them)}"""
+        def run():
+            for name, (pinecone_index, namespaces) in sources.items():
+                try:
+                    index = load_or_build(name, pinecone_index, namespaces)
+                    if index is None:
+                        print(f"ℹ️  Lexical index '{name}' not built yet - run: python lexical_index.py --index {name}")
+                        continue
+                    self.set(name, index)
+                    print(f"✅ Lexical index '{name}' ready ({len(index)} documents)")
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    print(f"⚠️  Failed to load lexical index '{name}': {e}")
+        thread = threading.Thread(target=run, name='lexical-index-loader', daemon=True)
+        thread.start()
+        return thread
+
+def reciprocal_rank_fusion(result_lists, key_fn, k=60):
+    """Fuse ranked lists with RRF; returns [(key, fused score, first item seen)] best first"""
+    fused = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, 1):
+            key = key_fn(item)
+            score, first = fused.get(key, (0.0, item))
+            fused[key] = (score + 1.0 / (k + rank), first)
+    ranked = sorted(fused.items(), key=lambda entry: entry[1][0], reverse=True)
+    return [(key, score, item) for key, (score, item) in ranked]
+
+def main():
+    import argparse
+    from clients import create_pinecone_indexes
+
+    parser = argparse.ArgumentParser(description="Rebuild the lexical (BM25) indexes from Pinecone")
+    parser.add_argument("--index", choices=["pyq", "ncert", "all"], default="all")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    api_key = os.getenv('PINECONE_API_KEY')
+    if not api_key:
+        raise SystemExit("❌ PINECONE_API_KEY is not set")
+
+    indexes = create_pinecone_indexes(api_key, ['ncert', 'pyq-1'])
+    targets = {
+        'pyq': (indexes['pyq-1'], None),
+        'ncert': (indexes['ncert'], ["geography", "polity", "history", "economics", "science"])
+    }
+    for name, (pinecone_index, namespaces) in targets.items():
+        if args.index not in (name, 'all'):
+            continue
+        if namespaces is None:
+            stats = pinecone_index.describe_index_stats()
+            namespaces = list(stats.namespaces.keys()) if stats.namespaces else []
+        index = build_from_pinecone(pinecone_index, namespaces, TEXT_FUNCTIONS[name])
+        index.save(index_path(name))
+        print(f"✅ {name}: {len(index)} documents, {len(index.postings)} terms -> {index_path(name)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+PYQ Bulk Loader
+Validates PYQ records, embeds them in batches and upserts them into the pyq-1
+index with typed, filterable metadata (see pyq_schema.py).
+
+Input is a .json array or .jsonl file of records with question, options,
+correct_option, explanation, exam_name, exam_year, exam_term, subject and an
+optional topic, id and namespace. Invalid records are written to
+<input>.rejects.jsonl with the reason (<input>.dry-run.rejects.jsonl for a dry
+run, so it never touches a real run's rejects). Progress is checkpointed after
+every upserted batch, so an interrupted load resumes where it stopped.
+
+Usage: python load_pyqs.py <file> --namespace "BANKING EXAMS" [--dry-run] [--restart]
+"""
+
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from ingest_ncert import EMBED_BATCH_SIZE, INGEST_MANIFEST_DIR, UPSERT_BATCH_SIZE, UPSERT_THREADS, Embedder, upsert_with_retry
+from pyq_schema import ValidationError, build_metadata, embedding_text, validate_record
+
+PYQ_EMBEDDING_MODEL = os.getenv('PYQ_EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2')
+
+def iter_input_records(path):
+    """Yield (position, record) from a .jsonl file or a .json array"""
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            for position, line in enumerate(f):
+                if not line.strip():
+                    continue
+                try:
+                    yield position, json.loads(line)
+                except ValueError as e:
+                    yield position, {'_invalid_json': str(e)}
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+    if isinstance(records, dict):
+        records = records.get('questions', [])
+    for position, record in enumerate(records):
+        yield position, record
+
+def record_id(clean):
+    """Deterministic vector id, so re-loading the same question overwrites instead of duplicating"""
+    key = "|".join([clean['question'].lower(), clean['exam_name'].lower(), str(clean['exam_year']), clean['exam_term'].lower()])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+def rejects_file(input_path, dry_run=False):
+    return f"{input_path}.dry-run.rejects.jsonl" if dry_run else f"{input_path}.rejects.jsonl"
+
+def logged_reject_positions(rejects_path):
+    """Input positions already in a rejects file"""
+    positions = set()
+    try:
+        with open(rejects_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    positions.add(json.loads(line)['position'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+    except FileNotFoundError:
+        pass
+    return positions
+
+class Checkpoint:
+    """Last fully upserted input position, tied to the input file's size and mtime"""
+
+    def __init__(self, input_path, namespace):
+        name = f"pyq-{os.path.basename(input_path)}-{hashlib.sha1(namespace.encode('utf-8')).hexdigest()[:8]}.checkpoint.json"
+        self.path = os.path.join(INGEST_MANIFEST_DIR, name)
+        stat = os.stat(input_path)
+        self.signature = f"{stat.st_size}:{int(stat.st_mtime)}"
+        self.position = -1
+        self.loaded = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # A modified input file starts over
+            if data.get('signature') == self.signature:
+                self.position = data.get('position', -1)
+                self.loaded = data.get('loaded', 0)
+
+    def save(self, position, loaded):
+        self.position = position
+        self.loaded = loaded
+        os.makedirs(INGEST_MANIFEST_DIR, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'signature': self.signature, 'position': position, 'loaded': loaded, 'updated_at': time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def load_file(path, namespace, pinecone_index, embedder, dry_run=False, restart=False):
+    checkpoint = Checkpoint(path, namespace)
+    if restart:
+        checkpoint.clear()
+        checkpoint.position, checkpoint.loaded = -1, 0
+    resuming = checkpoint.position >= 0
+    if resuming:
+        print(f"↩️  Resuming after record {checkpoint.position} ({checkpoint.loaded} already loaded)")
+
+    from clients import RetryPolicy
+    retry_policy = RetryPolicy()
+    # A dry run writes nothing, so what passed validation is reported as would-load, not loaded
+    stats = {'loaded': checkpoint.loaded, 'validated': 0, 'rejected': 0, 'skipped': 0}
+    pending = []  # (position, vector id, clean record)
+
+    def flush():
+        if not pending:
+            return
+        batch = list(pending)
+        pending.clear()
+        if not dry_run:
+            embeddings = embedder.encode([embedding_text(clean) for _, _, clean in batch])
+            vectors = [
+                {'id': vector_id, 'values': embedding, 'metadata': build_metadata(clean)}
+                for (_, vector_id, clean), embedding in zip(batch, embeddings)
+            ]
+            upsert_batches = [vectors[i:i + UPSERT_BATCH_SIZE] for i in range(0, len(vectors), UPSERT_BATCH_SIZE)]
+            with ThreadPoolExecutor(max_workers=UPSERT_THREADS) as executor:
+                list(executor.map(lambda chunk: upsert_with_retry(pinecone_index, chunk, namespace, retry_policy), upsert_batches))
+        if dry_run:
+            stats['validated'] += len(batch)
+            return
+        stats['loaded'] += len(batch)
+        checkpoint.save(batch[-1][0], stats['loaded'])
+
+    rejects_path = rejects_file(path, dry_run)
+    # A resumed run adds to the rejects of the runs before it. Records rejected after the
+    # last checkpoint are validated again, so positions already written are skipped.
+    append = resuming and not dry_run
+    logged = logged_reject_positions(rejects_path) if append else set()
+    with open(rejects_path, 'a' if append else 'w', encoding='utf-8') as rejects:
+        for position, record in iter_input_records(path):
+            if position <= checkpoint.position:
+                stats['skipped'] += 1
+                continue
+            try:
+                if '_invalid_json' in record:
+                    raise ValidationError(f"invalid JSON: {record['_invalid_json']}")
+                clean = validate_record(record)
+            except ValidationError as e:
+                stats['rejected'] += 1
+                if position in logged:
+                    continue
+                rejects.write(json.dumps({'position': position, 'error': str(e), 'record': record}, ensure_ascii=False) + "\n")
+                continue
+            vector_id = str(record.get('id') or record_id(clean))
+            pending.append((position, vector_id, clean))
+            if len(pending) >= EMBED_BATCH_SIZE:
+                flush()
+        flush()
+
+    if os.path.getsize(rejects_path) == 0:
+        os.remove(rejects_path)
+    return stats
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Validate and bulk-load PYQ records into the pyq-1 index")
+    parser.add_argument("input", help=".json array or .jsonl file of PYQ records")
+    parser.add_argument("--namespace", required=True, help="Target namespace, e.g. 'BANKING EXAMS'")
+    parser.add_argument("--index", default="pyq-1")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Embedding processes (default: all cores)")
+    parser.add_argument("--dry-run", action="store_true", help="Validate only, without embedding or writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and load from the start")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    pinecone_index = None
+    embedder = None
+    if not args.dry_run:
+        from clients import create_pinecone_indexes
+
+        api_key = os.getenv('PINECONE_API_KEY')
+        if not api_key:
+            raise SystemExit("❌ PINECONE_API_KEY is not set")
+        pinecone_index = create_pinecone_indexes(api_key, [args.index])[args.index]
+        print(f"🔄 Loading {PYQ_EMBEDDING_MODEL} on {args.processes} process(es)...")
+        embedder = Embedder(PYQ_EMBEDDING_MODEL, processes=args.processes)
+
+    started_at = time.time()
+    try:
+        stats = load_file(args.input, args.namespace, pinecone_index, embedder, dry_run=args.dry_run, restart=args.restart)
+    finally:
+        if embedder is not None:
+            embedder.close()
+
+    outcome = f"{stats['validated']} validated (would load)" if args.dry_run else f"{stats['loaded']} loaded"
+    print(
+        f"✅ {args.namespace}: {outcome}, {stats['rejected']} rejected, "
+        f"{stats['skipped']} skipped (checkpoint) in {time.time() - started_at:.1f}s"
+    )
+    if stats['rejected']:
+        print(f"⚠️ Rejected records written to {rejects_file(args.input, args.dry_run)}")
+    if not args.dry_run:
+        from response_cache import invalidate_after_ingestion, record_content_version
+        # Existing ids are overwritten in place, so the vector counts alone can't tell the catalog changed
+        record_content_version(args.index, f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}")
+        invalidate_after_ingestion('mcq', 'answers', 'catalog')
+        print("ℹ️  Refresh duplicates and the lexical index: python pyq_dedup.py && python lexical_index.py --index pyq")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Namespace Router
+Picks the one or two NCERT namespaces a query is about, so retrieval skips the
+vector queries of the other subjects.
+
+Each namespace is summarized by the normalized mean of its stored vectors (its
+centroid). A query goes to its most similar namespace, plus the runner-up when
+that is within ROUTER_SECOND_MARGIN. When the best similarity is below
+ROUTER_MIN_SIMILARITY, or the chosen namespaces don't lead the rest by
+ROUTER_MIN_GAP, the query keeps the full fan-out.
+
+Usage: python namespace_router.py build [--per-namespace 1000]
+       python namespace_router.py eval queries.txt [--capture 'traffic.jsonl.*'] [--n-results 5]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+NAMESPACE_CENTROIDS_PATH = os.getenv('NAMESPACE_CENTROIDS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'namespace_centroids.json'))
+NAMESPACE_ROUTING = os.getenv('NAMESPACE_ROUTING', 'true').lower() in ('1', 'true', 'yes')
+ROUTER_MIN_SIMILARITY = float(os.getenv('ROUTER_MIN_SIMILARITY', 0.2))
+ROUTER_SECOND_MARGIN = float(os.getenv('ROUTER_SECOND_MARGIN', 0.05))
+ROUTER_MIN_GAP = float(os.getenv('ROUTER_MIN_GAP', 0.03))
+RAG_INDEX_NAME = 'ncert'
+RAG_NAMESPACES = ["geography", "polity", "history", "economics", "science"]
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+FETCH_BATCH_SIZE = 100
+
+class NamespaceRouter:
+    """Nearest-centroid namespace choice with a confidence fallback"""
+
+    def __init__(self, namespaces, centroids, model=EMBEDDING_MODEL):
+        import numpy as np
+
+        self.namespaces = list(namespaces)
+        matrix = np.asarray(centroids, dtype=np.float32)
+        self.centroids = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.model = model
+        self._lock = threading.Lock()
+        self.counters = Counter()
+
+    @classmethod
+    def load(cls, path=NAMESPACE_CENTROIDS_PATH):
+        """Router from a centroids file, or None when it hasn't been built"""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(list(data['centroids']), list(data['centroids'].values()), data.get('model', EMBEDDING_MODEL))
+
+    def scores(self, query_embedding):
+        """Cosine similarity of the query to every namespace centroid, best first"""
+        import numpy as np
+
+        vector = np.asarray(query_embedding, dtype=np.float32)
+        if vector.shape[0] != self.centroids.shape[1]:
+            return []
+        similarities = self.centroids @ (vector / (np.linalg.norm(vector) or 1.0))
+        return sorted(zip(self.namespaces, similarities.tolist()), key=lambda pair: pair[1], reverse=True)
+
+    def choose(self, ranked):
+        """Namespaces to query for ranked (namespace, similarity) pairs, or None for the full fan-out"""
+        if not ranked or ranked[0][1] < ROUTER_MIN_SIMILARITY:
+            return None
+        chosen = 2 if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < ROUTER_SECOND_MARGIN else 1
+        if len(ranked) > chosen and ranked[chosen - 1][1] - ranked[chosen][1] < ROUTER_MIN_GAP:
+            return None  # The next namespace is about as close - not confident enough to skip it
+        return [namespace for namespace, _ in ranked[:chosen]]
+
+    def route(self, query_embedding):
+        """Namespaces to search for a query embedding, or None to search all of them"""
+        chosen = self.choose(self.scores(query_embedding))
+        with self._lock:
+            if chosen is None:
+                self.counters['fallback'] += 1
+            else:
+                self.counters['routed'] += 1
+                self.counters[f'routed_to_{len(chosen)}'] += 1
+        return chosen
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        total = counters.get('routed', 0) + counters.get('fallback', 0)
+        return {
+            'namespaces': self.namespaces,
+            **counters,
+            'fallback_rate': round(counters.get('fallback', 0) / total, 3) if total else 0.0
+        }
+
+def iter_namespace_vectors(pinecone_index, namespace, limit):
+    """Up to `limit` stored vectors of a namespace via list + fetch"""
+    seen = 0
+    for ids in pinecone_index.list(namespace=namespace):
+        ids = list(ids)
+        for start in range(0, len(ids), FETCH_BATCH_SIZE):
+            response = pinecone_index.fetch(ids=ids[start:start + FETCH_BATCH_SIZE], namespace=namespace)
+            for vector in response.vectors.values():
+                yield vector.values
+                seen += 1
+                if seen >= limit:
+                    return
+
+def build_centroids(pinecone_index, namespaces, per_namespace):
+    """{namespace: centroid} from the mean of each namespace's normalized vectors"""
+    import numpy as np
+
+    centroids = {}
+    counts = {}
+    for namespace in namespaces:
+        vectors = np.asarray(list(iter_namespace_vectors(pinecone_index, namespace, per_namespace)), dtype=np.float32)
+        if not len(vectors):
+            print(f"⚠️ {namespace}: no vectors, left out of the router")
+            continue
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        centroid = vectors.mean(axis=0)
+        centroids[namespace] = (centroid / np.linalg.norm(centroid)).round(6).tolist()
+        counts[namespace] = len(vectors)
+        print(f"   {namespace:<12} {len(vectors)} vectors")
+    return centroids, counts
+
+def top_ids(pinecone_index, embedding, namespaces, n_results):
+    """Ids of the best n_results matches over the given namespaces (what retrieval keeps)"""
+    matches = []
+    for namespace in namespaces:
+        response = pinecone_index.query(vector=embedding, top_k=n_results, include_metadata=False, namespace=namespace)
+        matches.extend((match['score'], namespace, match['id']) for match in response['matches'])
+    matches.sort(reverse=True)
+    return [(namespace, vector_id) for _, namespace, vector_id in matches[:n_results]]
+
+def evaluate(router, pinecone_index, model, queries, n_results):
+    """Recall@n of routed retrieval against the full fan-out, plus vector calls saved"""
+    recalls = []
+    routed_recalls = []
+    calls = 0
+    destinations = Counter()
+    for query in queries:
+        embedding = model.encode([query]).tolist()[0]
+        full = top_ids(pinecone_index, embedding, RAG_NAMESPACES, n_results)
+        chosen = router.route(embedding)
+        if chosen is None:
+            destinations['fallback'] += 1
+            calls += len(RAG_NAMESPACES)
+            recalls.append(1.0)
+            continue
+        destinations['+'.join(chosen)] += 1
+        calls += len(chosen)
+        routed = set(top_ids(pinecone_index, embedding, chosen, n_results))
+        recall = len(routed & set(full)) / len(full) if full else 1.0
+        recalls.append(recall)
+        routed_recalls.append(recall)
+    return {
+        'queries': len(queries),
+        'recall_at_n': round(sum(recalls) / len(recalls), 4) if recalls else None,
+        'routed_recall_at_n': round(sum(routed_recalls) / len(routed_recalls), 4) if routed_recalls else None,
+        'fallback_rate': round(destinations['fallback'] / len(queries), 3) if queries else None,
+        'avg_vector_calls': round(calls / len(queries), 2) if queries else None,
+        'destinations': dict(destinations.most_common())
+    }
+
+def load_queries(paths, capture_patterns):
+    queries = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            queries.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if capture_patterns:
+        from replay_traffic import load_capture
+
+        for entry in load_capture(capture_patterns):
+            body = entry.get('body') or {}
+            if entry.get('path') == '/api/search' and isinstance(body, dict) and body.get('query', '').strip():
+                queries.append(body['query'])
+    return list(dict.fromkeys(queries))
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or evaluate the NCERT namespace router")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="Compute namespace centroids from the stored vectors")
+    build_parser.add_argument("--per-namespace", type=int, default=1000, help="Vectors sampled per namespace")
+    build_parser.add_argument("--output", default=NAMESPACE_CENTROIDS_PATH)
+    eval_parser = subparsers.add_parser("eval", help="Recall of routed retrieval against the full fan-out")
+    eval_parser.add_argument("queries", nargs="*", help="Query files, one query per line")
+    eval_parser.add_argument("--capture", nargs="*", default=[], help="Traffic capture files or globs")
+    eval_parser.add_argument("--limit", type=int, default=500, help="Queries to evaluate")
+    eval_parser.add_argument("--n-results", type=int, default=5)
+    eval_parser.add_argument("--centroids", default=NAMESPACE_CENTROIDS_PATH)
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    from clients import create_pinecone_indexes
+
+    api_key = os.getenv('PINECONE_API_KEY')
+    if not api_key:
+        raise SystemExit("❌ PINECONE_API_KEY is not set")
+    pinecone_index = create_pinecone_indexes(api_key, [RAG_INDEX_NAME])[RAG_INDEX_NAME]
+
+    if args.command == "build":
+        print(f"🔄 Sampling up to {args.per_namespace} vectors per namespace...")
+        centroids, counts = build_centroids(pinecone_index, RAG_NAMESPACES, args.per_namespace)
+        if not centroids:
+            raise SystemExit("❌ No vectors found - is the ncert index populated?")
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'model': EMBEDDING_MODEL, 'built_at': time.time(), 'counts': counts, 'centroids': centroids}, f)
+        print(f"✅ {len(centroids)} centroids -> {args.output}")
+        return
+
+    router = NamespaceRouter.load(args.centroids)
+    if router is None:
+        raise SystemExit(f"❌ {args.centroids} not found - run: python namespace_router.py build")
+    queries = load_queries(args.queries, args.capture)[:args.limit]
+    if not queries:
+        raise SystemExit("❌ No queries to evaluate")
+
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(router.model, device='cpu')
+    print(f"🔄 Evaluating {len(queries)} queries (recall@{args.n_results} against all {len(RAG_NAMESPACES)} namespaces)...")
+    report = evaluate(router, pinecone_index, model, queries, args.n_results)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
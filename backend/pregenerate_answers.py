@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Answer Pre-generation
+Runs the full /api/search pipeline offline for the most frequent queries and
+stores the results in the shared answer cache, keyed by the current index
+version, so popular questions are answered from cache right after a deploy or
+re-index instead of on the first user's miss.
+
+Queries come from traffic captures (traffic_capture.py JSONL, ranked by how
+often each normalized query was asked) and/or a seed list with one query per
+line. Run it on the host (or against the Redis) that serves the app cache.
+
+Usage: python pregenerate_answers.py --capture '/data/traffic.jsonl.*' --seeds seeds.txt --top 200 [--concurrency 4]
+"""
+
+import argparse
+import os
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+SEARCH_PARAMS = ('n_results', 'namespace', 'mcq_threshold', 'mcq_limit', 'search_mode')
+
+def freeze(params):
+    return tuple((name, params[name]) for name in SEARCH_PARAMS)
+
+def queries_from_captures(patterns, defaults, normalize):
+    """Count /api/search requests per normalized query and keep each query's most common parameters"""
+    from replay_traffic import load_capture
+
+    counts = Counter()
+    variants = defaultdict(Counter)
+    originals = {}
+    for entry in load_capture(patterns):
+        body = entry.get('body') or {}
+        if entry.get('path') != '/api/search' or not isinstance(body, dict) or not str(body.get('query', '')).strip():
+            continue
+        key = normalize(body['query'])
+        counts[key] += 1
+        originals.setdefault(key, body['query'])
+        variants[key][freeze({name: body.get(name, defaults[name]) for name in SEARCH_PARAMS})] += 1
+    return [
+        (originals[key], dict(variants[key].most_common(1)[0][0]), count)
+        for key, count in counts.most_common()
+    ]
+
+def queries_from_seeds(path, defaults):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [(line.strip(), dict(defaults), 0) for line in f if line.strip() and not line.startswith('#')]
+
+def select_queries(capture_patterns, seeds_path, top, defaults, normalize):
+    """Top captured queries first, then seeds, one entry per normalized query"""
+    candidates = []
+    if capture_patterns:
+        candidates.extend(queries_from_captures(capture_patterns, defaults, normalize))
+    if seeds_path:
+        candidates.extend(queries_from_seeds(seeds_path, defaults))
+    selected = []
+    seen = set()
+    for query, params, count in candidates:
+        key = normalize(query)
+        if key in seen or len(query) > 1000:
+            continue
+        seen.add(key)
+        selected.append((query, params, count))
+        if len(selected) >= top:
+            break
+    return selected
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate cached answers for the most frequent queries")
+    parser.add_argument("--capture", nargs="*", default=[], help="Traffic capture files or globs")
+    parser.add_argument("--seeds", help="Seed list, one query per line")
+    parser.add_argument("--top", type=int, default=200, help="Number of queries to pre-generate")
+    parser.add_argument("--concurrency", type=int, default=4, help="Pipelines run at once (bounded by Groq rate limits)")
+    parser.add_argument("--force", action="store_true", help="Regenerate queries that are already cached")
+    parser.add_argument("--dry-run", action="store_true", help="List the selected queries without generating")
+    args = parser.parse_args()
+
+    if not args.capture and not args.seeds:
+        raise SystemExit("❌ Give --capture and/or --seeds")
+
+    # Import the app without its background init - the pipeline is initialized here, synchronously
+    os.environ['BACKGROUND_INIT'] = 'false'
+    import app as api
+
+    selected = select_queries(args.capture, args.seeds, args.top, api.SEARCH_DEFAULTS, api.normalize_query)
+    print(f"📋 {len(selected)} queries selected")
+    if args.dry_run:
+        for query, params, count in selected:
+            print(f"   {count:6d}  {query[:80]}  {params}")
+        return
+
+    if not api.initialize_search_system():
+        raise SystemExit("❌ Search system is missing components (check PINECONE_API_KEY / GROQ_API_KEY)")
+    # The answer key needs the index version, which comes from the dependency checks
+    api.dependency_checker.run_once()
+
+    def pregenerate(query, params):
+        _, answer_key = api.search_keys(query, **params)
+        if answer_key is None:
+            return 'no_version'
+        if not args.force and api.response_cache.get(answer_key) is not None:
+            return 'cached'
+        result = api.run_search(query, **params)
+        return 'stored' if api.store_answer(answer_key, result, params['search_mode']) else 'partial'
+
+    outcomes = Counter()
+    started_at = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        futures = {executor.submit(pregenerate, query, params): query for query, params, _ in selected}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                outcome = future.result()
+            except Exception as e:
+                outcome = 'error'
+                print(f"⚠️ '{futures[future][:60]}' failed: {e}")
+            outcomes[outcome] += 1
+            if done % 20 == 0:
+                print(f"   {done}/{len(futures)} done ({time.time() - started_at:.0f}s)")
+
+    print(f"✅ Pre-generation finished in {time.time() - started_at:.0f}s: {dict(outcomes)}")
+    if outcomes['no_version']:
+        print("⚠️ Index version unknown (Pinecone stats check failed) - nothing could be cached")
+
+if __name__ == "__main__":
+    main()
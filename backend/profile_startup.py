@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Startup Profile
+Measures how long `import app` takes and which modules dominate it, using
+`python -X importtime` in a clean subprocess (background init disabled).
+
+Heavy modules (torch, sentence_transformers, pinecone, groq) must not be
+imported by `import app`; they load on the init thread. The script exits
+non-zero when one of them shows up or the import exceeds --budget-ms, so it
+can run as a startup regression check.
+
+Usage: python profile_startup.py [--top 15] [--budget-ms 1500] [--init]
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFERRED_MODULES = ('torch', 'sentence_transformers', 'transformers', 'pinecone', 'groq')
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_import(module='app'):
+    """Return (wall seconds, [(cumulative us, self us, depth, module)]) for importing module"""
+    env = dict(os.environ, BACKGROUND_INIT='false')
+    started_at = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - started_at
+    if result.returncode != 0:
+        raise SystemExit(f"❌ import {module} failed:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((int(cumulative_us), int(self_us), (len(indent) - 1) // 2, name))
+    return wall, entries
+
+def profile_init(timeout):
+    """Import the app with background init and time each init stage"""
+    os.environ['BACKGROUND_INIT'] = 'true'
+    sys.path.insert(0, BACKEND_DIR)
+    started_at = time.perf_counter()
+    import app
+    imported_at = time.perf_counter()
+    app.init_tracker.wait(timeout)
+    snapshot = app.init_tracker.snapshot()
+    print(f"⏱️  import app: {(imported_at - started_at) * 1000:.0f}ms, init {snapshot['state']} after {snapshot['elapsed_seconds']}s")
+    for stage, seconds in snapshot['stages'].items():
+        print(f"   {stage:<18} {seconds * 1000:8.0f}ms")
+    if snapshot['error']:
+        print(f"⚠️ {snapshot['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile app import time and background init")
+    parser.add_argument("--top", type=int, default=15, help="Slowest top-level imports to list")
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv('STARTUP_IMPORT_BUDGET_MS', 0)), help="Fail when the import takes longer (0 = no budget)")
+    parser.add_argument("--init", action="store_true", help="Also run the background init and report stage timings")
+    parser.add_argument("--init-timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    wall, entries = profile_import()
+    app_entry = next((entry for entry in entries if entry[3] == 'app'), None)
+    import_ms = app_entry[0] / 1000 if app_entry else wall * 1000
+    print(f"⏱️  import app: {import_ms:.0f}ms (process wall time {wall * 1000:.0f}ms)")
+
+    # Direct imports of app, slowest first
+    top_level = sorted((entry for entry in entries if entry[2] == 1), reverse=True)[:args.top]
+    for cumulative_us, self_us, _, name in top_level:
+        print(f"   {name:<32} {cumulative_us / 1000:8.1f}ms cumulative {self_us / 1000:7.1f}ms self")
+
+    failures = []
+    imported = {entry[3].split('.')[0] for entry in entries}
+    eager = [module for module in DEFERRED_MODULES if module in imported]
+    if eager:
+        failures.append(f"heavy modules imported at import time: {', '.join(eager)}")
+    if args.budget_ms and import_ms > args.budget_ms:
+        failures.append(f"import took {import_ms:.0f}ms, budget is {args.budget_ms:.0f}ms")
+
+    if args.init:
+        profile_init(args.init_timeout)
+
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Startup profile OK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+PYQ Deduplication
+Clusters near-identical PYQ questions across exam years and namespaces with
+MinHash + LSH, and collapses each cluster to one entry at query time.
+
+The offline pass writes pyq_clusters.json: every clustered vector maps to a
+canonical "<namespace>:<vector id>" key, and each cluster lists where the
+question appeared (exam, year, term). The API loads that file and returns one
+entry per cluster with its occurrences attached.
+
+Usage: python pyq_dedup.py [--threshold 0.8] [--write-metadata]
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from collections import defaultdict
+
+PYQ_CLUSTERS_PATH = os.getenv('PYQ_CLUSTERS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pyq_clusters.json'))
+
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16  # 16 bands x 8 rows: candidates from ~0.7 Jaccard upwards
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def normalize_text(text):
+    return " ".join(WORD_PATTERN.findall(str(text).lower()))
+
+def question_fingerprint(text):
+    """Exact-duplicate key: hash of the normalized question text"""
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()
+
+def shingles(text, size=3):
+    """Word n-gram shingles (single words for very short texts)"""
+    words = normalize_text(text).split()
+    if len(words) < size:
+        return set(words)
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+class MinHasher:
+    """MinHash signatures from universal hashing of 32-bit shingle hashes"""
+
+    def __init__(self, num_permutations=NUM_PERMUTATIONS, seed=1):
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1))
+            for _ in range(num_permutations)
+        ]
+
+    def signature(self, shingle_set):
+        if not shingle_set:
+            return [MAX_HASH] * len(self.permutations)
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little') for s in shingle_set]
+        return [
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        ]
+
+def estimated_jaccard(sig_a, sig_b):
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+class UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+def cluster_records(records, threshold=0.8, bands=LSH_BANDS):
+    """Group near-duplicate records
+
+    records: list of dicts with key, text and occurrence fields.
+    Returns a list of clusters (lists of records), largest first.
+    """
+    hasher = MinHasher()
+    rows = len(hasher.permutations) // bands
+    signatures = {}
+    buckets = defaultdict(list)
+    union_find = UnionFind()
+
+    for record in records:
+        signature = hasher.signature(shingles(record['text']))
+        signatures[record['key']] = signature
+        union_find.find(record['key'])
+        for band in range(bands):
+            band_key = (band, tuple(signature[band * rows:(band + 1) * rows]))
+            buckets[band_key].append(record['key'])
+
+    # Verify LSH candidates against the estimated similarity before merging
+    for keys in buckets.values():
+        if len(keys) < 2:
+            continue
+        # All pairs for normal buckets; very large buckets only compare against their first key
+        anchors = keys if len(keys) <= 50 else keys[:1]
+        for i, anchor in enumerate(anchors):
+            for other in keys[i + 1:]:
+                if union_find.find(anchor) == union_find.find(other):
+                    continue
+                if estimated_jaccard(signatures[anchor], signatures[other]) >= threshold:
+                    union_find.union(anchor, other)
+
+    groups = defaultdict(list)
+    for record in records:
+        groups[union_find.find(record['key'])].append(record)
+    return sorted(groups.values(), key=len, reverse=True)
+
+def choose_canonical(cluster):
+    """Prefer the record with the longest explanation, then the most recent exam, then the smallest key"""
+    def rank(record):
+        year = record.get('exam_year')
+        try:
+            year = int(year)
+        except (TypeError, ValueError):
+            year = 0
+        return (-len(record.get('explanation') or ''), -year, record['key'])
+    return min(cluster, key=rank)
+
+def build_cluster_file(clusters):
+    members = {}
+    cluster_info = {}
+    for cluster in clusters:
+        if len(cluster) < 2:
+            continue
+        canonical = choose_canonical(cluster)
+        cluster_info[canonical['key']] = {
+            'size': len(cluster),
+            'occurrences': [
+                {
+                    'id': record['key'],
+                    'exam_name': record.get('exam_name', ''),
+                    'exam_year': record.get('exam_year', ''),
+                    'exam_term': record.get('exam_term', '')
+                }
+                for record in sorted(cluster, key=lambda r: (str(r.get('exam_year', '')), r['key']))
+            ]
+        }
+        for record in cluster:
+            members[record['key']] = canonical['key']
+    return {'version': 1, 'created_at': time.time(), 'members': members, 'clusters': cluster_info}
+
+class PyqClusters:
+    """Query-time view of pyq_clusters.json"""
+
+    def __init__(self, data=None):
+        data = data or {}
+        self.members = data.get('members', {})
+        self.clusters = data.get('clusters', {})
+        self.created_at = data.get('created_at')
+
+    @classmethod
+    def load(cls, path=PYQ_CLUSTERS_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def canonical_key(self, namespace, vector_id, question_text=''):
+        """Cluster key of a record; exact normalized duplicates collapse even without the file"""
+        member_key = f"{namespace}:{vector_id}"
+        canonical = self.members.get(member_key)
+        if canonical:
+            return canonical
+        if question_text:
+            return f"text:{question_fingerprint(question_text)}"
+        return member_key
+
+    def occurrences(self, canonical_key):
+        cluster = self.clusters.get(canonical_key)
+        return cluster['occurrences'] if cluster else None
+
+    def collapse(self, items, key_fn, limit=None):
+        """Keep the first (best ranked) item of each cluster, in order
+
+        key_fn(item) -> (namespace, vector id, question text). Returns
+        (canonical key, item) pairs.
+        """
+        seen = set()
+        collapsed = []
+        for item in items:
+            key = self.canonical_key(*key_fn(item))
+            if key in seen:
+                continue
+            seen.add(key)
+            collapsed.append((key, item))
+            if limit is not None and len(collapsed) >= limit:
+                break
+        return collapsed
+
+    def status(self):
+        return {'clusters': len(self.clusters), 'clustered_questions': len(self.members), 'created_at': self.created_at}
+
+def load_records(pinecone_index, namespaces):
+    """Read every PYQ record from Pinecone as a dedup record"""
+    from lexical_index import iter_index_records, pyq_text
+    from pyq_schema import typed_fields
+
+    records = []
+    for namespace in namespaces:
+        for vector_id, metadata in iter_index_records(pinecone_index, namespace):
+            data = typed_fields(metadata)
+            if data is None:
+                data = {}
+                if metadata.get('full_json_str'):
+                    try:
+                        data = json.loads(metadata['full_json_str'])
+                    except ValueError:
+                        data = {}
+            records.append({
+                'key': f"{namespace}:{vector_id}",
+                'namespace': namespace,
+                'vector_id': vector_id,
+                'text': pyq_text(metadata),
+                'exam_name': data.get('exam_name', metadata.get('exam_name', '')),
+                'exam_year': data.get('exam_year', metadata.get('exam_year', '')),
+                'exam_term': data.get('exam_term', metadata.get('exam_term', '')),
+                'explanation': data.get('explanation', metadata.get('explanation', ''))
+            })
+    return records
+
+def main():
+    import argparse
+    from clients import create_pinecone_indexes
+
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate PYQ questions with MinHash LSH")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Minimum estimated Jaccard similarity to merge")
+    parser.add_argument("--output", default=PYQ_CLUSTERS_PATH)
+    parser.add_argument("--write-metadata", action="store_true", help="Also store canonical_id/duplicate_count on each Pinecone record")
+    args = parser.parse_args()
+
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass
+
+    api_key = os.getenv('PINECONE_API_KEY')
+    if not api_key:
+        raise SystemExit("❌ PINECONE_API_KEY is not set")
+
+    mcq_index = create_pinecone_indexes(api_key, ['pyq-1'])['pyq-1']
+    stats = mcq_index.describe_index_stats()
+    namespaces = list(stats.namespaces.keys()) if stats.namespaces else []
+
+    started_at = time.time()
+    records = load_records(mcq_index, namespaces)
+    print(f"📥 Loaded {len(records)} questions from {len(namespaces)} namespaces in {time.time() - started_at:.1f}s")
+
+    started_at = time.time()
+    clusters = cluster_records(records, threshold=args.threshold)
+    result = build_cluster_file(clusters)
+    duplicates = sum(len(c) - 1 for c in clusters if len(c) > 1)
+    print(f"🔗 {len(result['clusters'])} clusters, {duplicates} duplicate questions collapsed in {time.time() - started_at:.1f}s")
+
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f)
+    os.replace(tmp_path, args.output)
+    print(f"✅ Wrote {args.output}")
+    # Cached MCQ lists were collapsed with the previous clusters
+    from response_cache import invalidate_after_ingestion
+    invalidate_after_ingestion('mcq', 'answers')
+
+    if args.write_metadata:
+        for member_key, canonical_key in result['members'].items():
+            namespace, vector_id = member_key.split(':', 1)
+            mcq_index.update(
+                id=vector_id,
+                namespace=namespace,
+                set_metadata={'canonical_id': canonical_key, 'duplicate_count': result['clusters'][canonical_key]['size']}
+            )
+        print(f"✅ Updated metadata on {len(result['members'])} records")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+PYQ Record Schema
+Validation and metadata layout for PYQ records in the pyq-1 index.
+
+Records written by load_pyqs.py carry typed top-level metadata (exam_year as a
+number, options as a list) next to the legacy full_json_str blob, and are
+marked with `schema_version`. Readers use typed_fields() for those records and
+only decode full_json_str for older ones.
+"""
+
+import json
+import string
+import time
+
+SCHEMA_VERSION = 2
+OPTION_KEYS = string.ascii_lowercase
+MIN_EXAM_YEAR = 1950
+
+class ValidationError(ValueError):
+    """Raised for PYQ input records that cannot be loaded"""
+
+def typed_fields(metadata):
+    """Fields of a typed record with options as a {"a": ...} dict, or None for legacy records"""
+    try:
+        version = int(metadata.get('schema_version', 0))
+    except (TypeError, ValueError):
+        return None
+    if version < SCHEMA_VERSION:
+        return None
+    fields = dict(metadata)
+    fields.pop('full_json_str', None)
+    options = fields.get('options')
+    if isinstance(options, list):
+        fields['options'] = dict(zip(OPTION_KEYS, options))
+    # Pinecone returns every number as a float
+    year = fields.get('exam_year')
+    if isinstance(year, float) and year.is_integer():
+        fields['exam_year'] = int(year)
+    return fields
+
+def normalize_options(options):
+    """Options as an ordered list of texts, from a list or an {"a"/"A": text} dict"""
+    if isinstance(options, dict):
+        by_key = {str(key).lower(): value for key, value in options.items()}
+        return [str(by_key[key]).strip() for key in OPTION_KEYS if by_key.get(key) not in (None, '')]
+    if isinstance(options, (list, tuple)):
+        return [str(value).strip() for value in options if value not in (None, '')]
+    return []
+
+def validate_record(record):
+    """Return the cleaned record or raise ValidationError listing every problem"""
+    errors = []
+    question = str(record.get('question') or '').strip()
+    if not question:
+        errors.append("missing question")
+
+    options = normalize_options(record.get('options'))
+    if not options:
+        # Older exports keep options as option_a..option_d
+        options = normalize_options({key: record.get(f"option_{key}") for key in 'abcd'})
+    if len(options) < 2:
+        errors.append("needs at least 2 options")
+
+    correct_option = str(record.get('correct_option') or '').strip().lower()
+    if correct_option not in OPTION_KEYS[:len(options)]:
+        errors.append(f"correct_option '{record.get('correct_option')}' does not match an option")
+
+    exam_name = str(record.get('exam_name') or '').strip()
+    if not exam_name:
+        errors.append("missing exam_name")
+
+    exam_year = record.get('exam_year')
+    try:
+        exam_year = int(str(exam_year).strip())
+        if not MIN_EXAM_YEAR <= exam_year <= time.gmtime().tm_year + 1:
+            errors.append(f"exam_year {exam_year} out of range")
+    except (TypeError, ValueError):
+        errors.append(f"exam_year '{record.get('exam_year')}' is not a year")
+
+    if errors:
+        raise ValidationError("; ".join(errors))
+
+    return {
+        'question': question,
+        'options': options,
+        'correct_option': correct_option,
+        'correct_answer': options[OPTION_KEYS.index(correct_option)],
+        'explanation': str(record.get('explanation') or '').strip(),
+        'exam_name': exam_name,
+        'exam_year': exam_year,
+        'exam_term': str(record.get('exam_term') or '').strip(),
+        'subject': str(record.get('subject') or '').strip(),
+        'topic': str(record.get('topic') or '').strip()
+    }
+
+def embedding_text(clean):
+    """Text that is embedded and stored as `text` (same "Q: ... Options: ..." layout as existing records)"""
+    options = " ".join(f"{key}) {value}" for key, value in zip(OPTION_KEYS, clean['options']))
+    return f"Q: {clean['question']} Options: {options}"
+
+def build_metadata(clean):
+    """Pinecone metadata: typed top-level fields plus full_json_str for older readers"""
+    legacy = dict(clean, options=dict(zip(OPTION_KEYS, clean['options'])))
+    metadata = dict(clean)
+    metadata.update({
+        'text': embedding_text(clean),
+        'schema_version': SCHEMA_VERSION,
+        'full_json_str': json.dumps(legacy, ensure_ascii=False)
+    })
+    return metadata
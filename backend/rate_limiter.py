@@ -0,0 +1,59 @@
+"""
+Rate Limiter
+Per-client sliding-window request limits, safe to share between the threads of
+a gthread worker.
+
+Each (endpoint, client) key keeps a deque of its request times inside the
+window. Checking and recording a request happen under one lock, so concurrent
+requests can't both see the last free slot. Keys that have been idle for a
+whole window are purged so the table doesn't grow with every client ever seen.
+Limits are per worker process, like the rest of the in-memory state.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+RATE_LIMIT_PURGE_SECONDS = float(os.getenv('RATE_LIMIT_PURGE_SECONDS', 60))
+
+class SlidingWindowLimiter:
+    """At most max_requests per window_seconds for every key"""
+
+    def __init__(self, purge_interval=RATE_LIMIT_PURGE_SECONDS):
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._windows = {}  # key -> (deque of request times, window_seconds)
+        self._next_purge = time.monotonic() + purge_interval
+        self.allowed = 0
+        self.limited = 0
+
+    def hit(self, key, max_requests, window_seconds):
+        """Record a request for key and return True, or False when it's over the limit"""
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_purge:
+                self._purge(now)
+            entry = self._windows.get(key)
+            if entry is None:
+                entry = self._windows[key] = (deque(), window_seconds)
+            timestamps = entry[0]
+            while timestamps and now - timestamps[0] >= window_seconds:
+                timestamps.popleft()
+            if len(timestamps) >= max_requests:
+                self.limited += 1
+                return False
+            timestamps.append(now)
+            self.allowed += 1
+            return True
+
+    def _purge(self, now):
+        self._windows = {
+            key: entry for key, entry in self._windows.items()
+            if entry[0] and now - entry[0][-1] < entry[1]
+        }
+        self._next_purge = now + self.purge_interval
+
+    def snapshot(self):
+        with self._lock:
+            return {'keys': len(self._windows), 'allowed': self.allowed, 'limited': self.limited}
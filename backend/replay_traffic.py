@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Traffic Replay
+Plays captured traffic (traffic_capture.py JSONL files) against a server,
+open-loop: every request is sent at its recorded offset divided by --speed,
+whether or not earlier requests have finished, so a slow server faces the
+real arrival rate instead of a politely reduced one.
+
+Latency is measured from the scheduled send time (including any time spent
+waiting for a free sender), which avoids coordinated omission; the pure
+service time is reported alongside.
+
+Usage: python replay_traffic.py capture.jsonl.* --target http://localhost:5000 [--speed 2] [--duration 300]
+"""
+
+import argparse
+import glob
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+def load_capture(patterns):
+    """All captured entries from the given files (globs allowed), oldest first"""
+    entries = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entries.append(json.loads(line))
+    entries.sort(key=lambda entry: entry['ts'])
+    return entries
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+class ReplayStats:
+    """Per-endpoint latencies and outcomes, thread-safe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)  # endpoint -> ms from scheduled time
+        self.service_times = defaultdict(list)  # endpoint -> ms from actual send
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.max_lag_ms = 0.0
+
+    def add(self, endpoint, status, latency_ms, service_ms, lag_ms, failed):
+        with self._lock:
+            self.latencies[endpoint].append(latency_ms)
+            self.service_times[endpoint].append(service_ms)
+            self.statuses[endpoint][str(status)] += 1
+            if failed:
+                self.errors[endpoint] += 1
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def summary(self, wall_seconds):
+        endpoints = {}
+        all_latencies = []
+        total_errors = 0
+        for endpoint, latencies in sorted(self.latencies.items()):
+            latencies = sorted(latencies)
+            service = sorted(self.service_times[endpoint])
+            all_latencies.extend(latencies)
+            total_errors += self.errors[endpoint]
+            endpoints[endpoint] = {
+                'requests': len(latencies),
+                'error_rate': round(self.errors[endpoint] / len(latencies), 4),
+                'statuses': dict(self.statuses[endpoint]),
+                'latency_ms': {
+                    'p50': percentile(latencies, 0.5), 'p90': percentile(latencies, 0.9),
+                    'p99': percentile(latencies, 0.99), 'max': latencies[-1]
+                },
+                'service_ms_p50': percentile(service, 0.5),
+                'service_ms_p99': percentile(service, 0.99)
+            }
+        all_latencies.sort()
+        return {
+            'requests': len(all_latencies),
+            'wall_seconds': round(wall_seconds, 2),
+            'throughput_rps': round(len(all_latencies) / wall_seconds, 2) if wall_seconds else 0,
+            'error_rate': round(total_errors / len(all_latencies), 4) if all_latencies else 0,
+            'latency_ms': {
+                'p50': percentile(all_latencies, 0.5), 'p90': percentile(all_latencies, 0.9),
+                'p99': percentile(all_latencies, 0.99), 'max': all_latencies[-1] if all_latencies else None
+            },
+            'max_dispatch_lag_ms': round(self.max_lag_ms, 1),
+            'endpoints': endpoints
+        }
+
+def endpoint_name(entry):
+    return f"{entry['method']} {entry['path']}"
+
+def send(target, entry, timeout):
+    """Send one captured request; returns the HTTP status (0 for transport errors)"""
+    url = target.rstrip('/') + entry['path']
+    if entry.get('args'):
+        url += '?' + urllib.parse.urlencode(entry['args'])
+    data = None
+    headers = {'Accept-Encoding': 'gzip', 'X-Replay': '1'}
+    if entry.get('body') is not None:
+        data = json.dumps(entry['body']).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    request = urllib.request.Request(url, data=data, method=entry['method'], headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return 0
+
+def replay(entries, target, speed=1.0, max_in_flight=256, timeout=60, duration=None):
+    stats = ReplayStats()
+    if not entries:
+        return stats.summary(0)
+
+    first_ts = entries[0]['ts']
+    executor = ThreadPoolExecutor(max_workers=max_in_flight)
+    started_at = time.perf_counter()
+
+    def run(entry, scheduled_at):
+        sent_at = time.perf_counter()
+        status = send(target, entry, timeout)
+        finished_at = time.perf_counter()
+        stats.add(
+            endpoint_name(entry), status,
+            latency_ms=(finished_at - scheduled_at) * 1000,
+            service_ms=(finished_at - sent_at) * 1000,
+            lag_ms=(sent_at - scheduled_at) * 1000,
+            failed=status == 0 or status >= 500
+        )
+
+    for entry in entries:
+        offset = (entry['ts'] - first_ts) / speed
+        if duration is not None and offset > duration:
+            break
+        scheduled_at = started_at + offset
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        # Open loop: submit on schedule, never wait for earlier requests
+        executor.submit(run, entry, scheduled_at)
+
+    executor.shutdown(wait=True)
+    return stats.summary(time.perf_counter() - started_at)
+
+def print_summary(summary):
+    print(f"📊 {summary['requests']} requests in {summary['wall_seconds']}s "
+          f"({summary['throughput_rps']} req/s), error rate {summary['error_rate'] * 100:.2f}%")
+    latency = summary['latency_ms']
+    if latency['p50'] is not None:
+        print(f"   latency p50 {latency['p50']:.0f}ms  p90 {latency['p90']:.0f}ms  p99 {latency['p99']:.0f}ms  max {latency['max']:.0f}ms")
+    print(f"   max dispatch lag {summary['max_dispatch_lag_ms']}ms")
+    for endpoint, data in summary['endpoints'].items():
+        latency = data['latency_ms']
+        print(f"   {endpoint:<32} n={data['requests']:<6} err={data['error_rate'] * 100:5.2f}%  "
+              f"p50={latency['p50']:.0f}ms p99={latency['p99']:.0f}ms  statuses={data['statuses']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured API traffic open-loop and report latency percentiles")
+    parser.add_argument("capture", nargs="+", help="Capture files or globs (e.g. 'traffic.jsonl.*')")
+    parser.add_argument("--target", default="http://localhost:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="Time scale: 2 replays twice as fast, 0.5 at half speed")
+    parser.add_argument("--duration", type=float, help="Stop scheduling after this many (scaled) seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Concurrent senders; lag is reported when exceeded")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", metavar="PATH", help="Also write the summary as JSON")
+    args = parser.parse_args()
+
+    entries = load_capture(args.capture)
+    if not entries:
+        raise SystemExit("❌ No captured requests found")
+    span = entries[-1]['ts'] - entries[0]['ts']
+    print(f"▶️  Replaying {len(entries)} requests ({span:.0f}s captured) at {args.speed}x against {args.target}")
+
+    summary = replay(entries, args.target, speed=args.speed, max_in_flight=args.max_in_flight,
+                     timeout=args.timeout, duration=args.duration)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
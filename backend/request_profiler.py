@@ -0,0 +1,205 @@
+"""
+Request Profiler
+Opt-in, per-request sampling profiler for finding where a slow request spends
+its time (encode, Pinecone, Groq, formatting...).
+
+A request is profiled when it carries `X-Profile: <PROFILE_TOKEN>`, or at
+random with probability PROFILE_SAMPLE_RATE. A sampler thread then records the
+request thread's stack every PROFILE_INTERVAL_MS. Samples are wall-clock, so
+time blocked on the network shows up too. The profile is saved in the folded
+stack format read by flamegraph.pl, speedscope and inferno ("a;b;c <count>"
+per line), and its id is returned in the X-Profile-Id header. Stored profiles
+are served by /api/profiles to callers holding the token.
+
+With no token and no sample rate no hooks are registered, so there is no
+per-request cost.
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', 5))
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'pratiyogita-profiles'))
+PROFILE_MAX_STORED = int(os.getenv('PROFILE_MAX_STORED', 50))
+PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', 60))
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+def folded_stack(frame):
+    """Root-to-leaf 'file:function' names joined by ';'"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class StackSampler:
+    """Samples one thread's stack on a background thread until stopped"""
+
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL_MS / 1000.0, max_seconds=PROFILE_MAX_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self.started_wall = time.time()
+        self._thread.start()
+        return self
+
+    def _run(self):
+        deadline = self.started_at + self.max_seconds
+        while not self._stop.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            self.samples[folded_stack(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        return self.samples
+
+class RequestProfiler:
+    """Profiles selected requests and keeps the last PROFILE_MAX_STORED profiles on disk"""
+
+    def __init__(self, token=PROFILE_TOKEN, sample_rate=PROFILE_SAMPLE_RATE, directory=PROFILE_DIR, max_stored=PROFILE_MAX_STORED):
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.max_stored = max_stored
+        self.counters = Counter()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        return cls() if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0 else None
+
+    def authorized(self, value):
+        return bool(self.token) and bool(value) and hmac.compare_digest(str(value), self.token)
+
+    def wants(self, headers):
+        if headers.get('X-Profile'):
+            return self.authorized(headers.get('X-Profile'))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def save(self, profile_id, samples, info):
+        """Write <id>.folded (stacks only, so any folded reader accepts it) and <id>.json (request info)"""
+        path = os.path.join(self.directory, f"{profile_id}.folded")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(os.path.join(self.directory, f"{profile_id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(dict(info, id=profile_id, samples=sum(samples.values())), f)
+        self._prune()
+        return path
+
+    def _prune(self):
+        profiles = self.list()
+        for entry in profiles[self.max_stored:]:
+            for extension in ('.folded', '.json'):
+                try:
+                    os.remove(os.path.join(self.directory, f"{entry['id']}{extension}"))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Stored profiles, newest first"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                        entries.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        entries.sort(key=lambda entry: entry.get('started_at', 0), reverse=True)
+        return entries
+
+    def read(self, profile_id):
+        """Folded profile text, or None (ids are checked so they can't escape the directory)"""
+        if not profile_id.replace('-', '').isalnum():
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.folded"), 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def init_app(self, app):
+        """Register the request hooks and the /api/profiles endpoints on a Flask app"""
+        from flask import g, jsonify, request
+
+        @app.before_request
+        def start_profile():
+            if request.path.startswith('/api/profiles') or not self.wants(request.headers):
+                return
+            g.profile_sampler = StackSampler(threading.get_ident()).start()
+
+        @app.after_request
+        def finish_profile(response):
+            sampler = g.pop('profile_sampler', None)
+            if sampler is None:
+                return response
+            samples = sampler.stop()
+            profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+            trigger = 'header' if request.headers.get('X-Profile') else 'sampled'
+            self.save(profile_id, samples, {
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'trigger': trigger,
+                'started_at': sampler.started_wall,
+                'duration_ms': round(sampler.duration * 1000, 1),
+                'interval_ms': PROFILE_INTERVAL_MS
+            })
+            with self._lock:
+                self.counters[trigger] += 1
+            response.headers['X-Profile-Id'] = profile_id
+            return response
+
+        def guarded():
+            return self.authorized(request.headers.get('X-Profile-Token') or request.headers.get('X-Profile'))
+
+        @app.route("/api/profiles", methods=["GET"])
+        def list_profiles():
+            """Stored request profiles (requires the profile token)"""
+            if not guarded():
+                return jsonify({'error': 'Endpoint not found'}), 404
+            with self._lock:
+                counters = dict(self.counters)
+            return jsonify({'profiles': self.list(), 'counters': counters}), 200
+
+        @app.route("/api/profiles/<profile_id>", methods=["GET"])
+        def get_profile(profile_id):
+            """One profile in folded stack format, for flamegraph.pl / speedscope"""
+            if not guarded():
+                return jsonify({'error': 'Endpoint not found'}), 404
+            text = self.read(profile_id)
+            if text is None:
+                return jsonify({'error': 'Profile not found'}), 404
+            return text, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+
+        print(f"🔬 Request profiling enabled (token: {'set' if self.token else 'unset'}, sample rate {self.sample_rate}) -> {self.directory}")
+        return self
+
+    def snapshot(self):
+        with self._lock:
+            return {'directory': self.directory, 'sample_rate': self.sample_rate, **self.counters}
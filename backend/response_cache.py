@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Response Cache
+Two-tier cache for expensive results (answers, MCQ lists, catalog views).
+
+The front tier is an in-process LRU. The back tier is shared by every gunicorn
+worker on the host: an SQLite file by default, or any Redis-compatible server
+when CACHE_REDIS_URL is set. A value found in the back tier is copied to the
+front. Entries have a TTL and tags; invalidating a tag drops its entries from
+the back tier and from this worker's front tier. Other workers' front tiers
+expire within CACHE_FRONT_TTL_SECONDS, which bounds how stale they can get.
+
+Usage: python response_cache.py --stats | --invalidate answers [catalog ...] | --clear
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CACHE_FRONT_MAX_ENTRIES = int(os.getenv('CACHE_FRONT_MAX_ENTRIES', 512))
+CACHE_FRONT_TTL_SECONDS = float(os.getenv('CACHE_FRONT_TTL_SECONDS', 30))
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', os.path.join(tempfile.gettempdir(), 'pratiyogita-cache.sqlite3'))
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', '')
+CACHE_KEY_PREFIX = os.getenv('CACHE_KEY_PREFIX', 'pratiyogita:')
+# Content versions written by the ingestion scripts, part of the catalog ETags
+CONTENT_VERSIONS_PATH = os.getenv('CONTENT_VERSIONS_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'content_versions.json'))
+
+def encode_value(value, tags=()):
+    """Back tier payload; carries the tags so a promoted front entry can still be invalidated"""
+    return json.dumps({'t': list(tags), 'v': value}, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def decode_value(data):
+    """Returns (value, tags)"""
+    payload = json.loads(data)
+    return payload['v'], payload['t']
+
+class LRUTier:
+    """In-process LRU with per-entry expiry and tags"""
+
+    def __init__(self, max_entries=CACHE_FRONT_MAX_ENTRIES, max_ttl=CACHE_FRONT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at, tags)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl, tags=()):
+        expires_at = time.time() + min(ttl, self.max_ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_tags(self, tags):
+        tags = set(tags)
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[2] & tags]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries}
+
+class SQLiteTier:
+    """Host-local shared tier in an SQLite file (WAL mode, safe across processes)"""
+
+    def __init__(self, path=CACHE_SQLITE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        # Threads of one worker take turns writing here instead of spinning on SQLite's file lock
+        self._write_lock = threading.Lock()
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL,
+                size INTEGER NOT NULL, accessed_at REAL NOT NULL)""")
+            db.execute("CREATE TABLE IF NOT EXISTS tags (tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key))")
+            db.execute("CREATE INDEX IF NOT EXISTS tags_by_key ON tags (key)")
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=2, isolation_level=None)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        db = self._connect()
+        row = db.execute("SELECT value, expires_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] <= now:
+            self.delete(key)
+            return None
+        with self._write_lock:
+            db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return row[0], row[1] - now
+
+    def set(self, key, data, ttl, tags=()):
+        now = time.time()
+        db = self._connect()
+        with self._write_lock:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)", (key, data, now + ttl, len(data), now))
+                db.execute("DELETE FROM tags WHERE key = ?", (key,))
+                db.executemany("INSERT OR IGNORE INTO tags VALUES (?, ?)", [(tag, key) for tag in tags])
+                self._evict(db, now)
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def _evict(self, db, now):
+        """Drop expired entries, then least recently used ones until under max_bytes"""
+        db.execute("DELETE FROM tags WHERE key IN (SELECT key FROM entries WHERE expires_at <= ?)", (now,))
+        db.execute("DELETE FROM entries WHERE expires_at <= ?", (now,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        freed = 0
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes * 0.9:
+                break
+        db.executemany("DELETE FROM tags WHERE key = ?", victims)
+        db.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def delete(self, key):
+        db = self._connect()
+        with self._write_lock:
+            db.execute("DELETE FROM tags WHERE key = ?", (key,))
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def invalidate_tags(self, tags):
+        db = self._connect()
+        removed = 0
+        for tag in tags:
+            with self._write_lock:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    keys = [(row[0],) for row in db.execute("SELECT key FROM tags WHERE tag = ?", (tag,))]
+                    db.executemany("DELETE FROM entries WHERE key = ?", keys)
+                    db.executemany("DELETE FROM tags WHERE key = ?", keys)
+                    db.execute("COMMIT")
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+            removed += len(keys)
+        return removed
+
+    def clear(self):
+        db = self._connect()
+        with self._write_lock:
+            db.execute("DELETE FROM tags")
+            db.execute("DELETE FROM entries")
+
+    def stats(self):
+        db = self._connect()
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'backend': 'sqlite', 'path': self.path, 'entries': entries, 'bytes': size, 'max_bytes': self.max_bytes}
+
+class RedisTier:
+    """Shared tier on a Redis-compatible server; size limits come from its maxmemory policy"""
+
+    def __init__(self, url=CACHE_REDIS_URL, prefix=CACHE_KEY_PREFIX):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.prefix = prefix
+
+    def get(self, key):
+        pipe = self.client.pipeline()
+        pipe.get(self.prefix + key)
+        pipe.ttl(self.prefix + key)
+        data, ttl = pipe.execute()
+        if data is None:
+            return None
+        return data, max(ttl, 1)
+
+    def set(self, key, data, ttl, tags=()):
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, data, ex=max(1, int(ttl)))
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            pipe.sadd(tag_key, key)
+            # Refreshed on every set so tag sets outlive their members; stale members are harmless
+            pipe.expire(tag_key, max(int(ttl), 86400))
+        pipe.execute()
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def invalidate_tags(self, tags):
+        removed = 0
+        for tag in tags:
+            tag_key = f"{self.prefix}tag:{tag}"
+            keys = [member.decode('utf-8') for member in self.client.smembers(tag_key)]
+            if keys:
+                removed += self.client.delete(*[self.prefix + key for key in keys])
+            self.client.delete(tag_key)
+        return removed
+
+    def clear(self):
+        keys = list(self.client.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self):
+        info = self.client.info('memory')
+        return {'backend': 'redis', 'used_memory': info.get('used_memory'), 'maxmemory': info.get('maxmemory')}
+
+class TieredCache:
+    """LRU front tier over a shared back tier; back tier errors degrade to front-only"""
+
+    def __init__(self, front, back=None):
+        self.front = front
+        self.back = back
+        self._lock = threading.Lock()
+        self.counters = {'front_hits': 0, 'back_hits': 0, 'misses': 0, 'sets': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def get(self, key, shared=False):
+        """Cached value or None; shared=True skips the front tier, for entries other workers update in place"""
+        value = self.front.get(key) if not shared or self.back is None else None
+        if value is not None:
+            self._count('front_hits')
+            return value
+        if self.back is not None:
+            try:
+                found = self.back.get(key)
+            except Exception as e:
+                self._count('errors')
+                print(f"⚠️ Cache back tier read failed: {e}")
+                found = None
+            if found is not None:
+                data, ttl_left = found
+                value, tags = decode_value(data)
+                if not shared:
+                    self.front.set(key, value, ttl_left, tags)
+                self._count('back_hits')
+                return value
+        self._count('misses')
+        return None
+
+    def set(self, key, value, ttl, tags=()):
+        self.front.set(key, value, ttl, tags)
+        self._count('sets')
+        if self.back is not None:
+            try:
+                self.back.set(key, encode_value(value, tags), ttl, tags)
+            except Exception as e:
+                self._count('errors')
+                print(f"⚠️ Cache back tier write failed: {e}")
+
+    def get_or_compute(self, key, compute, ttl, tags=(), should_cache=None):
+        """Cached value of key, or compute() stored when should_cache(value) allows it"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        value = compute()
+        if value is not None and (should_cache is None or should_cache(value)):
+            self.set(key, value, ttl, tags)
+        return value
+
+    def delete(self, key):
+        self.front.delete(key)
+        if self.back is not None:
+            self.back.delete(key)
+
+    def invalidate_tags(self, *tags):
+        """Drop every entry carrying any of the tags; returns the back tier count"""
+        self.front.invalidate_tags(tags)
+        if self.back is None:
+            return 0
+        return self.back.invalidate_tags(tags)
+
+    def clear(self):
+        self.front.clear()
+        if self.back is not None:
+            self.back.clear()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['front_hits'] + counters['back_hits'] + counters['misses']
+        back_stats = None
+        if self.back is not None:
+            try:
+                back_stats = self.back.stats()
+            except Exception as e:
+                back_stats = {'error': str(e)}
+        return {
+            **counters,
+            'hit_rate': round((counters['front_hits'] + counters['back_hits']) / lookups, 3) if lookups else 0.0,
+            'front': self.front.stats(),
+            'back': back_stats
+        }
+
+class NullCache:
+    """Stand-in when caching is disabled"""
+
+    def get(self, key, shared=False):
+        return None
+
+    def set(self, key, value, ttl, tags=()):
+        pass
+
+    def get_or_compute(self, key, compute, ttl, tags=(), should_cache=None):
+        return compute()
+
+    def delete(self, key):
+        pass
+
+    def invalidate_tags(self, *tags):
+        return 0
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {'enabled': False}
+
+def create_back_tier():
+    """Redis when CACHE_REDIS_URL is set (falling back to SQLite when unreachable), otherwise SQLite"""
+    if CACHE_REDIS_URL:
+        try:
+            tier = RedisTier(CACHE_REDIS_URL)
+            tier.client.ping()
+            return tier
+        except Exception as e:
+            print(f"⚠️ Redis cache unavailable ({e}), using SQLite")
+    try:
+        return SQLiteTier(CACHE_SQLITE_PATH)
+    except Exception as e:
+        print(f"⚠️ SQLite cache unavailable ({e}), using in-process cache only")
+        return None
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Process-wide cache, created on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = TieredCache(LRUTier(), create_back_tier()) if CACHE_ENABLED else NullCache()
+        return _cache
+
+_content_versions = (None, {})  # (file mtime, {index name: version})
+_content_versions_lock = threading.Lock()
+
+def content_versions():
+    """{Pinecone index name: content version} from CONTENT_VERSIONS_PATH, re-read when the file changes"""
+    global _content_versions
+    try:
+        mtime = os.stat(CONTENT_VERSIONS_PATH).st_mtime_ns
+    except OSError:
+        return {}
+    with _content_versions_lock:
+        if _content_versions[0] != mtime:
+            try:
+                with open(CONTENT_VERSIONS_PATH, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            _content_versions = (mtime, {name: entry.get('version') for name, entry in data.items()})
+        return _content_versions[1]
+
+def record_content_version(index_name, version):
+    """Used by the ingestion scripts - new content version of an index, so in-place re-ingestion changes the catalog ETags"""
+    try:
+        with open(CONTENT_VERSIONS_PATH, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    data[index_name] = {'version': str(version), 'updated_at': time.time()}
+    tmp_path = f"{CONTENT_VERSIONS_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, CONTENT_VERSIONS_PATH)
+    print(f"🏷️  {index_name} content version {version}")
+
+def invalidate_after_ingestion(*tags):
+    """Used by the ingestion scripts - a cache that cannot be reached is not an error there"""
+    try:
+        removed = get_cache().invalidate_tags(*tags)
+        print(f"🧹 Invalidated {removed} cached entries tagged {', '.join(tags)}")
+    except Exception as e:
+        print(f"⚠️ Could not invalidate the response cache: {e}")
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the shared response cache")
+    parser.add_argument("--stats", action="store_true")
+    parser.add_argument("--invalidate", nargs="+", metavar="TAG", help="e.g. answers mcq catalog")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    cache = get_cache()
+    if args.invalidate:
+        print(f"🧹 Removed {cache.invalidate_tags(*args.invalidate)} entries")
+    if args.clear:
+        cache.clear()
+        print("🧹 Cache cleared")
+    if args.stats or not (args.invalidate or args.clear):
+        print(json.dumps(cache.stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
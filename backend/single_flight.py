@@ -0,0 +1,80 @@
+"""
+Single-Flight Request Coalescing
+Identical requests that arrive while the same work is already running wait for
+the leader's result instead of repeating the encode / Pinecone / Groq calls.
+
+Coalescing is per worker process: it collapses concurrent duplicates served by
+the threads of one worker, not across gunicorn workers.
+"""
+
+import os
+import threading
+
+# Followers give up waiting after this long and do the work themselves
+COALESCE_WAIT_SECONDS = float(os.getenv('COALESCE_WAIT_SECONDS', 35))
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Runs at most one fn per key at a time and shares its outcome with every waiter"""
+
+    def __init__(self, wait_timeout=COALESCE_WAIT_SECONDS):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.wait_timeouts = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return (result, shared); exceptions raised by the leader are re-raised for every waiter"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                return fn(*args, **kwargs), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            # Forget the key before waking waiters, so later requests start fresh work
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'wait_timeouts': self.wait_timeouts
+            }
+
+def normalize_query(text):
+    """Coalescing key part for free-text queries: case and whitespace insensitive"""
+    return " ".join(str(text).lower().split())
@@ -0,0 +1,93 @@
+"""
+Startup State
+Tracks the background initialization of the search system.
+
+States: pending -> loading -> ready | degraded | failed
+  ready     every component is up
+  degraded  init finished but some components are missing (e.g. no GROQ_API_KEY)
+  failed    init raised; model routes answer with their own "not available" errors
+Routes that need models are gated on `finished`; everything else serves at once.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Retry-After sent while models are loading (a cold start takes ~5-10s)
+INIT_RETRY_AFTER_SECONDS = int(os.getenv('INIT_RETRY_AFTER_SECONDS', 5))
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+DEGRADED = 'degraded'
+FAILED = 'failed'
+
+class InitTracker:
+    """Thread-safe init state with per-stage timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.state = PENDING
+        self.stage = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self.stages = {}  # stage name -> seconds
+
+    @property
+    def finished(self):
+        return self.state in (READY, DEGRADED, FAILED)
+
+    def start(self, target):
+        """Run target() on a daemon thread once; later calls are no-ops"""
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.state = LOADING
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, args=(target,), name='search-init', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self, target):
+        try:
+            complete = target()
+            self.finish(READY if complete else DEGRADED)
+        except Exception as e:
+            self.finish(FAILED, f"{type(e).__name__}: {e}")
+
+    def finish(self, state, error=None):
+        with self._lock:
+            self.state = state
+            self.error = error
+            self.stage = None
+            self.finished_at = time.time()
+
+    @contextmanager
+    def track(self, name):
+        """Record how long an init stage takes"""
+        self.stage = name
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(time.monotonic() - started_at, 3)
+
+    def wait(self, timeout=None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.finished
+
+    def snapshot(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            return {
+                'state': self.state,
+                'stage': self.stage,
+                'error': self.error,
+                'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else None,
+                'stages': dict(self.stages)
+            }
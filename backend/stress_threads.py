@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Thread Stress Test
+Hammers the state that request threads share inside one gthread worker (rate
+limiter, dashboard stats, single-flight, response cache, admission gates and
+the embedding model) from many threads at once. Afterwards it checks that the
+counters are exact and the results are the same as a serial run. The process
+exits non-zero on any mismatch.
+
+With --target it also drives a running server over HTTP: concurrent dashboard
+events for one user must all be counted, and no request may fail with a 5xx.
+
+Usage: python stress_threads.py [--threads 32] [--iterations 200] [--model]
+       python stress_threads.py --target http://localhost:5000 [--threads 16]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+
+from admission import GatedEncoder, StageGate, StageOverloaded
+from dashboard_stats import StatsStore, make_event
+from rate_limiter import SlidingWindowLimiter
+from response_cache import LRUTier, SQLiteTier, TieredCache
+from single_flight import SingleFlight
+
+EMBEDDING_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+
+def hammer(threads, fn):
+    """Run fn(thread_number) on `threads` threads released together; returns their results"""
+    barrier = threading.Barrier(threads)
+    results = [None] * threads
+    errors = []
+
+    def run(number):
+        barrier.wait()
+        try:
+            results[number] = fn(number)
+        except Exception as e:
+            errors.append(e)
+
+    workers = [threading.Thread(target=run, args=(number,)) for number in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    if errors:
+        raise errors[0]
+    return results
+
+def check_rate_limiter(threads, iterations):
+    limiter = SlidingWindowLimiter()
+    limit = threads * iterations // 3
+    allowed = hammer(threads, lambda number: sum(limiter.hit(('search', '10.0.0.1'), limit, 60) for _ in range(iterations)))
+    per_client = hammer(threads, lambda number: sum(limiter.hit(('search', f'10.0.1.{number}'), iterations, 60) for _ in range(iterations)))
+    return [
+        ('shared key admits exactly the limit', sum(allowed) == limit, f"{sum(allowed)} of {limit}"),
+        ('separate keys are independent', sum(per_client) == threads * iterations, f"{sum(per_client)} of {threads * iterations}")
+    ]
+
+def check_dashboard(threads, iterations, log_path):
+    store = StatsStore(log_path=log_path)
+
+    def track(number):
+        # Every event is sent twice: the second copy must be counted as a duplicate
+        for i in range(iterations):
+            event_id = f"{number}-{i}"
+            event = make_event({'type': 'mcq_attempt' if i % 2 else 'search', 'id': event_id, 'data': {'correct': i % 4 == 1}})
+            store.track('stress-user', [event])
+            store.track('stress-user', [dict(event)])
+        return iterations
+
+    hammer(threads, track)
+    stats = store.get('stress-user').stats()
+    searches = threads * (iterations - iterations // 2)
+    attempts = threads * (iterations // 2)
+    return [
+        ('every search counted once', stats['totalQuestions'] == searches, f"{stats['totalQuestions']} of {searches}"),
+        ('every MCQ attempt counted once', stats['totalMcqAttempted'] == attempts, f"{stats['totalMcqAttempted']} of {attempts}"),
+        ('correct + wrong = attempted', stats['mcqCorrect'] + stats['mcqWrong'] == stats['totalMcqAttempted'], str(stats))
+    ]
+
+def check_single_flight(threads):
+    flight = SingleFlight()
+    executions = Counter()
+    lock = threading.Lock()
+
+    def work(key):
+        with lock:
+            executions[key] += 1
+        time.sleep(0.2)
+        return f"answer for {key}"
+
+    results = hammer(threads, lambda number: flight.do(f"query {number % 4}", work, f"query {number % 4}"))
+    snapshot = flight.snapshot()
+    return [
+        ('each key computed once', all(count == 1 for count in executions.values()), str(dict(executions))),
+        ('every caller got its own key', all(result == f"answer for query {number % 4}" for number, (result, _) in enumerate(results)), ''),
+        ('leaders + coalesced = callers', snapshot['leaders'] + snapshot['coalesced'] == threads, str(snapshot))
+    ]
+
+def check_response_cache(threads, iterations, sqlite_path):
+    cache = TieredCache(LRUTier(max_entries=iterations), SQLiteTier(sqlite_path))
+
+    def churn(number):
+        wrong = 0
+        for i in range(iterations):
+            key = f"stress:{number}:{i % 50}"
+            value = {'thread': number, 'i': i % 50}
+            cache.set(key, value, ttl=60)
+            found = cache.get(key) or cache.get(key, shared=True)
+            wrong += found is not None and found != value
+        return wrong
+
+    wrong = sum(hammer(threads, churn))
+    return [('cached values never cross keys', wrong == 0, f"{wrong} wrong values, {cache.stats()}")]
+
+class OverlapProbe:
+    """Encoder that records how many encode() calls ever ran at the same time"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = 0
+        self.max_active = 0
+
+    def encode(self, texts):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.001)
+        with self._lock:
+            self.active -= 1
+        return texts
+
+def check_gates(threads, iterations):
+    gate = StageGate('stress', 3, threads, 30)
+    probe = OverlapProbe()
+
+    def call(number):
+        for _ in range(max(1, iterations // 20)):
+            with gate.admit():
+                probe.encode(["text"])
+
+    hammer(threads, call)
+    encoder_probe = OverlapProbe()
+    encoder = GatedEncoder(encoder_probe)
+    shed = Counter()
+
+    def encode(number):
+        for _ in range(max(1, iterations // 20)):
+            try:
+                encoder.encode(["text"])
+            except StageOverloaded:
+                shed['embedding'] += 1  # The real embedding gate sheds part of the burst, as in production
+
+    hammer(threads, encode)
+    return [
+        ('gate never exceeds its limit', probe.max_active <= 3, f"max {probe.max_active} concurrent"),
+        ('GatedEncoder serializes encode()', encoder_probe.max_active == 1, f"max {encoder_probe.max_active} concurrent, {shed['embedding']} shed")
+    ]
+
+def check_model(threads):
+    """Concurrent encodes through GatedEncoder must match serial ones exactly"""
+    from sentence_transformers import SentenceTransformer
+
+    encoder = GatedEncoder(SentenceTransformer(EMBEDDING_MODEL, device='cpu'))
+    texts = [f"Explain topic {i} of the NCERT {subject} syllabus" for i in range(threads) for subject in ('polity', 'geography')]
+    serial = [encoder.encode([text]).tolist()[0] for text in texts]
+    concurrent = hammer(threads, lambda number: [encoder.encode([text]).tolist()[0] for text in texts[number::threads]])
+    matches = all(
+        concurrent[number][position] == serial[number + position * threads]
+        for number in range(threads) for position in range(len(concurrent[number]))
+    )
+    return [('concurrent embeddings equal serial ones', matches, f"{len(texts)} texts")]
+
+def post_json(url, body, timeout=30):
+    request = urllib.request.Request(url, data=json.dumps(body).encode('utf-8'), headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status, json.loads(response.read())
+
+def check_server(target, threads, iterations):
+    """Concurrent dashboard events for one user against a running server"""
+    user_id = f"stress-{uuid.uuid4().hex[:8]}"
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def send(number):
+        for i in range(iterations):
+            try:
+                status, _ = post_json(f"{target}/api/dashboard/track?user_id={user_id}", {'type': 'search', 'id': f"{number}-{i}"})
+            except urllib.error.HTTPError as e:
+                status = e.code
+            with lock:
+                statuses[status] += 1
+            try:
+                urllib.request.urlopen(f"{target}/api/health", timeout=30).close()
+            except urllib.error.HTTPError as e:
+                with lock:
+                    statuses[e.code] += 1
+
+    hammer(threads, send)
+    with urllib.request.urlopen(f"{target}/api/dashboard/stats?user_id={user_id}", timeout=30) as response:
+        stats = json.loads(response.read())
+    expected = threads * iterations
+    errors = sum(count for status, count in statuses.items() if status >= 500 and status != 503)
+    return [
+        ('every tracked event counted', stats.get('totalQuestions') == expected, f"{stats.get('totalQuestions')} of {expected}"),
+        ('no 5xx responses (503 load shedding aside)', errors == 0, str(dict(statuses)))
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the shared in-process state from many threads")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--iterations", type=int, default=200, help="Operations per thread")
+    parser.add_argument("--model", action="store_true", help=f"Also compare concurrent and serial {EMBEDDING_MODEL} embeddings")
+    parser.add_argument("--target", help="Base URL of a running server to stress over HTTP instead")
+    args = parser.parse_args()
+
+    # Many tiny time slices, so unsynchronized read-modify-write sequences get interleaved
+    sys.setswitchinterval(1e-6)
+    started_at = time.perf_counter()
+    if args.target:
+        checks = check_server(args.target.rstrip('/'), args.threads, max(1, args.iterations // 10))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            checks = []
+            checks += check_rate_limiter(args.threads, args.iterations)
+            checks += check_dashboard(args.threads, args.iterations // 4, '')
+            checks += check_dashboard(args.threads, args.iterations // 10, os.path.join(directory, 'events.jsonl'))
+            checks += check_single_flight(args.threads)
+            checks += check_response_cache(args.threads, args.iterations, os.path.join(directory, 'cache.sqlite3'))
+            checks += check_gates(args.threads, args.iterations)
+            if args.model:
+                checks += check_model(args.threads)
+
+    for name, passed, detail in checks:
+        print(f"{'✅' if passed else '❌'} {name:<45} {detail}")
+    failed = sum(1 for _, passed, _ in checks if not passed)
+    print(f"{len(checks) - failed}/{len(checks)} checks passed in {time.perf_counter() - started_at:.1f}s ({args.threads} threads)")
+    if failed:
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
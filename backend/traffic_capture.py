@@ -0,0 +1,123 @@
+"""
+Traffic Capture
+Opt-in recorder that appends sanitized API requests and their timings to JSONL,
+for replay with replay_traffic.py.
+
+Enabled by setting TRAFFIC_CAPTURE_PATH. Each worker process writes its own
+file (<path>.<pid>) from a background thread, so requests never wait on disk.
+Bodies are sanitized before they are written: identity and credential fields
+are dropped, e-mail addresses and phone numbers in free text are masked, and
+long strings are truncated. Client addresses and headers are not recorded.
+"""
+
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+
+TRAFFIC_CAPTURE_PATH = os.getenv('TRAFFIC_CAPTURE_PATH', '')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.getenv('TRAFFIC_CAPTURE_SAMPLE_RATE', 1.0))
+TRAFFIC_CAPTURE_PATHS = tuple(p.strip() for p in os.getenv('TRAFFIC_CAPTURE_PATHS', '/api/search,/api/pyq/,/api/questions').split(',') if p.strip())
+TRAFFIC_CAPTURE_MAX_MB = float(os.getenv('TRAFFIC_CAPTURE_MAX_MB', 200))
+
+SENSITIVE_KEYS = frozenset({
+    'user_id', 'userid', 'user', 'email', 'name', 'phone', 'token', 'access_token', 'password',
+    'api_key', 'apikey', 'authorization', 'session', 'session_id', 'cookie', 'ip'
+})
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_PATTERN = re.compile(r"(?<!\d)(?:\+?\d[\d -]{8,}\d)(?!\d)")
+MAX_STRING_LENGTH = 1000
+
+def sanitize(value):
+    """Copy of a request body/args without identity fields or contact details"""
+    if isinstance(value, dict):
+        return {key: sanitize(item) for key, item in value.items() if str(key).lower() not in SENSITIVE_KEYS}
+    if isinstance(value, list):
+        return [sanitize(item) for item in value[:100]]
+    if isinstance(value, str):
+        value = EMAIL_PATTERN.sub('<email>', value)
+        value = PHONE_PATTERN.sub('<phone>', value)
+        return value[:MAX_STRING_LENGTH]
+    return value
+
+class TrafficRecorder:
+    """Writes one JSON line per captured request"""
+
+    def __init__(self, path, sample_rate=TRAFFIC_CAPTURE_SAMPLE_RATE, paths=TRAFFIC_CAPTURE_PATHS, max_mb=TRAFFIC_CAPTURE_MAX_MB):
+        self.path = f"{path}.{os.getpid()}"
+        self.sample_rate = sample_rate
+        self.paths = paths
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.written_bytes = 0
+        self.recorded = 0
+        self.dropped = 0
+        self._lock = threading.Lock()  # dropped is counted by request threads and the writer
+        self._queue = queue.Queue(maxsize=10000)
+        self._thread = threading.Thread(target=self._writer, name='traffic-capture', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls):
+        return cls(TRAFFIC_CAPTURE_PATH) if TRAFFIC_CAPTURE_PATH else None
+
+    def wants(self, path, headers):
+        if headers.get('X-Replay'):
+            return False  # Don't re-record replayed traffic
+        return path.startswith(self.paths) and random.random() < self.sample_rate
+
+    def record(self, entry):
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _writer(self):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            while True:
+                entry = self._queue.get()
+                line = json.dumps(entry, separators=(',', ':'), ensure_ascii=False) + "\n"
+                if self.written_bytes + len(line) > self.max_bytes:
+                    with self._lock:
+                        self.dropped += 1
+                    continue
+                f.write(line)
+                f.flush()
+                self.written_bytes += len(line)
+                self.recorded += 1
+
+    def init_app(self, app):
+        """Register the request hooks on a Flask app"""
+        from flask import g, request
+
+        @app.before_request
+        def start_capture():
+            if self.wants(request.path, request.headers):
+                g.capture_started_at = time.time()
+                g.capture_timer = time.perf_counter()
+
+        @app.after_request
+        def finish_capture(response):
+            started_at = g.pop('capture_started_at', None)
+            if started_at is None:
+                return response
+            self.record({
+                'ts': round(started_at, 4),
+                'method': request.method,
+                'path': request.path,
+                'args': sanitize(request.args.to_dict(flat=True)),
+                'body': sanitize(request.get_json(silent=True)) if request.method in ('POST', 'PUT', 'PATCH') else None,
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.pop('capture_timer')) * 1000, 2),
+                'response_bytes': response.calculate_content_length()
+            })
+            return response
+
+        print(f"🎥 Capturing traffic to {self.path} (sample rate {self.sample_rate})")
+        return self
+
+    def snapshot(self):
+        return {'path': self.path, 'recorded': self.recorded, 'dropped': self.dropped, 'bytes': self.written_bytes}